@@ -1,19 +1,25 @@
 import os
 import json
 import asyncio
-from groq import Groq
 from dotenv import load_dotenv
-from .tools.tools_registry import (TOOL_REGISTRY)
-import azure.cognitiveservices.speech as speechsdk
+import metrics
+from . import explanation_cache, llm_client, slot_filler
+from .conversation_memory import ConversationMemory, message_tokens
+from .streaming import ReplyStream, SpeechQueue
 load_dotenv()
 
 SPEECH_KEY = os.getenv("AZURE_SPEECH_KEY")  
 SPEECH_REGION = os.getenv("AZURE_SERVICE_REGION")
 MODE = "text"   
+# Run obvious tool calls (city, date, slots, a plain yes) locally instead of via an LLM "Action:"
+FAST_PATH = os.getenv("SLOT_FAST_PATH", "1") != "0"
 
 
 # SPEECH FUNCTIONS
+# The Azure SDK is only needed in voice mode, so it is imported on first use
+
 def speak_text(text: str):
+    import azure.cognitiveservices.speech as speechsdk
     speech_config = speechsdk.SpeechConfig(subscription=SPEECH_KEY, region=SPEECH_REGION)
     speech_config.speech_synthesis_voice_name = "hi-IN-SwaraNeural"  # natural Hindi voice
     audio_config = speechsdk.audio.AudioOutputConfig(use_default_speaker=True)
@@ -29,6 +35,7 @@ def speak_text(text: str):
 
 
 def listen_and_transcribe() -> str:
+    import azure.cognitiveservices.speech as speechsdk
     speech_config = speechsdk.SpeechConfig(subscription=SPEECH_KEY, region=SPEECH_REGION)
     speech_config.speech_recognition_language = "hi-IN"
     audio_config = speechsdk.audio.AudioConfig(use_default_microphone=True)
@@ -66,27 +73,28 @@ def listen_and_transcribe() -> str:
     return final_text
 
 # GROQ HELPERS
+# Both go through the shared, pooled client in llm_client.py (timeouts, retries, LLM_BASE_URL)
+@metrics.timed("llm.call")
 def groq_call(content: str) -> str:
-    client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-    chat_completion = client.chat.completions.create(
-        messages=[
-            {
-                "role": "user",
-                "content": content,
-            }
-        ],
-        model="meta-llama/llama-4-scout-17b-16e-instruct",
-    )
-    return chat_completion.choices[0].message.content
+    return llm_client.complete(content)
 
 
+@metrics.timed("llm.chat")
 def groq_chat(messages):
-    client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-    chat_completion = client.chat.completions.create(
-        model="meta-llama/llama-4-scout-17b-16e-instruct",
-        messages=messages
-    )
-    return chat_completion.choices[0].message.content
+    return llm_client.chat(messages)
+
+
+def groq_chat_stream(messages, on_chunk):
+    """Stream a reply: sentence chunks go to on_chunk while the model is still generating."""
+    reply = ReplyStream(on_chunk)
+    t0 = metrics.start()
+    for delta in llm_client.stream_chat(messages):
+        reply.feed(delta)
+    text = reply.close()
+    if t0 and reply.first_chunk_at is not None:
+        metrics.record("llm.first_chunk", reply.first_chunk_at - t0)
+    metrics.stop("llm.stream", t0)
+    return text, reply.is_action
 
 
 # TOOL ACTION PARSING
@@ -103,7 +111,7 @@ def extract_action(json_text):
 
 # DIAGNOSIS - HUMAN TEXT
 
-def convert_to_human_explainable(diagnosis):
+def explain_with_llm(diagnosis):
  
     prompt = (
         "You are a vehicle customer care assistant. "
@@ -119,6 +127,13 @@ def convert_to_human_explainable(diagnosis):
     return groq_call(prompt)
 
 
+def convert_to_human_explainable(diagnosis):
+    # Few distinct diagnoses exist, so most sessions open from the cache without an LLM call
+    if not isinstance(diagnosis, dict):
+        return explain_with_llm(diagnosis)
+    return explanation_cache.get_cache().get_or_create(diagnosis, explain_with_llm)
+
+
 
 # INITIAL AGENT TURN 
 
@@ -160,10 +175,217 @@ def memory_to_groq_messages(memory):
     return messages
 
 
+# SYSTEM PROMPT
+SYSTEM_PROMPT = (
+    "You are a vehicle customer care agent. "
+    "Talk in simple conversational Hinglish (Hindi in English letters) "
+    "with English technical words.\n\n"
+    "DO NOT use Devanagari script.\n\n"
+
+    "You MUST respond in exactly ONE of these formats:\n\n"
+    "1) TOOL CALL (when real-world info is needed):\n"
+    "Action: {\"tool\": \"tool_name\", \"args\": {...}}\n\n"
+    "2) NORMAL REPLY:\n"
+    "Final Answer: <your Hinglish reply>\n\n"
+
+    "BOOKING LOGIC (VERY IMPORTANT):\n"
+    "- User might mention date/time phrases like 'kal dopahar', 'parso shaam', '12 baje', etc.\n"
+    "- If user gives date/time but NOT city → DO NOT call any tool yet.\n"
+    "  Instead, ask: 'Theek hai, <date/time> samajh gaya. Aap abhi kis sheher mein hain?'\n"
+    "- As soon as user gives a city → ALWAYS call find_center(city).\n"
+    "- find_center returns a service center OBJECT (center_id, name, city, etc).\n"
+    "- You MUST extract and remember center_id from this response.\n"
+    "- For all future steps (slots, booking), use ONLY center_id.\n"
+    "- NEVER use service center name or city for booking.\n"
+    "- After center is found, ask for preferred time if not clearly specified.\n"
+    "- If user only gives a time (e.g., '12 baje') and a date was already discussed earlier,\n"
+    "  assume the same date and DO NOT ask for the date again.\n\n"
+
+    "DATE & TIME NORMALIZATION RULES:\n"
+    "- Use normalise_date when user mentions relative/ambiguous phrases like:\n"
+    "  kal, parso, aaj, dopahar, shaam, subah, raat, etc.\n"
+    "- normalise_date returns BOTH date and time OR a time_window.\n"
+    "- ALWAYS convert kal/parso into exact date format (YYYY-MM-DD).\n"
+    "- NEVER keep dates internally as words like 'kal' or 'parso'.\n\n"
+
+    "TOOL USAGE RULES:\n"
+    "- Use find_center ONLY with city.\n"
+    "- ALWAYS call find_center once city is known.\n"
+    "- Use get_slot ONLY when center_id AND normalized date are known.\n"
+    "- Use book_slot ONLY when center_id, normalized date, and exact time are known AND user has agreed.\n"
+    "- book_slot strictly expects center_id — NOT name, NOT city.\n\n"
+
+    "COMMUNICATION RULES:\n"
+    "- NEVER tell the user that you are calling a tool.\n"
+    "- NEVER say things like 'main tool use kar raha hoon'.\n"
+    "- Speak naturally like a human customer care agent.\n\n"
+
+    "STRICT RULES:\n"
+    "- NEVER mix Action and Final Answer in the same response.\n"
+    "- NEVER call a tool with empty or missing arguments.\n"
+    "- NEVER invent center_id, dates, or times.\n"
+    "- If ANY required info is missing, ASK the user.\n"
+    "- Always reply ONLY in Hinglish.\n"
+)
+# Built once and sent as the first message of every prompt, byte-identical across turns
+SYSTEM_MESSAGE = {"role": "user", "content": SYSTEM_PROMPT}
+
+
+def build_prompt(conversational_memory):
+    """Messages for the next LLM call: managed (ConversationMemory) or the full history (plain list)."""
+    if isinstance(conversational_memory, ConversationMemory):
+        return conversational_memory.build_messages(SYSTEM_MESSAGE)
+    messages = memory_to_groq_messages(conversational_memory)
+    messages.insert(0, SYSTEM_MESSAGE)
+    return messages
+
+
+# CONVERSATION TURNS
+# A conversation is just its memory list, so it can be paused after any turn
+# and resumed later (e.g. by session_manager) without holding a thread.
+
+def prepare_initial_conversation(diagnosis):
+    human_text = convert_to_human_explainable(diagnosis)
+
+    initial_agent_text = (
+        "==============================\n"
+        "🚗 Vehicle Customer Care Agent\n"
+        "==============================\n\n"
+        f"{human_text}\n\n"
+        "Aap service ke liye kab aa sakte hai?"
+    )
+    return {
+        "memory": ConversationMemory([{"role": "agent", "text": initial_agent_text}]),
+        "agent_message": initial_agent_text
+    }
+
+
+def strip_final_answer(reply: str) -> str:
+    if reply.startswith("Final Answer:"):
+        reply = reply[len("Final Answer:"):].strip()
+    return reply
+
+
+def reply_after_tools(messages, calls, on_chunk=None):
+    """Append [(tool, args, result)] results to messages and ask for the final answer: (final_text, raw_reply)."""
+    for tool_name, _, tool_result in calls:
+        messages.append({
+            "role": "assistant",
+            "content": f"Tool {tool_name} result: {tool_result}"
+        })
+    messages.append({
+        "role": "user",
+        "content": "Now respond with: Final Answer: <Hinglish reply>"
+    })
+    if on_chunk is None:
+        raw_reply = groq_chat(messages).strip()
+        return strip_final_answer(raw_reply), raw_reply
+    raw_reply, held_back = groq_chat_stream(messages, lambda chunk: on_chunk(chunk, "tool_reply"))
+    raw_reply = raw_reply.strip()
+    final_text = strip_final_answer(raw_reply)
+    if held_back:
+        # Held back as a possible tool call; show it as the blocking path would
+        on_chunk(final_text, "tool_reply")
+    return final_text, raw_reply
+
+
+def process_user_turn(conversational_memory, user_input, on_chunk=None, fast_path=None):
+    """
+    One owner turn. With on_chunk(text, source), replies are streamed and
+    delivered sentence by sentence as they are generated; source is "reply"
+    for a direct answer and "tool_reply" for the answer after a tool call.
+
+    With a ConversationMemory, tool calls the message clearly asks for (a
+    known city, a date, available slots, a bare yes to the booking the agent
+    just offered) run locally first (slot_filler) and the LLM is only asked
+    to phrase the answer. fast_path=False, or SLOT_FAST_PATH=0, leaves every decision to the LLM.
+    """
+    # Store owner reply in memory
+    conversational_memory.append({
+        "role": "user",
+        "text": user_input
+    })
+    managed = isinstance(conversational_memory, ConversationMemory)
+    if fast_path is None:
+        fast_path = FAST_PATH
+
+    local_calls = []
+    if managed and fast_path:
+        with metrics.timer("slot_filler"):
+            last_agent = next((t["text"] for t in reversed(conversational_memory[:-1]) if t["role"] == "agent"), None)
+            local_calls = slot_filler.fill(conversational_memory.slots, user_input, last_agent)
+
+    # Built after the local tools ran, so the slot state already has their results
+    messages = build_prompt(conversational_memory)
+
+    if local_calls:
+        final_text, agent_reply = reply_after_tools(messages, local_calls, on_chunk)
+        prompt_tokens, llm_calls = message_tokens(messages), 1
+        tool_name = slot_filler.describe(local_calls)
+        tool_result = {name: result for name, _, result in local_calls}
+        for name, _, _ in local_calls:
+            metrics.incr("slot_filler.tool", tool=name)
+    else:
+        prompt_tokens, llm_calls = message_tokens(messages), 1
+        if on_chunk is None:
+            agent_reply = groq_chat(messages).strip()
+        else:
+            agent_reply, streamed_action = groq_chat_stream(messages, lambda chunk: on_chunk(chunk, "reply"))
+            agent_reply = agent_reply.strip()
+        action = None
+        if agent_reply.startswith("Action:"):
+            json_part = agent_reply[len("Action:"):].strip()
+            action = extract_action(json_part)
+
+        tool_name, tool_result = None, None
+        if action:
+            # langchain (behind the tool decorators) takes ~1s to import; only pay it on the first tool call
+            from .tools.tools_registry import TOOL_REGISTRY
+
+            tool_name, args = action
+            tool_fn = TOOL_REGISTRY.get(tool_name)
+            if not tool_fn:
+                raise ValueError(f"Unknown tool: {tool_name}")
+            with metrics.timer(f"tool.{tool_name}"):
+                tool_result = tool_fn.invoke(args)
+            if managed:
+                conversational_memory.slots.update_from_tool(tool_name, args, tool_result)
+            final_text, _ = reply_after_tools(messages, [(tool_name, args, tool_result)], on_chunk)
+            prompt_tokens += message_tokens(messages)
+            llm_calls += 1
+        else:
+            # Normal reply, no tool call
+            final_text = strip_final_answer(agent_reply)
+            if on_chunk is not None and streamed_action:
+                # Looked like a tool call but didn't parse: nothing was streamed yet
+                on_chunk(final_text, "reply")
+
+    conversational_memory.append({
+        "role": "agent",
+        "text": final_text
+    })
+    metrics.incr("llm.prompt_tokens", prompt_tokens)
+    metrics.incr("llm.round_trips", llm_calls, path="local_tools" if local_calls else "llm")
+    if managed:
+        conversational_memory.prompt_tokens.append(prompt_tokens)
+        conversational_memory.llm_calls.append(llm_calls)
+    return {
+        "memory": conversational_memory,
+        "agent_message": final_text,
+        "raw_reply": agent_reply,
+        "tool_used": tool_name,
+        "tool_result": tool_result,
+        "prompt_tokens": prompt_tokens,
+        "llm_calls": llm_calls,
+        "fast_path": bool(local_calls)
+    }
+
+
 # MAIN LOOP
 async def customer_conversation_loop(conversational_memory):
 
     print("\n--- Conversation Started (type 'exit' to stop) ---\n")
+    speech = SpeechQueue(speak_text) if MODE != "text" else None
 
     while True:
 
@@ -176,115 +398,20 @@ async def customer_conversation_loop(conversational_memory):
             print("Owner (heard):", owner_input)
             if owner_input.lower() == "exit":
                 break
-        # Store owner reply in memory
-        conversational_memory.append({
-            "role": "user",
-            "text": owner_input
-        })
 
-        messages = memory_to_groq_messages(conversational_memory)
-        messages.insert(0, {
-                "role": "user",
-                "content": (
-                    "You are a vehicle customer care agent. "
-                    "Talk in simple conversational Hinglish (Hindi in English letters) "
-                    "with English technical words.\n\n"
-                    "DO NOT use Devanagari script.\n\n"
-
-                    "You MUST respond in exactly ONE of these formats:\n\n"
-                    "1) TOOL CALL (when real-world info is needed):\n"
-                    "Action: {\"tool\": \"tool_name\", \"args\": {...}}\n\n"
-                    "2) NORMAL REPLY:\n"
-                    "Final Answer: <your Hinglish reply>\n\n"
-
-                    "BOOKING LOGIC (VERY IMPORTANT):\n"
-                    "- User might mention date/time phrases like 'kal dopahar', 'parso shaam', '12 baje', etc.\n"
-                    "- If user gives date/time but NOT city → DO NOT call any tool yet.\n"
-                    "  Instead, ask: 'Theek hai, <date/time> samajh gaya. Aap abhi kis sheher mein hain?'\n"
-                    "- As soon as user gives a city → ALWAYS call find_center(city).\n"
-                    "- find_center returns a service center OBJECT (center_id, name, city, etc).\n"
-                    "- You MUST extract and remember center_id from this response.\n"
-                    "- For all future steps (slots, booking), use ONLY center_id.\n"
-                    "- NEVER use service center name or city for booking.\n"
-                    "- After center is found, ask for preferred time if not clearly specified.\n"
-                    "- If user only gives a time (e.g., '12 baje') and a date was already discussed earlier,\n"
-                    "  assume the same date and DO NOT ask for the date again.\n\n"
-
-                    "DATE & TIME NORMALIZATION RULES:\n"
-                    "- Use normalise_date when user mentions relative/ambiguous phrases like:\n"
-                    "  kal, parso, aaj, dopahar, shaam, subah, raat, etc.\n"
-                    "- normalise_date returns BOTH date and time OR a time_window.\n"
-                    "- ALWAYS convert kal/parso into exact date format (YYYY-MM-DD).\n"
-                    "- NEVER keep dates internally as words like 'kal' or 'parso'.\n\n"
-
-                    "TOOL USAGE RULES:\n"
-                    "- Use find_center ONLY with city.\n"
-                    "- ALWAYS call find_center once city is known.\n"
-                    "- Use get_slot ONLY when center_id AND normalized date are known.\n"
-                    "- Use book_slot ONLY when center_id, normalized date, and exact time are known AND user has agreed.\n"
-                    "- book_slot strictly expects center_id — NOT name, NOT city.\n\n"
-
-                    "COMMUNICATION RULES:\n"
-                    "- NEVER tell the user that you are calling a tool.\n"
-                    "- NEVER say things like 'main tool use kar raha hoon'.\n"
-                    "- Speak naturally like a human customer care agent.\n\n"
-
-                    "STRICT RULES:\n"
-                    "- NEVER mix Action and Final Answer in the same response.\n"
-                    "- NEVER call a tool with empty or missing arguments.\n"
-                    "- NEVER invent center_id, dates, or times.\n"
-                    "- If ANY required info is missing, ASK the user.\n"
-                    "- Always reply ONLY in Hinglish.\n"
-                )
-            })
-
-        agent_reply = groq_chat(messages).strip()
-        print("\nAgent (raw):", agent_reply, "\n")
-        action = None
-        if agent_reply.startswith("Action:"):
-            json_part = agent_reply[len("Action:"):].strip()
-            action = extract_action(json_part)
-        if action:
-            tool_name, args = action
-            tool_fn = TOOL_REGISTRY.get(tool_name)
-            if not tool_fn:
-                raise ValueError(f"Unknown tool: {tool_name}")
-            tool_result = tool_fn.invoke(args)
-            messages.append({
-                "role": "assistant",
-                "content": f"Tool {tool_name} result: {tool_result}"
-            })
-            messages.append({
-                "role": "user",
-                "content": "Now respond with: Final Answer: <Hinglish reply>"
-            })
-            final_reply = groq_chat(messages).strip()
-            if final_reply.startswith("Final Answer:"):
-                final_reply = final_reply[len("Final Answer:"):].strip()
-            print("\nAgent:", final_reply, "\n")
-            conversational_memory.append({
-                "role": "agent",
-                "text": final_reply
-            })
-        else:
-            # Normal reply, no tool call
-            final_text = agent_reply
-            if final_text.startswith("Final Answer:"):
-                final_text = final_text[len("Final Answer:"):].strip()
-            if MODE == "text":
-                print("\nAgent:", final_text, "\n")
-            else:
-                print("\nAgent (speaking):", final_text, "\n")
-                speak_text(final_text)
-           
-            conversational_memory.append({
-                "role": "agent",
-                "text": final_text
-            })
-       
-     
-           
+        # Sentences are printed (and in voice mode spoken) while the rest of the reply is generated
+        print("\nAgent:", end=" ", flush=True)
 
+        def on_chunk(chunk, source):
+            print(chunk, end=" ", flush=True)
+            if speech is not None and source == "reply":
+                speech.put(chunk)
+
+        result = process_user_turn(conversational_memory, owner_input, on_chunk=on_chunk)
+        print("\n\nAgent (raw):", result["raw_reply"])
+        print(f"(prompt ≈ {result['prompt_tokens']} tokens, {result['llm_calls']} LLM call(s))\n")
+        if speech is not None:
+            speech.wait()  # don't start listening while the agent is still talking
 
 
 if __name__ == "__main__":
@@ -295,19 +422,9 @@ if __name__ == "__main__":
         "confidence": 0.9,
         "explanation": "Excessive vibration detected"
     }
-    human_text = convert_to_human_explainable(diagnosis)
-
-    conversational_memory = []
-    initial_agent_text = (
-        "==============================\n"
-        "🚗 Vehicle Customer Care Agent\n"
-        "==============================\n\n"
-        f"{human_text}\n\n"
-        "Aap service ke liye kab aa sakte hai?"
-    )
-    conversational_memory.append({"role": "agent", "text": initial_agent_text})
-
-    print(initial_agent_text)
+    conversation = prepare_initial_conversation(diagnosis)
+    conversational_memory = conversation["memory"]
+    print(conversation["agent_message"])
 
     try:
         asyncio.run(customer_conversation_loop(conversational_memory))
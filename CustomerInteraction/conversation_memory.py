@@ -0,0 +1,152 @@
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+# Prompt building for long customer sessions. The legacy prompt is the system
+# prompt plus every turn so far, so it grows with each turn. ConversationMemory
+# keeps the facts that matter for booking in a slot state (filled from tool
+# results), folds turns that fall out of a token budget into a short summary,
+# and sends:
+#
+#   [system prompt (same dict every turn)] [slot state + summary] [recent turns]
+#
+# It is still a list of {"role", "text"} turns, so sessions, session_manager and
+# the console loop use it exactly like the plain list they had before.
+#
+#   LLM_HISTORY_TOKENS   token budget for the verbatim recent turns (default 600)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough BPE token count (~4 characters per token); no tokenizer dependency."""
+    return (len(text) + 3) // 4
+
+
+def message_tokens(messages: List[Dict[str, str]]) -> int:
+    # + a few tokens of per-message framing (role, separators)
+    return sum(estimate_tokens(m["content"]) + 4 for m in messages)
+
+
+def to_groq_messages(turns) -> List[Dict[str, str]]:
+    return [
+        {"role": "assistant" if turn["role"] == "agent" else "user", "content": turn["text"]}
+        for turn in turns
+    ]
+
+
+def _compact(text: str, limit: int) -> str:
+    text = " ".join(re.sub(r"={3,}", " ", text).split())
+    return text if len(text) <= limit else text[:limit - 3].rstrip() + "..."
+
+
+class SlotState:
+    """Booking details gathered so far, updated from tool calls and their results."""
+
+    FIELDS = ("city", "center_id", "center_name", "date", "time", "time_window", "available_slots", "booking")
+
+    def __init__(self):
+        for name in self.FIELDS:
+            setattr(self, name, None)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.FIELDS if getattr(self, name) is not None}
+
+    def update_from_tool(self, tool_name: str, args: Dict[str, Any], result: Any):
+        args = args if isinstance(args, dict) else {}
+        if tool_name == "find_center":
+            self.city = args.get("city", self.city)
+            if isinstance(result, dict):
+                self.center_id = result.get("center_id", self.center_id)
+                self.center_name = result.get("name", self.center_name)
+                self.city = result.get("city", self.city)
+        elif tool_name == "normalise_date":
+            if isinstance(result, dict) and "error" not in result:
+                if result.get("date", self.date) != self.date:
+                    self.available_slots = None  # listed for the old date
+                self.date = result.get("date", self.date)
+                # A new date / time window replaces the old time too: never keep a stale exact time
+                self.time = result.get("time")
+                self.time_window = result.get("time_window")
+        elif tool_name == "get_slot":
+            self.center_id = args.get("center_id", self.center_id)
+            self.date = args.get("date", self.date)
+            if isinstance(result, list):
+                self.available_slots = list(result)
+        elif tool_name == "book_slot":
+            if isinstance(result, dict):
+                self.booking = result.get("status")
+                self.time_window = None
+                for name in ("center_id", "date", "time"):
+                    setattr(self, name, result.get(name, getattr(self, name)))
+
+    def render(self) -> str:
+        values = self.to_dict()
+        if not values:
+            return ""
+        parts = [f"{k}={', '.join(v) if isinstance(v, list) else v}" for k, v in values.items()]
+        return "Booking details known so far (use these, do not ask again): " + "; ".join(parts)
+
+
+class ConversationMemory(list):
+    """
+    Conversation turns plus slot state and a summary of older turns.
+    build_messages() sends at most token_budget tokens of verbatim history
+    (but always the last min_recent turns); older turns are summarised
+    extractively, without an extra LLM call.
+    """
+
+    def __init__(self, turns=(), token_budget: Optional[int] = None, min_recent: int = 4,
+                 summary_lines: int = 8):
+        super().__init__(turns)
+        self.token_budget = token_budget or int(os.getenv("LLM_HISTORY_TOKENS", "600"))
+        self.min_recent = min_recent
+        self.summary_lines = summary_lines
+        self.slots = SlotState()
+        self.summary: List[str] = []
+        self.summarized = 0  # leading turns already folded into the summary
+        self.prompt_tokens: List[int] = []  # per owner turn, all LLM calls of the turn
+        self.llm_calls: List[int] = []  # LLM round trips per owner turn
+
+    def _window_start(self) -> int:
+        used, start = 0, len(self)
+        while start > self.summarized:
+            cost = estimate_tokens(self[start - 1]["text"]) + 4
+            if used + cost > self.token_budget and len(self) - start >= self.min_recent:
+                break
+            used += cost
+            start -= 1
+        return start
+
+    def _fold(self, end: int):
+        for i in range(self.summarized, end):
+            turn = self[i]
+            if i == 0 and turn["role"] == "agent":
+                line = "Call opening (vehicle issue explained): " + _compact(turn["text"], 300)
+            else:
+                speaker = "Agent" if turn["role"] == "agent" else "Owner"
+                line = f"{speaker}: " + _compact(turn["text"], 120)
+            self.summary.append(line)
+        # The opening stays; of the rest keep the latest lines (slots hold the facts)
+        if len(self.summary) > self.summary_lines:
+            head = self.summary[:1] if self.summary[0].startswith("Call opening") else []
+            self.summary = head + self.summary[len(self.summary) - self.summary_lines + len(head):]
+        self.summarized = end
+
+    def state_message(self) -> Optional[Dict[str, str]]:
+        parts = []
+        slots = self.slots.render()
+        if slots:
+            parts.append(slots)
+        if self.summary:
+            parts.append("Earlier in this call:\n" + "\n".join(self.summary))
+        return {"role": "user", "content": "\n\n".join(parts)} if parts else None
+
+    def build_messages(self, system_message: Dict[str, str]) -> List[Dict[str, str]]:
+        start = self._window_start()
+        if start > self.summarized:
+            self._fold(start)
+        messages = [system_message]
+        state = self.state_message()
+        if state is not None:
+            messages.append(state)
+        messages.extend(to_groq_messages(self[start:]))
+        return messages
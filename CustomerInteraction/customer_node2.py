@@ -1,35 +1,43 @@
 from .node_base import Node
 import asyncio
-from .agent import customer_conversation_loop, convert_to_human_explainable
+from .agent import customer_conversation_loop, prepare_initial_conversation
+from .conversation_memory import ConversationMemory
 
 class CustomerAgentNode(Node):
-    def __init__(self, name="CustomerAgent"):
+    input_schema = {
+        "vehicle_id": object, "diagnosis": str, "confidence": float, "explanation": str,
+        "memory": list, "user_message": str
+    }
+    output_schema = {"memory": list, "agent_message": str, "session_status": str}
+    optional_inputs = ("vehicle_id", "memory", "user_message")
+
+    def __init__(self, name="CustomerAgent", sessions=None):
         super().__init__(name)
+        # With a SessionManager the node only queues the conversation and returns;
+        # without one it runs the interactive loop inline as before.
+        self.sessions = sessions
 
-    async def _run_async(self, input_data):
-        diagnosis = {
+    def _diagnosis(self, input_data):
+        return {
             "diagnosis": input_data.get("diagnosis", "unknown"),
             "confidence": input_data.get("confidence", 1.0),
             "explanation": input_data.get("explanation", "")
         }
 
-        # Convert to human-readable text
-        human_text = convert_to_human_explainable(diagnosis)
+    async def _run_async(self, input_data):
+        diagnosis = self._diagnosis(input_data)
 
         # Ensure memory is always a list
         conversational_memory = input_data.get("memory")
         if not isinstance(conversational_memory, list):
             conversational_memory = []
+        if not isinstance(conversational_memory, ConversationMemory):
+            # Slot state and the token budget need the managed memory
+            conversational_memory = ConversationMemory(conversational_memory)
 
-        initial_agent_text = (
-            "==============================\n"
-            "🚗 Vehicle Customer Care Agent\n"
-            "==============================\n\n"
-            f"{human_text}\n\n"
-            "Aap service ke liye kab aa sakte hai?"
-        )
-        conversational_memory.append({"role": "agent", "text": initial_agent_text})
-        print(initial_agent_text)
+        opening = prepare_initial_conversation(diagnosis)
+        conversational_memory.extend(opening["memory"])
+        print(opening["agent_message"])
 
         # Run the conversation loop
         await customer_conversation_loop(conversational_memory)
@@ -41,5 +49,16 @@ class CustomerAgentNode(Node):
             "agent_message": conversational_memory[-1]["text"] if conversational_memory else None
         }
 
+    def enqueue(self, input_data):
+        session = self.sessions.enqueue(input_data.get("vehicle_id"), self._diagnosis(input_data))
+        return {
+            **input_data,
+            "session_status": session.status,
+            "memory": session.memory,
+            "agent_message": session.last_agent_message
+        }
+
     def run(self, input_data):
+        if self.sessions is not None:
+            return self.enqueue(input_data)
         return asyncio.run(self._run_async(input_data))
@@ -0,0 +1,317 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+import metrics
+
+# Owner-facing explanations of a diagnosis, cached by what actually changes
+# the text: the diagnosis label, the explanation (which comes from a small
+# fixed set: rule texts, "ML-based ...", "Similar historical anomaly ...")
+# and a coarse confidence bucket. The LLM only ever sees that normalised
+# payload, so a cached text is valid for every diagnosis with the same key.
+#
+#   python -m CustomerInteraction.explanation_cache --prewarm     # generate all known keys
+#   python -m CustomerInteraction.explanation_cache --show
+#
+# Configuration comes from the environment:
+#
+#   EXPLANATION_CACHE_PATH  JSON file the cache is loaded from / written to
+#                           (default $XDG_CACHE_HOME/vehicle-maintenance/explanations.json, empty = memory only)
+#   EXPLANATION_CACHE_TTL   seconds an entry stays valid (default 7 days, 0 = forever)
+#   EXPLANATION_CACHE_SIZE  max entries, least recently used evicted first (default 256)
+
+DEFAULT_PATH = os.path.join(os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+                            "vehicle-maintenance", "explanations.json")
+FILE_VERSION = 1
+
+# (lower bound, name), highest first
+CONFIDENCE_BUCKETS = ((0.85, "high"), (0.6, "medium"), (0.0, "low"))
+
+Key = Tuple[str, str, str]
+
+
+def confidence_bucket(confidence) -> str:
+    try:
+        value = float(confidence)
+    except (TypeError, ValueError):
+        return "unknown"
+    for bound, name in CONFIDENCE_BUCKETS:
+        if value >= bound:
+            return name
+    return CONFIDENCE_BUCKETS[-1][1]
+
+
+def explanation_payload(diagnosis: Dict[str, Any]) -> Dict[str, str]:
+    """The part of a diagnosis the explanation is generated from."""
+    label = str(diagnosis.get("diagnosis", "unknown")).strip().lower().replace(" ", "_").replace("-", "_")
+    return {
+        "diagnosis": label or "unknown",
+        "confidence": confidence_bucket(diagnosis.get("confidence")),
+        "explanation": " ".join(str(diagnosis.get("explanation") or "").split()),
+    }
+
+
+def payload_key(payload: Dict[str, str]) -> Key:
+    return payload["diagnosis"], payload["explanation"].lower(), payload["confidence"]
+
+
+def _env_float(name, default):
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+class ExplanationCache:
+    """
+    Thread-safe LRU of explanation texts with a TTL and optional JSON
+    persistence. Concurrent misses on one key wait for a single generation
+    instead of each calling the LLM. New entries are written save_delay
+    seconds later on a background timer (batching a burst of misses) and at
+    interpreter exit, never on the request path.
+    """
+
+    def __init__(self, capacity: int = 256, ttl: Optional[float] = 7 * 24 * 3600,
+                 path: Optional[str] = None, save_delay: float = 5.0):
+        self.capacity = capacity
+        self.ttl = ttl or None
+        self.path = path or None
+        self.save_delay = save_delay
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Key, Tuple[str, float]]" = OrderedDict()  # key -> (text, created_at)
+        self._inflight: Dict[Key, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._save_timer: Optional[threading.Timer] = None
+        if self.path:
+            self.load()
+            atexit.register(self.flush)
+
+    @classmethod
+    def from_env(cls) -> "ExplanationCache":
+        return cls(
+            capacity=int(_env_float("EXPLANATION_CACHE_SIZE", 256)),
+            ttl=_env_float("EXPLANATION_CACHE_TTL", 7 * 24 * 3600),
+            path=os.getenv("EXPLANATION_CACHE_PATH", DEFAULT_PATH),
+        )
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl is not None and now - created_at > self.ttl
+
+    def _get_locked(self, key: Key) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self._expired(entry[1], time.time()):
+            del self._entries[key]
+            metrics.incr("explanation_cache", result="expired")
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def get(self, key: Key) -> Optional[str]:
+        with self._lock:
+            return self._get_locked(key)
+
+    def put(self, key: Key, text: str, created_at: Optional[float] = None):
+        with self._lock:
+            self._entries[key] = (text, created_at if created_at is not None else time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+            if not self.path:
+                return
+            self._dirty = True
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(self.save_delay, self.flush)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+
+    def flush(self) -> Optional[str]:
+        """Write pending entries now (no-op when nothing changed since the last save)."""
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            dirty, self._dirty = self._dirty, False
+        return self.save() if dirty else None
+
+    def get_or_create(self, diagnosis: Dict[str, Any], generate: Callable[[Dict[str, str]], str]) -> str:
+        """Cached explanation for diagnosis; on a miss generate(payload) is called once per key."""
+        payload = explanation_payload(diagnosis)
+        key = payload_key(payload)
+        while True:
+            with self._lock:
+                text = self._get_locked(key)
+                if text is not None:
+                    self.hits += 1
+                    metrics.incr("explanation_cache", result="hit")
+                    return text
+                event = self._inflight.get(key)
+                owner = event is None
+                if owner:
+                    event = self._inflight[key] = threading.Event()
+                    self.misses += 1
+            if not owner:
+                # Another session is generating this key; if it failed, try ourselves
+                event.wait()
+                continue
+            try:
+                metrics.incr("explanation_cache", result="miss")
+                text = generate(payload)
+                if text:
+                    self.put(key, text)
+                return text
+            finally:
+                with self._lock:
+                    del self._inflight[key]
+                event.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._dirty = self._dirty or bool(self.path)
+
+    def items(self) -> Iterator[Tuple[Key, str, float]]:
+        with self._lock:
+            entries = list(self._entries.items())
+        for key, (text, created_at) in entries:
+            yield key, text, created_at
+
+    def load(self) -> int:
+        """Read entries from path (oldest use first); expired or malformed ones are skipped."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Ignoring unreadable explanation cache {self.path}: {e}")
+            return 0
+        if not isinstance(data, dict) or data.get("version") != FILE_VERSION:
+            return 0
+        entries = data.get("entries")
+        if not isinstance(entries, list):
+            return 0
+        now = time.time()
+        with self._lock:
+            for entry in entries:
+                try:
+                    key = tuple(entry["key"])
+                    text, created_at = entry["text"], float(entry["created_at"])
+                except (KeyError, TypeError, ValueError, IndexError):
+                    continue
+                if len(key) == 3 and text and not self._expired(created_at, now):
+                    self._entries[key] = (text, created_at)
+                    self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+            return len(self._entries)
+
+    def save(self) -> Optional[str]:
+        """Write all entries to path atomically, in LRU order."""
+        if not self.path:
+            return None
+        entries = [{"key": list(key), "text": text, "created_at": created_at}
+                   for key, text, created_at in self.items()]
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": FILE_VERSION, "entries": entries}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+        return self.path
+
+
+_default: Optional[ExplanationCache] = None
+_default_lock = threading.Lock()
+
+
+def get_cache() -> ExplanationCache:
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                _default = ExplanationCache.from_env()
+    return _default
+
+
+def set_cache(cache: Optional[ExplanationCache]):
+    """Replace the process-wide cache (e.g. a memory-only one for benchmarks); None rebuilds it from env."""
+    global _default
+    _default = cache
+
+
+def known_diagnoses():
+    """Every diagnosis payload the pipeline can currently produce, one per cache key."""
+    from Diagnosis_Agent.diagnosis_engine import FAISS_EXPLANATION
+    from Diagnosis_Agent.fallback import ML_EXPLANATION
+    from Diagnosis_Agent.rules import LABELLING_RULES, RUNTIME_RULES
+
+    seen = set()
+    candidates = [rule.result() for rule in RUNTIME_RULES.rules]
+    # FAISS results are only used above 0.6 confidence; ML can come back with anything
+    for label in dict.fromkeys(LABELLING_RULES.labels):
+        for bound, _ in CONFIDENCE_BUCKETS:
+            candidates.append({"diagnosis": label, "confidence": bound, "explanation": ML_EXPLANATION})
+            if bound >= 0.6:
+                candidates.append({"diagnosis": label, "confidence": bound,
+                                   "explanation": FAISS_EXPLANATION.format(top_k=3)})
+    for diagnosis in candidates:
+        key = payload_key(explanation_payload(diagnosis))
+        if key not in seen:
+            seen.add(key)
+            yield diagnosis
+
+
+def prewarm(cache: ExplanationCache, generate: Callable[[Dict[str, str]], str],
+            workers: int = 8, refresh: bool = False) -> Dict[str, Any]:
+    """Fill cache with an explanation for every known diagnosis (concurrently) and save it."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    if refresh:
+        cache.clear()
+    diagnoses = list(known_diagnoses())
+    misses = cache.misses
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(lambda d: cache.get_or_create(d, generate), diagnoses))
+    finally:
+        cache.flush()
+    return {
+        "known": len(diagnoses),
+        "generated": cache.misses - misses,
+        "entries": len(cache),
+        "seconds": time.perf_counter() - start,
+        "path": cache.path,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage the diagnosis explanation cache")
+    parser.add_argument("--prewarm", action="store_true", help="generate explanations for all known diagnoses")
+    parser.add_argument("--refresh", action="store_true", help="with --prewarm: regenerate existing entries too")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent LLM requests while prewarming")
+    parser.add_argument("--show", action="store_true", help="print the cached entries")
+    parser.add_argument("--path", help="cache file (default: EXPLANATION_CACHE_PATH or " + DEFAULT_PATH + ")")
+    args = parser.parse_args()
+
+    if args.path:
+        os.environ["EXPLANATION_CACHE_PATH"] = args.path
+    cache = get_cache()
+    if args.prewarm:
+        from .agent import explain_with_llm
+
+        print(json.dumps(prewarm(cache, explain_with_llm, args.workers, args.refresh), indent=2))
+    if args.show or not args.prewarm:
+        for key, text, created_at in cache.items():
+            age_h = (time.time() - created_at) / 3600
+            print(f"{' | '.join(key)}  ({age_h:.1f} h old)\n  {text}\n")
@@ -0,0 +1,181 @@
+import asyncio
+import os
+import threading
+import weakref
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+import metrics
+
+# Shared LLM client for the customer agent.
+#
+# One Groq client (and one AsyncGroq per event loop) is created on first use
+# and reused by every call, so conversation turns share a keep-alive HTTP
+# connection pool instead of paying connection + TLS setup each time.
+# Configuration comes from the environment:
+#
+#   GROQ_API_KEY            API key
+#   LLM_BASE_URL            alternative endpoint, e.g. the local stub (llm_stub.py)
+#   LLM_MODEL               model name
+#   LLM_TIMEOUT             read timeout in seconds (default 30)
+#   LLM_CONNECT_TIMEOUT     connect timeout in seconds (default 5)
+#   LLM_MAX_RETRIES         retries on connection errors / 429 / 5xx (default 2)
+#   LLM_MAX_CONNECTIONS     pool size (default 100)
+#   LLM_KEEPALIVE_EXPIRY    seconds an idle connection is kept (default 30)
+
+DEFAULT_MODEL = "meta-llama/llama-4-scout-17b-16e-instruct"
+
+
+class LLMConfig:
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None, model: Optional[str] = None,
+                 timeout: Optional[float] = None, connect_timeout: Optional[float] = None,
+                 max_retries: Optional[int] = None, max_connections: Optional[int] = None,
+                 keepalive_expiry: Optional[float] = None):
+        env = os.getenv
+        self.base_url = base_url or env("LLM_BASE_URL") or None
+        # A local stub does not check the key
+        self.api_key = api_key or env("GROQ_API_KEY") or ("stub" if self.base_url else None)
+        self.model = model or env("LLM_MODEL", DEFAULT_MODEL)
+        self.timeout = timeout if timeout is not None else float(env("LLM_TIMEOUT", "30"))
+        self.connect_timeout = connect_timeout if connect_timeout is not None else float(env("LLM_CONNECT_TIMEOUT", "5"))
+        self.max_retries = max_retries if max_retries is not None else int(env("LLM_MAX_RETRIES", "2"))
+        self.max_connections = max_connections if max_connections is not None else int(env("LLM_MAX_CONNECTIONS", "100"))
+        self.keepalive_expiry = (keepalive_expiry if keepalive_expiry is not None
+                                 else float(env("LLM_KEEPALIVE_EXPIRY", "30")))
+
+    def httpx_options(self) -> Dict[str, Any]:
+        import httpx
+
+        return {
+            "timeout": httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            "limits": httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+        }
+
+    def client_options(self) -> Dict[str, Any]:
+        return {
+            "api_key": self.api_key,
+            "base_url": self.base_url,
+            "max_retries": self.max_retries,
+            "timeout": self.httpx_options()["timeout"],
+        }
+
+
+class LLMClient:
+    """Lazily built, process-wide Groq clients sharing one connection pool."""
+
+    def __init__(self, config: Optional[LLMConfig] = None):
+        self._config = config
+        self._lock = threading.Lock()
+        self._client = None
+        # AsyncClient connections belong to the loop that opened them
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    @property
+    def config(self) -> LLMConfig:
+        if self._config is None:
+            self._config = LLMConfig()
+        return self._config
+
+    def sync_client(self):
+        client = self._client
+        if client is None:
+            with self._lock:
+                if self._client is None:
+                    from groq import DefaultHttpxClient, Groq
+
+                    self._client = Groq(
+                        http_client=DefaultHttpxClient(**self.config.httpx_options()),
+                        **self.config.client_options(),
+                    )
+                client = self._client
+        return client
+
+    def async_client(self):
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            from groq import AsyncGroq, DefaultAsyncHttpxClient
+
+            client = AsyncGroq(
+                http_client=DefaultAsyncHttpxClient(**self.config.httpx_options()),
+                **self.config.client_options(),
+            )
+            self._async_clients[loop] = client
+        return client
+
+    def chat(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        completion = self.sync_client().chat.completions.create(
+            model=kwargs.pop("model", self.config.model), messages=messages, **kwargs
+        )
+        return completion.choices[0].message.content
+
+    async def achat(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        completion = await self.async_client().chat.completions.create(
+            model=kwargs.pop("model", self.config.model), messages=messages, **kwargs
+        )
+        return completion.choices[0].message.content
+
+    def stream(self, messages: List[Dict[str, str]], **kwargs) -> Iterator[str]:
+        """Reply text deltas as the model generates them."""
+        chunks = self.sync_client().chat.completions.create(
+            model=kwargs.pop("model", self.config.model), messages=messages, stream=True, **kwargs
+        )
+        for chunk in chunks:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def astream(self, messages: List[Dict[str, str]], **kwargs) -> AsyncIterator[str]:
+        chunks = await self.async_client().chat.completions.create(
+            model=kwargs.pop("model", self.config.model), messages=messages, stream=True, **kwargs
+        )
+        async for chunk in chunks:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def close(self):
+        """Close the sync pool; the next call builds a new client (e.g. after changing env config)."""
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+            self._client = None
+            self._config = None
+
+    async def aclose(self):
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.close()
+
+
+_default = LLMClient()
+
+
+def get_client() -> LLMClient:
+    return _default
+
+
+def chat(messages: List[Dict[str, str]], **kwargs) -> str:
+    return _default.chat(messages, **kwargs)
+
+
+async def achat(messages: List[Dict[str, str]], **kwargs) -> str:
+    t = metrics.start()
+    try:
+        return await _default.achat(messages, **kwargs)
+    finally:
+        metrics.stop("llm.achat", t)
+
+
+def stream_chat(messages: List[Dict[str, str]], **kwargs) -> Iterator[str]:
+    return _default.stream(messages, **kwargs)
+
+
+def astream_chat(messages: List[Dict[str, str]], **kwargs) -> AsyncIterator[str]:
+    return _default.astream(messages, **kwargs)
+
+
+def complete(content: str, **kwargs) -> str:
+    """Single user message -> reply text."""
+    return chat([{"role": "user", "content": content}], **kwargs)
@@ -0,0 +1,234 @@
+import json
+import re
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+# Minimal stand-in for the Groq chat completions endpoint, for offline runs
+# and latency measurements:
+#
+#   python -m CustomerInteraction.llm_stub --port 8765 --latency-ms 150 --token-ms 20
+#   LLM_BASE_URL=http://127.0.0.1:8765 python master.py
+#
+# Replies come from `reply_fn(messages)`; the default acknowledges the last
+# user message, agent_reply (--replies agent) plays a tool-calling agent. `latency_ms` is paid before the first token and `token_ms`
+# per word, so a streamed reply (stream=true, server-sent events) starts
+# arriving long before a blocking one completes. The server speaks HTTP/1.1 keep-alive and counts accepted
+# connections (GET /stats), so a test can tell whether the client reused them.
+
+CHAT_PATH = "/openai/v1/chat/completions"
+
+
+def default_reply(messages: List[Dict[str, str]]) -> str:
+    last = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+    return (
+        f"Final Answer: Theek hai, maine note kar liya: {last[:80]}. "
+        "Aapki gaadi mein bearing ki vibration normal se zyada hai. "
+        "Kal subah 10 baje service center par slot khaali hai. "
+        "Kya main aapke liye booking confirm kar doon?"
+    )
+
+
+_CITIES = ("shamli", "muzaffarnagar", "meerut")
+
+
+def _action(tool: str, args: Dict[str, str]) -> str:
+    return "Action: " + json.dumps({"tool": tool, "args": args})
+
+
+def agent_reply(messages: List[Dict[str, str]]) -> str:
+    """
+    Behaves like a model following the agent's SYSTEM_PROMPT: at most one
+    tool call per owner message (city -> find_center, date/time phrase ->
+    normalise_date, slot question -> get_slot, yes -> book_slot), then a
+    final answer that repeats the tool result.
+    """
+    last = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+    if last.startswith("Now respond with"):
+        # With center, date and time settled (slot state from ConversationMemory) offer that booking
+        state = next((m["content"] for m in messages if m["content"].startswith("Booking details known")), "")
+        slots = dict(re.findall(r"(\w+)=([^;\n]+)", state))
+        if all(k in slots for k in ("center_id", "date", "time")) and "booking" not in slots:
+            return (f"Final Answer: {slots.get('center_name', slots['center_id'])} mein {slots['date']} ko "
+                    f"{slots['time']} baje slot khaali hai. Kya main booking confirm kar doon?")
+        results = [m["content"] for m in messages if m["content"].startswith("Tool ")]
+        return f"Final Answer: Ji, maine check kar liya. {results[-1] if results else ''} Aage kya karein?"
+    text = last.lower()
+    context = "\n".join(m["content"] for m in messages[1:])  # everything after the system prompt
+    city = next((c for c in _CITIES if re.search(rf"\b{c}\b", text)), None)
+    if city:
+        return _action("find_center", {"city": city})
+    if re.search(r"\b(aaj|kal|parso|baje)\b", text):
+        return _action("normalise_date", {"date": last})
+    centers = re.findall(r"SC\d{3}", context)
+    dates = re.findall(r"\d{4}-\d{2}-\d{2}", context)
+    hours = re.findall(r"(\d{1,2})\s*baje", context)
+    if re.search(r"\b(slot|khaali|available)\b", text) and centers and dates:
+        return _action("get_slot", {"center_id": centers[-1], "date": dates[-1]})
+    if re.search(r"\b(haan|confirm|book)\b", text) and centers and dates and hours:
+        return _action("book_slot", {"center_id": centers[-1], "date": dates[-1], "time": f"{int(hours[-1]):02d}:00"})
+    return default_reply(messages)
+
+
+REPLIES = {"echo": default_reply, "agent": agent_reply}
+
+
+def tokens(text: str) -> List[str]:
+    """Word-sized pieces, whitespace kept, so joining them gives the text back."""
+    return re.findall(r"\S+\s*|\s+", text)
+
+
+def chunk_body(delta: Dict, model: str, finish_reason: Optional[str] = None) -> Dict:
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+
+def completion_body(content: str, model: str) -> Dict:
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Default backlog is 5: a burst of concurrent sessions connecting would hit SYN retries
+    request_queue_size = 256
+
+
+class StubLLMServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0,
+                 reply_fn: Optional[Callable[[List[Dict[str, str]]], str]] = None, token_ms: float = 0.0):
+        self.latency = latency_ms / 1000.0
+        self.token_delay = token_ms / 1000.0
+        self.reply_fn = reply_fn or default_reply
+        self.connections = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self.httpd = _Server((host, port), self._handler())
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+
+            def setup(self):
+                super().setup()
+                # Headers and body are separate writes; without this, Nagle + delayed ACK adds ~40 ms
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                self.counted = False
+
+            def do_GET(self):
+                if self.path != "/stats":
+                    self._send(404, {"error": {"message": f"unknown path {self.path}"}})
+                    return
+                with server._lock:
+                    stats = {"connections": server.connections, "requests": server.requests}
+                self._send(200, stats)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.path != CHAT_PATH:
+                    self._send(404, {"error": {"message": f"unknown path {self.path}"}})
+                    return
+                request = json.loads(body or b"{}")
+                with server._lock:
+                    server.requests += 1
+                    # One handler per connection: count the ones that carried a chat request
+                    if not self.counted:
+                        server.connections += 1
+                        self.counted = True
+                if server.latency:
+                    time.sleep(server.latency)
+                content = server.reply_fn(request.get("messages", []))
+                model = request.get("model", "stub")
+                if request.get("stream"):
+                    self._stream(content, model)
+                    return
+                time.sleep(server.token_delay * len(tokens(content)))
+                self._send(200, completion_body(content, model))
+
+            def _stream(self, content, model):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                self._event(chunk_body({"role": "assistant", "content": ""}, model))
+                for token in tokens(content):
+                    if server.token_delay:
+                        time.sleep(server.token_delay)
+                    self._event(chunk_body({"content": token}, model))
+                self._event(chunk_body({}, model, finish_reason="stop"))
+                self._chunk(b"data: [DONE]\n\n")
+                self._chunk(b"")
+
+            def _event(self, payload):
+                self._chunk(b"data: " + json.dumps(payload).encode() + b"\n\n")
+
+            def _chunk(self, data: bytes):
+                self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+
+            def _send(self, status, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "StubLLMServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="llm-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve a stub Groq chat completions endpoint")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="0 picks a free port")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay before the first token")
+    parser.add_argument("--token-ms", type=float, default=0.0, help="generation time per word")
+    parser.add_argument("--replies", choices=sorted(REPLIES), default="echo", help="reply behaviour")
+    args = parser.parse_args()
+
+    server = StubLLMServer(args.host, args.port, args.latency_ms, REPLIES[args.replies], args.token_ms)
+    print(f"Stub LLM listening on {server.base_url} (set LLM_BASE_URL={server.base_url})", flush=True)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
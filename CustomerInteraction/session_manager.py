@@ -0,0 +1,191 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+from .agent import prepare_initial_conversation, process_user_turn
+
+# Session lifecycle: pending (queued, no agent message yet) -> active (waiting
+# for the owner's reply) -> closed. Every LLM call happens on a worker thread,
+# so enqueueing from the telemetry path never blocks on Groq or on input().
+PENDING, ACTIVE, CLOSED = "pending", "active", "closed"
+
+
+class CustomerSession:
+    def __init__(self, vehicle_id: str, diagnosis: Dict[str, Any]):
+        self.vehicle_id = vehicle_id
+        self.diagnosis = diagnosis
+        self.memory: List[Dict[str, str]] = []
+        self.status = PENDING
+        self.last_agent_message: Optional[str] = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+
+        self.inbox = deque()      # (kind, payload, Future) work items, run in order
+        self.scheduled = False    # True while the session sits in the work queue
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "vehicle_id": self.vehicle_id,
+            "status": self.status,
+            "diagnosis": self.diagnosis,
+            "memory": list(self.memory),
+            "agent_message": self.last_agent_message,
+        }
+
+
+class SessionManager:
+    """
+    Customer conversations keyed by vehicle ID, driven turn by turn from a
+    work queue. A session is queued whenever it has work in its inbox; a worker
+    runs one item and re-queues it if more is waiting, so turns for one
+    vehicle stay ordered while different vehicles proceed in parallel.
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        open_fn: Callable = prepare_initial_conversation,
+        turn_fn: Callable = process_user_turn,
+        on_message: Optional[Callable[[str, str], None]] = None,
+    ):
+        self.open_fn = open_fn
+        self.turn_fn = turn_fn
+        self.on_message = on_message
+
+        self._sessions: Dict[str, CustomerSession] = {}
+        self._lock = threading.Lock()
+        self._work: "queue.Queue[Optional[CustomerSession]]" = queue.Queue()
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"customer-session-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    # ---------------- public API ----------------
+    def enqueue(self, vehicle_id: str, diagnosis: Dict[str, Any]) -> CustomerSession:
+        """Open a conversation for vehicle_id unless one is already open. Never blocks."""
+        with self._lock:
+            session = self._sessions.get(vehicle_id)
+            if session is not None and session.status != CLOSED:
+                # Repeated alerts while a call is pending/active just refresh the diagnosis
+                session.diagnosis = diagnosis
+                return session
+            session = CustomerSession(vehicle_id, diagnosis)
+            self._sessions[vehicle_id] = session
+            self._push(session, "open", diagnosis)
+            return session
+
+    def submit_turn(self, vehicle_id: str, user_message: str) -> Future:
+        """Queue the owner's reply; the Future resolves to the process_user_turn result."""
+        with self._lock:
+            session = self._sessions.get(vehicle_id)
+            if session is None or session.status == CLOSED:
+                raise KeyError(f"No open customer session for vehicle {vehicle_id}")
+            return self._push(session, "turn", user_message)
+
+    def close(self, vehicle_id: str) -> Optional[CustomerSession]:
+        with self._lock:
+            session = self._sessions.get(vehicle_id)
+            if session is not None:
+                session.status = CLOSED
+                session.updated_at = time.time()
+            return session
+
+    def get(self, vehicle_id: str) -> Optional[CustomerSession]:
+        return self._sessions.get(vehicle_id)
+
+    def open_sessions(self) -> List[CustomerSession]:
+        with self._lock:
+            return [s for s in self._sessions.values() if s.status != CLOSED]
+
+    def shutdown(self, wait: bool = True):
+        for _ in self._threads:
+            self._work.put(None)
+        if wait:
+            for t in self._threads:
+                t.join()
+
+    # ---------------- internals ----------------
+    def _push(self, session: CustomerSession, kind: str, payload) -> Future:
+        # Caller holds self._lock
+        future = Future()
+        session.inbox.append((kind, payload, future))
+        if not session.scheduled:
+            session.scheduled = True
+            self._work.put(session)
+        return future
+
+    def _worker(self):
+        while True:
+            session = self._work.get()
+            if session is None:
+                return
+
+            with self._lock:
+                kind, payload, future = session.inbox.popleft()
+                closed = session.status == CLOSED
+
+            if closed:
+                future.cancel()
+            elif future.set_running_or_notify_cancel():
+                try:
+                    result = self._run(session, kind, payload)
+                except Exception as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+                    if self.on_message is not None:
+                        try:
+                            self.on_message(session.vehicle_id, result["agent_message"])
+                        except Exception as e:
+                            # A broken callback must not kill the worker and leave the session scheduled
+                            print(f"⚠️ on_message failed for {session.vehicle_id}: {e!r}")
+
+            with self._lock:
+                if session.inbox:
+                    self._work.put(session)
+                else:
+                    session.scheduled = False
+
+    def _run(self, session: CustomerSession, kind: str, payload) -> Dict[str, Any]:
+        if kind == "open":
+            result = self.open_fn(payload)
+            session.memory = result["memory"]
+        else:
+            turns = len(session.memory)
+            try:
+                result = self.turn_fn(session.memory, payload)
+            except Exception:
+                # turn_fn appends the owner message before calling the LLM; don't leave it unanswered
+                del session.memory[turns:]
+                raise
+        session.last_agent_message = result["agent_message"]
+        session.status = ACTIVE
+        session.updated_at = time.time()
+        return result
+
+
+def console_loop(sessions: SessionManager, prompt: str = "Owner (you): "):
+    """
+    Read owner replies from stdin and route them to the most recently opened
+    session. Meant for a background thread next to the telemetry loop.
+    """
+    while True:
+        try:
+            owner_input = input(prompt)
+        except EOFError:
+            return
+        open_sessions = sessions.open_sessions()
+        if not open_sessions:
+            print("(no customer session is open)")
+            continue
+        vehicle_id = max(open_sessions, key=lambda s: s.created_at).vehicle_id
+        if owner_input.lower() == "exit":
+            sessions.close(vehicle_id)
+            print(f"🤖 Customer session for {vehicle_id} closed.")
+            continue
+        sessions.submit_turn(vehicle_id, owner_input)
@@ -0,0 +1,136 @@
+import re
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from .tools.find_nearest import CITY_COORDS
+
+# Local intent / entity extraction for the booking flow. Owner replies like
+# "kal dopahar", "Meerut mein hoon" or "haan, book kar do" map onto tool
+# calls without any judgement; running those tools here, before the LLM,
+# means the LLM is only asked to phrase the reply (one round trip instead of
+# "Action: {...}" + a second call for the final answer). Anything the
+# extractor is not sure about is left to the LLM as before.
+#
+# Tools are called through their plain functions: the langchain wrappers in
+# tools.py cost ~1s to import and add nothing here.
+
+_CITY = re.compile(r"\b(" + "|".join(sorted(map(re.escape, CITY_COORDS), key=len, reverse=True)) + r")\b")
+_DAY = re.compile(r"\b(aaj|kal|parso)\b")
+# An exact time needs "baje" or HH:MM, so counts and other numbers don't qualify
+_TIME = re.compile(r"\b(\d{1,2})(?::(\d{2}))?\s*baje\b|\b(\d{1,2}):(\d{2})\b")
+_SLOTS_ASKED = re.compile(r"\b(slot|slots|khaali|khali|available|free)\b")
+_CONFIRM = re.compile(r"\b(haan|haa|han|yes|theek hai|thik hai|confirm|book kar|kar do|kardo)\b")
+_DENY = re.compile(r"\b(nahi|nahin|no|mat|cancel)\b")
+_DATE = re.compile(r"\b\d{4}-\d{2}-\d{2}\b")
+DAY_OFFSET = {"aaj": 0, "kal": 1, "parso": 2}
+
+# A bare confirmation is made of these words only and has at least one of
+# _YES in it: "haan", "haan ji, book kar do", "confirm karo please".
+# "ok, par pehle price batao" is not one; the LLM decides what that means.
+_CONFIRM_WORDS = {"haan", "haa", "han", "ha", "yes", "ji", "theek", "thik", "hai", "confirm", "book", "kar",
+                  "karo", "kardo", "do", "dijiye", "please", "bilkul", "sahi"}
+_YES = {"haan", "haa", "han", "yes", "confirm", "bilkul"}
+
+ToolCall = Tuple[str, Dict[str, Any], Any]
+
+
+def extract(text: str) -> Dict[str, Any]:
+    """City, date phrase, exact time and intent found in one owner message."""
+    lowered = text.lower()
+    entities: Dict[str, Any] = {}
+    city = _CITY.search(lowered)
+    if city:
+        entities["city"] = city.group(1)
+    if _DAY.search(lowered):
+        entities["date_phrase"] = lowered
+    time = _TIME.search(lowered)
+    if time:
+        hour, minute = (time.group(1), time.group(2)) if time.group(1) else (time.group(3), time.group(4))
+        if int(hour) < 24 and int(minute or 0) < 60:
+            entities["time"] = f"{int(hour):02d}:{minute or '00'}"
+    if _SLOTS_ASKED.search(lowered):
+        entities["asks_slots"] = True
+    if _DENY.search(lowered):
+        entities["intent"] = "deny"
+    elif _CONFIRM.search(lowered):
+        entities["intent"] = "confirm"
+        words = re.findall(r"[a-z]+", lowered)
+        if not re.search(r"\d", lowered) and set(words) <= _CONFIRM_WORDS and _YES & set(words):
+            entities["bare_confirm"] = True
+    return entities
+
+
+def _times(text: str) -> set:
+    found = set()
+    for m in _TIME.finditer(text):
+        hour, minute = (m.group(1), m.group(2)) if m.group(1) else (m.group(3), m.group(4))
+        found.add(f"{int(hour):02d}:{minute or '00'}")
+    return found
+
+
+def _dates(text: str, today: date) -> set:
+    found = set(_DATE.findall(text))
+    found.update(str(today + timedelta(days=DAY_OFFSET[w])) for w in _DAY.findall(text))
+    return found
+
+
+def proposes(agent_text: Optional[str], slots, today: Optional[date] = None) -> bool:
+    """
+    True when the agent's message offers exactly the booking in slots: it
+    names the center (id or name) and mentions no date or time other than
+    slots.date / slots.time. "12 baje ya 1 baje?" is not a proposal.
+    """
+    if not agent_text or not (slots.center_id and slots.date and slots.time):
+        return False
+    text = agent_text.lower()
+    named = [v.lower() for v in (slots.center_id, slots.center_name) if v]
+    return (any(v in text for v in named)
+            and _dates(text, today or date.today()) == {slots.date}
+            and _times(text) == {slots.time})
+
+
+def fill(slots, text: str, last_agent_text: Optional[str] = None, book: bool = True) -> List[ToolCall]:
+    """
+    Run the tool calls the message clearly asks for, updating slots (a
+    SlotState) along the way. Returns [(tool, args, result)]; empty means the
+    message needs the LLM to decide. last_agent_text is the agent turn the
+    owner is answering; book_slot only runs on a bare yes to it.
+    """
+    from .tools.book_slot import book_slot
+    from .tools.find_available_slots import get_available_slots
+    from .tools.find_nearest import find_nearest_service_center
+    from .tools.normalise_date import normalize_datetime
+
+    entities = extract(text)
+    calls: List[ToolCall] = []
+
+    def call(tool: str, fn, **args):
+        result = fn(**args)
+        slots.update_from_tool(tool, args, result)
+        calls.append((tool, args, result))
+        return result
+
+    if "city" in entities:
+        call("find_center", find_nearest_service_center, city=entities["city"])
+    if "date_phrase" in entities:
+        call("normalise_date", normalize_datetime, text=entities["date_phrase"])
+    elif "time" in entities and slots.date:
+        # A time on its own keeps the date already agreed, as the system prompt asks
+        slots.time, slots.time_window = entities["time"], None
+
+    new_details = calls or "time" in entities
+    if slots.center_id and slots.date and (new_details or entities.get("asks_slots")):
+        call("get_slot", get_available_slots, center_id=slots.center_id, date=slots.date)
+
+    # Booking writes, so it needs a bare yes to the exact center/date/time the
+    # agent just offered; anything else (a condition, a question, new details)
+    # goes back to the LLM
+    if (book and entities.get("bare_confirm") and not new_details and slots.booking is None
+            and proposes(last_agent_text, slots)
+            and (slots.available_slots is None or slots.time in slots.available_slots)):
+        call("book_slot", book_slot, center_id=slots.center_id, date=slots.date, time=slots.time)
+    return calls
+
+
+def describe(calls: List[ToolCall]) -> Optional[str]:
+    return ", ".join(tool for tool, _, _ in calls) or None
@@ -0,0 +1,139 @@
+import queue
+import re
+import threading
+import time
+from typing import Callable, List, Optional
+
+# Streaming reply path: LLM deltas -> ReplyStream (tool-call / "Final Answer:"
+# detection) -> SentenceChunker -> console or SpeechQueue. The first sentence
+# reaches the owner while the rest of the reply is still being generated.
+
+ACTION_PREFIX = "Action:"
+FINAL_PREFIX = "Final Answer:"
+
+# Sentence end: terminal punctuation (incl. the Devanagari danda) plus closing quotes/brackets, then whitespace
+_SENTENCE_END = re.compile(r"[.!?।]+[\"')\]]*\s+|\n+")
+
+
+class SentenceChunker:
+    """
+    Cuts a growing text into sentence-sized chunks. Chunks shorter than
+    min_chars are merged with the next sentence (so "Dr." or "1." don't become
+    their own utterance); text running past max_chars without a sentence end
+    is cut at the last comma or space so speech can start anyway.
+    """
+
+    def __init__(self, min_chars: int = 12, max_chars: int = 160):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self._buffer = ""
+
+    def feed(self, delta: str) -> List[str]:
+        self._buffer += delta
+        chunks = []
+        start = 0
+        for match in _SENTENCE_END.finditer(self._buffer):
+            if match.end() - start >= self.min_chars:
+                chunks.append(self._buffer[start:match.end()].strip())
+                start = match.end()
+        self._buffer = self._buffer[start:]
+
+        while len(self._buffer) > self.max_chars:
+            cut = max(self._buffer.rfind(",", 0, self.max_chars), self._buffer.rfind(" ", 0, self.max_chars))
+            cut = cut + 1 if cut > 0 else self.max_chars
+            chunks.append(self._buffer[:cut].strip())
+            self._buffer = self._buffer[cut:]
+        return [c for c in chunks if c]
+
+    def flush(self) -> List[str]:
+        rest, self._buffer = self._buffer.strip(), ""
+        return [rest] if rest else []
+
+
+class ReplyStream:
+    """
+    Consumes one streamed agent reply. Nothing is emitted until it is clear
+    whether the reply is a tool call ("Action: {...}"), which is never shown
+    to the owner; otherwise a leading "Final Answer:" is dropped and sentence
+    chunks go to on_chunk as they complete.
+    """
+
+    def __init__(self, on_chunk: Callable[[str], None], chunker: Optional[SentenceChunker] = None):
+        self.on_chunk = on_chunk
+        self.chunker = chunker or SentenceChunker()
+        self.is_action: Optional[bool] = None
+        self.first_chunk_at: Optional[float] = None
+        self._parts: List[str] = []
+        self._pending = ""
+
+    def feed(self, delta: str):
+        self._parts.append(delta)
+        if self.is_action is None:
+            self._pending += delta
+            head = self._pending.lstrip()
+            # Still a possible prefix of either marker: wait for more text
+            if any(p.startswith(head) and len(head) < len(p) for p in (ACTION_PREFIX, FINAL_PREFIX)):
+                return
+            self.is_action = head.startswith(ACTION_PREFIX)
+            if self.is_action:
+                return
+            delta = head[len(FINAL_PREFIX):].lstrip() if head.startswith(FINAL_PREFIX) else head
+            self._pending = ""
+        if not self.is_action:
+            self._emit(self.chunker.feed(delta))
+
+    def close(self) -> str:
+        """Flush the last chunk and return the full raw reply."""
+        if self.is_action is None:
+            # Reply shorter than either marker
+            self.is_action = False
+            head = self._pending.lstrip()
+            self._emit(self.chunker.feed(head[len(FINAL_PREFIX):] if head.startswith(FINAL_PREFIX) else head))
+        if not self.is_action:
+            self._emit(self.chunker.flush())
+        return "".join(self._parts)
+
+    def _emit(self, chunks: List[str]):
+        for chunk in chunks:
+            if self.first_chunk_at is None:
+                self.first_chunk_at = time.perf_counter()
+            self.on_chunk(chunk)
+
+
+class SpeechQueue:
+    """
+    Speaks queued chunks in order on a background thread, so synthesis of one
+    sentence overlaps with generation of the next.
+    """
+
+    def __init__(self, speak_fn: Callable[[str], None]):
+        self.speak_fn = speak_fn
+        self.first_audio_at: Optional[float] = None
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="speech-queue", daemon=True)
+        self._thread.start()
+
+    def put(self, text: str):
+        self._queue.put(text)
+
+    def wait(self):
+        """Block until everything queued so far has been spoken."""
+        self._queue.join()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            text = self._queue.get()
+            try:
+                if text is None:
+                    return
+                if self.first_audio_at is None:
+                    self.first_audio_at = time.perf_counter()
+                self.speak_fn(text)
+            except Exception as e:
+                print("⚠️ Speech synthesis failed:", e)
+            finally:
+                self._queue.task_done()
@@ -1,38 +1,119 @@
-from .rules import rule_based_diagnosis
-from .fallback import ml_diagnosis
+from .rules import RUNTIME_RULES, rule_based_diagnosis
+from .fallback import ml_diagnosis, ml_diagnosis_batch
+from .faiss_index import get_faiss_holder
+import numpy as np
+import metrics
+from model_registry import registry
 
-def faiss_diagnosis(latent_vector, top_k=3):
-    import faiss, joblib, numpy as np
+# Lets registry.warm() read the index ahead of the first search
+registry.register("diagnosis.faiss", lambda: get_faiss_holder().get())
 
-    index = faiss.read_index("models/faiss.index")
-    meta = joblib.load("models/faiss_meta.pkl")
+FAISS_EXPLANATION = "Similar historical anomaly found ({top_k} neighbors)"
 
-    q = np.array(latent_vector, dtype="float32").reshape(1, -1)
-    distances, indices = index.search(q, top_k)
+def faiss_diagnosis(latent_vector, top_k=3):
+    state, distances, indices = get_faiss_holder().search(latent_vector, top_k)
 
-    matches = meta.iloc[indices[0]]
+    neighbours = indices[0][indices[0] >= 0]
+    votes = np.bincount(state.codes[neighbours], minlength=len(state.classes))
 
-    diagnosis = matches["diagnosis"].mode()[0]
+    # Ties resolve to the alphabetically first label, same as pandas mode()
+    diagnosis = str(state.classes[votes.argmax()])
     confidence = 1 / (1 + distances[0][0])
 
     return {
         "diagnosis": diagnosis,
         "confidence": float(confidence),
-        "explanation": f"Similar historical anomaly found ({top_k} neighbors)"
+        "explanation": FAISS_EXPLANATION.format(top_k=top_k)
     }
 
 
+def faiss_diagnosis_batch(latent_vectors, top_k=3):
+    """faiss_diagnosis for many rows with one index.search call; results keep input order."""
+    state, distances, indices = get_faiss_holder().search(latent_vectors, top_k)
+
+    # Majority vote per row; argmax takes the lowest class code on ties, like the single-row path
+    valid = indices >= 0
+    votes = np.zeros((len(indices), len(state.classes)), dtype=np.int64)
+    rows = np.broadcast_to(np.arange(len(indices))[:, np.newaxis], indices.shape)
+    np.add.at(votes, (rows[valid], state.codes[indices[valid]]), 1)
+    diagnoses = state.classes[votes.argmax(axis=1)]
+    confidence = 1 / (1 + distances[:, 0])
+
+    explanation = FAISS_EXPLANATION.format(top_k=top_k)
+    return [
+        {"diagnosis": str(d), "confidence": float(c), "explanation": explanation}
+        for d, c in zip(diagnoses, confidence)
+    ]
+
+
 def diagnose(sensor_row, latent_vector, recon_error):
+    t = metrics.start()
     result = rule_based_diagnosis(sensor_row)
+    t = metrics.lap("diagnose.rules", t)
     if result:
+        metrics.incr("diagnose_path", source="rules")
         return {**result, "source": "rules"}
     
     if recon_error > 0.001:
         result = faiss_diagnosis(latent_vector)
+        t = metrics.lap("diagnose.faiss", t)
         if result["confidence"] > 0.6:
+            metrics.incr("diagnose_path", source="faiss")
             result["source"] = "faiss"
             return result
 
     result = ml_diagnosis(latent_vector,recon_error)
+    metrics.stop("diagnose.ml", t)
+    metrics.incr("diagnose_path", source="ml")
     result["source"] = "ml"
     return result
+
+
+def diagnose_batch(sensor_rows, latent_vectors, recon_errors):
+    """
+    diagnose() for many rows in grouped passes: the rule table over the whole
+    array, one FAISS search for the unresolved rows with a reconstruction
+    error above 0.001, then one ML predict_proba for whatever is left.
+    Results come back in input order, each tagged with its source.
+    """
+    n = len(sensor_rows)
+    results = [None] * n
+    if n == 0:
+        return results
+    recon_errors = np.asarray(recon_errors, dtype=np.float64)
+
+    t = metrics.start()
+    matched = RUNTIME_RULES.evaluate_batch(sensor_rows)
+    rule_results = [r.result() for r in RUNTIME_RULES.rules]
+    unresolved = []
+    for i, m in enumerate(matched):
+        if m < len(rule_results):
+            results[i] = {**rule_results[m], "source": "rules"}
+        else:
+            unresolved.append(i)
+    t = metrics.lap("diagnose_batch.rules", t)
+    metrics.incr("diagnose_path", n - len(unresolved), source="rules")
+
+    remaining = []
+    candidates = [i for i in unresolved if recon_errors[i] > 0.001]
+    if candidates:
+        found = faiss_diagnosis_batch([latent_vectors[i] for i in candidates])
+        t = metrics.lap("diagnose_batch.faiss", t)
+        for i, result in zip(candidates, found):
+            if result["confidence"] > 0.6:
+                result["source"] = "faiss"
+                results[i] = result
+            else:
+                remaining.append(i)
+        metrics.incr("diagnose_path", len(candidates) - len(remaining), source="faiss")
+    remaining += [i for i in unresolved if not recon_errors[i] > 0.001]
+
+    if remaining:
+        remaining.sort()
+        found = ml_diagnosis_batch([latent_vectors[i] for i in remaining], recon_errors[remaining])
+        metrics.stop("diagnose_batch.ml", t)
+        metrics.incr("diagnose_path", len(remaining), source="ml")
+        for i, result in zip(remaining, found):
+            result["source"] = "ml"
+            results[i] = result
+    return results
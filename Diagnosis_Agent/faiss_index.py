@@ -0,0 +1,224 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.path.join(BASE_DIR, "models")
+INDEX_PATH = os.path.join(MODEL_DIR, "faiss.index")
+LABELS_PATH = os.path.join(MODEL_DIR, "faiss_labels.npz")
+
+
+def save_labels(diagnoses, path=LABELS_PATH):
+    """Store diagnosis labels as int codes + class names, written atomically."""
+    classes, codes = np.unique(np.asarray(diagnoses, dtype=str), return_inverse=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, codes=codes.astype(np.int32), classes=classes)
+    os.replace(tmp_path, path)
+
+
+def write_index_atomic(index, path=INDEX_PATH):
+    import faiss
+
+    tmp_path = path + ".tmp"
+    faiss.write_index(index, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _file_signature(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _env_int(name):
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+class IndexState:
+    def __init__(self, index, codes, classes, signature, read_only=False):
+        self.index = index
+        self.codes = codes
+        self.classes = classes
+        self.signature = signature
+        self.read_only = read_only  # memory-mapped, must be copied before adding
+        self._codes_buf = codes
+        self._class_codes = {str(c): i for i, c in enumerate(classes)}
+
+    def append_labels(self, labels):
+        # Readers may use codes/classes outside the holder's lock, so both only
+        # grow: new classes go in before codes refer to them, and codes is a
+        # view of a doubling buffer that an older view never sees rewritten.
+        new = []
+        for label in labels:
+            code = self._class_codes.get(label)
+            if code is None:
+                code = self._class_codes[label] = len(self.classes)
+                self.classes = np.append(self.classes, label)
+            new.append(code)
+        n = len(self.codes)
+        if n + len(new) > len(self._codes_buf):
+            buf = np.empty(max(2 * len(self._codes_buf), n + len(new), 16), dtype=np.int32)
+            buf[:n] = self.codes
+            self._codes_buf = buf
+        self._codes_buf[n:n + len(new)] = new
+        self.codes = self._codes_buf[:n + len(new)]
+
+
+class FaissIndexHolder:
+    """
+    Keeps the diagnosis FAISS index and its labels in memory. Files are
+    re-checked at most every `check_interval` seconds; when they change a new
+    state is loaded off to the side and swapped in with a single assignment,
+    so concurrent searches always see a consistent index/labels pair.
+
+    add() grows the served index in place (DiagnosisHistory appends confirmed
+    anomalies this way) and save() writes it back; searches and adds share a
+    lock, since a FAISS index can't be searched while it is being added to.
+    """
+
+    def __init__(self, index_path=INDEX_PATH, labels_path=LABELS_PATH, mmap=None,
+                 check_interval=1.0, nprobe=None, ef_search=None):
+        self.index_path = index_path
+        self.labels_path = labels_path
+        if mmap is None:
+            mmap = os.getenv("FAISS_MMAP", "0") == "1"
+        self.mmap = mmap
+        self.check_interval = check_interval
+        # Search-time overrides for IVF / HNSW indexes; None keeps what was saved
+        self.nprobe = nprobe if nprobe is not None else _env_int("FAISS_NPROBE")
+        self.ef_search = ef_search if ef_search is not None else _env_int("FAISS_EF_SEARCH")
+
+        self._lock = threading.Lock()
+        self._index_lock = threading.Lock()
+        self._state = None
+        self._next_check = 0.0
+
+    def _signature(self):
+        return _file_signature(self.index_path), _file_signature(self.labels_path)
+
+    def _read_index(self, mmap):
+        """(index, read_only)"""
+        import faiss
+
+        if mmap:
+            flag = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+            try:
+                return faiss.read_index(self.index_path, flag | faiss.IO_FLAG_READ_ONLY), True
+            except RuntimeError:
+                # Index type without mmap support, fall back to a normal read
+                pass
+        return faiss.read_index(self.index_path), False
+
+    def _tune(self, index):
+        if self.nprobe is not None or self.ef_search is not None:
+            from .index_builder import set_search_params
+
+            set_search_params(index, nprobe=self.nprobe, ef_search=self.ef_search)
+
+    def _read_labels(self):
+        with np.load(self.labels_path) as data:
+            return data["codes"], data["classes"]
+
+    def _load(self, signature):
+        index, read_only = self._read_index(self.mmap)
+        self._tune(index)
+        codes, classes = self._read_labels()
+        if len(codes) < index.ntotal:
+            raise ValueError(
+                f"FAISS index has {index.ntotal} vectors but only {len(codes)} labels"
+            )
+        # Extra labels belong to vectors that never made it into the index
+        return IndexState(index, codes[:index.ntotal], classes, signature, read_only)
+
+    def get(self) -> IndexState:
+        state = self._state
+        now = time.monotonic()
+        if state is not None and now < self._next_check:
+            return state
+
+        with self._lock:
+            state = self._state
+            if state is not None and time.monotonic() < self._next_check:
+                return state
+            signature = self._signature()
+            if state is None or signature != state.signature:
+                try:
+                    state = self._load(signature)
+                except Exception:
+                    # Files may be mid-write; keep serving the previous snapshot
+                    if self._state is None:
+                        raise
+                    state = self._state
+                self._state = state
+            self._next_check = time.monotonic() + self.check_interval
+        return state
+
+    def reload(self) -> IndexState:
+        with self._lock:
+            self._state = self._load(self._signature())
+            self._next_check = time.monotonic() + self.check_interval
+            return self._state
+
+    def search(self, queries, top_k=3):
+        state = self.get()
+        q = np.ascontiguousarray(queries, dtype="float32")
+        if q.ndim == 1:
+            q = q.reshape(1, -1)
+        with self._index_lock:
+            distances, indices = state.index.search(q, top_k)
+        return state, distances, indices
+
+    def add(self, vectors, labels) -> int:
+        """
+        Add vectors with their diagnosis labels to the served index; they are
+        searchable on return. Ids are row positions, as in the saved labels.
+        Returns the id of the first vector.
+        """
+        x = np.ascontiguousarray(vectors, dtype="float32")
+        if x.ndim == 1:
+            x = x.reshape(1, -1)
+        labels = [str(label) for label in labels]
+        if len(labels) != len(x):
+            raise ValueError(f"Got {len(x)} vectors but {len(labels)} labels")
+        state = self.get()
+        with self._index_lock:
+            if state.read_only:
+                # A memory-mapped index can't grow; swap in an owned copy once
+                state.index, state.read_only = self._read_index(mmap=False)
+                self._tune(state.index)
+            first = state.index.ntotal
+            # Labels first, so a concurrent reader never sees a vector without one
+            state.append_labels(labels)
+            state.index.add(x)
+        return first
+
+    def save(self):
+        """Write the served index and labels; the holder keeps serving them without a reload."""
+        with self._lock:
+            state = self._state
+            if state is None:
+                return
+            with self._index_lock:
+                # Labels first, so another process never sees more vectors than labels
+                save_labels(state.classes[state.codes], self.labels_path)
+                write_index_atomic(state.index, self.index_path)
+                state.signature = self._signature()
+
+
+_holder = None
+_holder_lock = threading.Lock()
+
+
+def get_faiss_holder() -> FaissIndexHolder:
+    global _holder
+    if _holder is None:
+        with _holder_lock:
+            if _holder is None:
+                _holder = FaissIndexHolder()
+    return _holder
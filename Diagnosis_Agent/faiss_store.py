@@ -1,20 +1,61 @@
-import faiss
-import pandas as pd
+import argparse
+import os
+
 import numpy as np
-import joblib
 
-CSV_PATH = "data/diagnosis_latent_dataset.csv"
-INDEX_PATH = "models/faiss.index"
+from Diagnosis_Agent.faiss_index import save_labels, write_index_atomic
+from Diagnosis_Agent.history_store import read_appended, renumber_appended
+from Diagnosis_Agent.index_builder import INDEX_KINDS, build_index
+from Prediction_Agent.model.dataset_store import load_dataset
+
+# Run from the repo root, with the pipeline stopped:
+#
+#   python -m Diagnosis_Agent.faiss_store [--kind ivf_flat ...]
+#
+# Anomalies appended at runtime (history_store) aren't in the CSV; they are
+# carried into the new index after the CSV rows.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CSV_PATH = os.path.join(BASE_DIR, "data", "diagnosis_latent_dataset.csv")
+INDEX_PATH = os.path.join(BASE_DIR, "models", "faiss.index")
+LABELS_PATH = os.path.join(BASE_DIR, "models", "faiss_labels.npz")
+
+parser = argparse.ArgumentParser(description="Build the diagnosis FAISS index")
+parser.add_argument("--kind", choices=INDEX_KINDS, default="flat")
+parser.add_argument("--nlist", type=int, default=None, help="IVF lists (default ~4*sqrt(N))")
+parser.add_argument("--nprobe", type=int, default=8, help="IVF lists probed per query")
+parser.add_argument("--pq-m", type=int, default=8, help="PQ sub-quantizers (must divide 32)")
+parser.add_argument("--hnsw-m", type=int, default=32)
+parser.add_argument("--ef-search", type=int, default=64)
+parser.add_argument("--train-size", type=int, default=100_000, help="vectors sampled for IVF training")
+args = parser.parse_args()
+
+data = load_dataset(CSV_PATH)
 
-df = pd.read_csv(CSV_PATH)
+# float32 memmap straight from latents.npy, no text parsing or copy
+X = data.matrix("latents")
+labels = np.asarray(data.column("diagnosis"), dtype=str)
 
-latent_cols = [c for c in df.columns if c.startswith("z")]
-X = df[latent_cols].values.astype("float32")
+appended = read_appended()
+if len(appended["ids"]):
+    X = np.vstack([X, appended["latents"]])
+    labels = np.concatenate([labels, appended["diagnosis"]])
 
-index = faiss.IndexFlatL2(X.shape[1])
-index.add(X)
+index = build_index(
+    X,
+    kind=args.kind,
+    nlist=args.nlist,
+    pq_m=args.pq_m,
+    hnsw_m=args.hnsw_m,
+    nprobe=args.nprobe,
+    ef_search=args.ef_search,
+    train_size=args.train_size,
+)
 
-faiss.write_index(index, INDEX_PATH)
-joblib.dump(df, "models/faiss_meta.pkl")
+# Appended rows now sit right after the CSV rows; the replay tail is folded in
+renumber_appended(appended, first_id=len(data))
+# Labels first, so a live FaissIndexHolder never sees more vectors than labels
+save_labels(labels, LABELS_PATH)
+write_index_atomic(index, INDEX_PATH)
 
-print("✅ FAISS index built")
+print(f"✅ FAISS index built ({args.kind}, {index.ntotal} vectors, {len(appended['ids'])} appended at runtime)")
@@ -1,21 +1,62 @@
 import joblib
 import numpy as np
 import os
+from Prediction_Agent.model.tree_predictor import load_predictor
+from model_registry import registry
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))  
 MODEL_DIR = os.path.join(BASE_DIR, "models")
-xgb = joblib.load(os.path.join(MODEL_DIR,"xgb_diagnosis.pkl"))
-label_encoder = joblib.load(os.path.join(MODEL_DIR, "diagnosis_label_encoder.pkl"))
+# xgboost | flat (NumPy tree evaluator, much faster for single rows)
+XGB_BACKEND = os.getenv("DIAGNOSIS_XGB_BACKEND", "xgboost")
+ML_EXPLANATION = "ML-based diagnosis using learned patterns"
+
+# Loaded on first use (or registry.warm()); xgboost/sklearn are only imported then
+registry.register("diagnosis.xgb", lambda: joblib.load(os.path.join(MODEL_DIR, "xgb_diagnosis.pkl")))
+registry.register("diagnosis.label_encoder", lambda: joblib.load(os.path.join(MODEL_DIR, "diagnosis_label_encoder.pkl")))
+registry.register("diagnosis.xgb_predictor", lambda: load_predictor(registry.get("diagnosis.xgb"), XGB_BACKEND))
+
+_LAZY_ATTRS = {
+    "xgb": "diagnosis.xgb",
+    "label_encoder": "diagnosis.label_encoder",
+    "xgb_predictor": "diagnosis.xgb_predictor",
+}
+
+def __getattr__(name):
+    if name in _LAZY_ATTRS:
+        return registry.get(_LAZY_ATTRS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 def ml_diagnosis(latent_vector,recon_error):
     feature_vector = np.array(latent_vector, dtype=np.float32)
     
     # Append reconstruction error
     feature_vector = np.append(feature_vector, recon_error)
-    proba = xgb.predict_proba(feature_vector.reshape(1, -1))[0]
+    proba = registry.get("diagnosis.xgb_predictor").predict_proba(feature_vector.reshape(1, -1))[0]
     cls = np.argmax(proba)
-    diagnosis_name = label_encoder.inverse_transform([cls])[0]
+    diagnosis_name = registry.get("diagnosis.label_encoder").classes_[cls]
 
     return {
         "diagnosis": diagnosis_name,
         "confidence": float(proba[cls]),
-        "explanation": "ML-based diagnosis using learned patterns"
+        "explanation": ML_EXPLANATION
     }
+
+def ml_diagnosis_batch(latent_vectors, recon_errors):
+    """ml_diagnosis for many rows with one predict_proba call; results keep input order."""
+    # Same float64 feature rows as the single-row path (float32 latent + appended error)
+    features = np.column_stack([
+        np.asarray(latent_vectors, dtype=np.float32).astype(np.float64),
+        np.asarray(recon_errors, dtype=np.float64),
+    ])
+    proba = registry.get("diagnosis.xgb_predictor").predict_proba(features)
+    cls = proba.argmax(axis=1)
+    names = registry.get("diagnosis.label_encoder").classes_[cls]
+    confidence = proba[np.arange(len(cls)), cls]
+
+    return [
+        {
+            "diagnosis": name,
+            "confidence": float(c),
+            "explanation": ML_EXPLANATION
+        }
+        for name, c in zip(names, confidence)
+    ]
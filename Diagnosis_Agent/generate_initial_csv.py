@@ -1,150 +1,138 @@
+import argparse
 import pandas as pd
 import torch
-import torch.nn as nn
 import numpy as np
 import joblib
 import os
+import tempfile
+from Prediction_Agent.model.autoencoder import SensorAutoencoder
+from Prediction_Agent.model.streaming_encoder import SENSOR_COLUMNS, encode_stream, iter_sensor_chunks
+from Diagnosis_Agent.rules import LABELLING_RULES
+
+# Run from the repo root: python -m Diagnosis_Agent.generate_initial_csv
 
 # ===================== Paths =====================
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # PREDICTIVE/
 MODEL_DIR = os.path.join(BASE_DIR, "Prediction_Agent", "model", "models")
 
-INPUT_CSV = "../Prediction_Agent/dataset/sensor_data_simulated.csv"
-OUTPUT_CSV = "../Prediction_Agent/dataset/diagnosis_latent_dataset.csv"
-
-# ===================== Load scaler =====================
-scaler = joblib.load(os.path.join(MODEL_DIR, "scaler.pkl"))
-
-# ===================== Autoencoder =====================
-class SensorAutoencoder(nn.Module):
-    def __init__(self, input_dim, latent_dim=32):
-        super().__init__()
-        self.encoder = nn.Sequential(
-            nn.Linear(input_dim, 256),
-            nn.ReLU(),
-            nn.Linear(256, 128),
-            nn.ReLU(),
-            nn.Linear(128, latent_dim)
-        )
-        self.decoder = nn.Sequential(
-            nn.Linear(latent_dim, 128),
-            nn.ReLU(),
-            nn.Linear(128, 256),
-            nn.ReLU(),
-            nn.Linear(256, input_dim)
-        )
-
-    def forward(self, x):
-        z = self.encoder(x)
-        x_hat = self.decoder(z)
-        return x_hat, z
-
-# ===================== Load data =====================
-df = pd.read_csv(INPUT_CSV)
+INPUT_CSV = os.path.join(BASE_DIR, "Prediction_Agent", "dataset", "sensor_data_simulated.csv")
+OUTPUT_CSV = os.path.join(BASE_DIR, "Prediction_Agent", "dataset", "diagnosis_latent_dataset.csv")
 
-sensor_cols = [
-    "engine_temp",
-    "vibration",
-    "oil_pressure",
-    "rpm",
-    "battery_voltage"
-]
+SENSOR_COLS = SENSOR_COLUMNS
 
-X_raw = df[sensor_cols].values
-X_scaled = scaler.transform(X_raw)
+def load_models():
+    scaler = joblib.load(os.path.join(MODEL_DIR, "scaler.pkl"))
+    ae = SensorAutoencoder(input_dim=scaler.mean_.shape[0], latent_dim=32)
+    ae.load_state_dict(torch.load(os.path.join(MODEL_DIR, "autoencoder.pt")))
+    ae.eval()
+    return scaler, ae
 
-# ===================== Load AE =====================
-input_dim = X_scaled.shape[1]
-ae = SensorAutoencoder(input_dim=input_dim, latent_dim=32)
-ae.load_state_dict(torch.load(os.path.join(MODEL_DIR, "autoencoder.pt")))
-ae.eval()
+def encode(df, scaler, ae):
+    X_scaled = scaler.transform(df[SENSOR_COLS].values)
+    with torch.no_grad():
+        tensor = torch.tensor(X_scaled, dtype=torch.float32)
+        recon, z = ae(tensor)
+        recon_error = ((recon - tensor) ** 2).mean(dim=1).numpy()
+    return z.numpy(), recon_error
 
 # ===================== Diagnosis Rules =====================
-def enhanced_diagnosis(row, recon_error, recon_threshold):
-    temp = row["engine_temp"]
-    vib  = row["vibration"]
-    oil  = row["oil_pressure"]
-    rpm  = row["rpm"]
-    volt = row["battery_voltage"]
-
-    if temp > 105 and vib > 7:
-        return "overheating", "Engine overheating: extreme temperature (>105°C) with high vibration"
-
-    if vib > 9 or (vib > 6 and abs(rpm - 1200) > 300):
-        return "bearing_fault", "Bearing fault: excessive vibration or vibration with RPM instability"
-
-    if oil < 25 and temp > 95:
-        return "low_oil", "Low oil pressure: pressure drop combined with rising temperature"
-
-    if volt < 11.8 and rpm < 800:
-        return "electrical_issue", "Electrical issue: low voltage affecting engine RPM"
-
-    if rpm > 2200 or (rpm > 2000 and vib > 5):
-        return "rpm_anomaly", "RPM anomaly: sustained high RPM with mechanical vibration"
-
-    if recon_error > recon_threshold:
-        return "unknown_anomaly", "Unrecognized anomaly pattern detected by autoencoder"
-
-    return "normal", "Normal operation: all sensor values within safe operating ranges"
-
-# ===================== Run AE =====================
-with torch.no_grad():
-    tensor = torch.tensor(X_scaled, dtype=torch.float32)
-    recon, z = ae(tensor)
-    recon_error = ((recon - tensor) ** 2).mean(dim=1).numpy()
-
-# ===================== Threshold =====================
-recon_threshold = np.percentile(recon_error, 95)
+# Same rule engine as the runtime diagnosis (Diagnosis_Agent/rules.py), labelling table
+DIAGNOSIS_TEXT = LABELLING_RULES.explanations()
+
+def enhanced_diagnosis_batch(df, recon_error, recon_threshold):
+    labels = LABELLING_RULES.labels_batch(
+        df[SENSOR_COLS].to_numpy(dtype=np.float64),
+        reconstruction_error=recon_error,
+        recon_threshold=recon_threshold,
+    ).astype(str)
+    texts = pd.Series(labels).map(DIAGNOSIS_TEXT).to_numpy()
+    return labels, texts
 
 # ===================== Build Dataset =====================
-records = []
+def build_latent_frame(df, z, recon_error, recon_threshold):
+    diag_label, diag_text = enhanced_diagnosis_batch(df, recon_error, recon_threshold)
 
-for i in range(len(df)):
-    latent_vector = z[i].numpy()
-
-    diag_label, diag_text = enhanced_diagnosis(
-        df.iloc[i],
-        recon_error[i],
-        recon_threshold
-    )
-
-    record = {f"z{j+1}": latent_vector[j] for j in range(len(latent_vector))}
+    latent_df = pd.DataFrame(z, columns=[f"z{j+1}" for j in range(z.shape[1])])
 
     # Save raw sensors for explainability
-    for col in sensor_cols:
-        record[col] = df.iloc[i][col]
-
-    record["reconstruction_error"] = recon_error[i]
-    record["is_anomalous"] = int(recon_error[i] > recon_threshold)
-    record["diagnosis"] = diag_label
-    record["diagnosis_text"] = diag_text
-
-    records.append(record)
-
-latent_df = pd.DataFrame(records)
-
-# ===================== Severity (meaningful bins) =====================
-latent_df["severity"] = pd.cut(
-    latent_df["reconstruction_error"],
-    bins=[0, recon_threshold, recon_threshold * 1.5, recon_threshold * 2, np.inf],
-    labels=["normal", "medium", "high", "critical"]
-)
-
-# ===================== Save =====================
-latent_df.to_csv(OUTPUT_CSV, index=False)
-
-# ===================== Report =====================
-print(f"\n✅ Diagnosis latent dataset saved to {OUTPUT_CSV}")
-print("\nDiagnosis distribution:")
-print(latent_df["diagnosis"].value_counts())
-
-print(f"\nAnomaly threshold: {recon_threshold:.6f}")
-print(f"Anomalous cases: {latent_df['is_anomalous'].sum()} "
-      f"({100 * latent_df['is_anomalous'].mean():.1f}%)")
-
-print("\nSample records:")
-print(
-    latent_df[
-        ["diagnosis", "severity", "reconstruction_error", "is_anomalous", "diagnosis_text"]
-    ].head(10)
-)
+    for col in SENSOR_COLS:
+        latent_df[col] = df[col].to_numpy()
+
+    latent_df["reconstruction_error"] = recon_error
+    latent_df["is_anomalous"] = (recon_error > recon_threshold).astype(int)
+    latent_df["diagnosis"] = diag_label
+    latent_df["diagnosis_text"] = diag_text
+
+    # ===================== Severity (meaningful bins) =====================
+    latent_df["severity"] = pd.cut(
+        latent_df["reconstruction_error"],
+        bins=[0, recon_threshold, recon_threshold * 1.5, recon_threshold * 2, np.inf],
+        labels=["normal", "medium", "high", "critical"]
+    )
+    return latent_df
+
+def generate(input_csv, output_csv, scaler, ae):
+    df = pd.read_csv(input_csv)
+    z, recon_error = encode(df, scaler, ae)
+
+    # ===================== Threshold =====================
+    recon_threshold = np.percentile(recon_error, 95)
+
+    latent_df = build_latent_frame(df, z, recon_error, recon_threshold)
+    latent_df.to_csv(output_csv, index=False)
+    return latent_df["diagnosis"].value_counts(), recon_threshold, latent_df
+
+def generate_chunked(input_path, output_csv, scaler, ae, chunksize):
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(output_csv))) as tmp_dir:
+        # Pass 1: encode once into memmapped .npy files; the 95th percentile
+        # threshold needs every reconstruction error but nothing else in RAM.
+        latents_path, errors_path = encode_stream(input_path, tmp_dir, scaler, ae, chunksize=chunksize)
+        latents = np.load(latents_path, mmap_mode="r")
+        errors = np.load(errors_path, mmap_mode="r")
+        recon_threshold = np.percentile(errors, 95)
+
+        # Pass 2: label chunk by chunk against the stored latents and append to the output
+        counts = pd.Series(dtype=int)
+        offset = 0
+        for i, chunk in enumerate(iter_sensor_chunks(input_path, chunksize, SENSOR_COLS)):
+            rows = slice(offset, offset + len(chunk))
+            latent_df = build_latent_frame(chunk, np.asarray(latents[rows]), np.asarray(errors[rows]), recon_threshold)
+            latent_df.to_csv(output_csv, mode="w" if i == 0 else "a", header=(i == 0), index=False)
+            counts = counts.add(latent_df["diagnosis"].value_counts(), fill_value=0).astype(int)
+            offset += len(chunk)
+        del latents, errors
+    return counts.sort_values(ascending=False), recon_threshold
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the diagnosis latent dataset from sensor telemetry")
+    parser.add_argument("--input", default=INPUT_CSV)
+    parser.add_argument("--output", default=OUTPUT_CSV)
+    parser.add_argument("--chunksize", type=int, default=0,
+                        help="stream the input (CSV or Parquet) in chunks of this many rows (0 = load it all)")
+    args = parser.parse_args()
+
+    scaler, ae = load_models()
+
+    if args.chunksize:
+        counts, recon_threshold = generate_chunked(args.input, args.output, scaler, ae, args.chunksize)
+        latent_df = None
+    else:
+        counts, recon_threshold, latent_df = generate(args.input, args.output, scaler, ae)
+
+    # ===================== Report =====================
+    print(f"\n✅ Diagnosis latent dataset saved to {args.output}")
+    print("\nDiagnosis distribution:")
+    print(counts)
+
+    print(f"\nAnomaly threshold: {recon_threshold:.6f}")
+
+    if latent_df is not None:
+        print(f"Anomalous cases: {latent_df['is_anomalous'].sum()} "
+              f"({100 * latent_df['is_anomalous'].mean():.1f}%)")
+
+        print("\nSample records:")
+        print(
+            latent_df[
+                ["diagnosis", "severity", "reconstruction_error", "is_anomalous", "diagnosis_text"]
+            ].head(10)
+        )
@@ -0,0 +1,266 @@
+import atexit
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+import metrics
+from .faiss_index import MODEL_DIR, FaissIndexHolder, get_faiss_holder
+
+# Anomalies appended at runtime live in two column stores with the same layout:
+#
+#   history/      every appended anomaly, keyed by its row id in faiss.index;
+#                 the record faiss_store carries into a rebuilt index
+#   history_log/  the replay tail: rows appended since the index was last saved
+#
+# A save compacts the tail into history/, writes the index and labels, and
+# only then truncates the tail.
+SNAPSHOT_DIR = os.path.join(MODEL_DIR, "history")
+LOG_DIR = os.path.join(MODEL_DIR, "history_log")
+LATENT_DIM = 32
+
+# One append-only file per column. Row i of every file belongs to the same anomaly.
+_NUMERIC_COLUMNS = {
+    "ids": np.int64,
+    "reconstruction_error": np.float32,
+    "confidence": np.float32,
+}
+_COLUMNS = list(_NUMERIC_COLUMNS) + ["latents", "diagnosis"]
+
+Rows = Dict[str, np.ndarray]
+
+
+def _empty_rows() -> Rows:
+    rows = {name: np.empty(0, dtype) for name, dtype in _NUMERIC_COLUMNS.items()}
+    rows["latents"] = np.empty((0, LATENT_DIM), np.float32)
+    rows["diagnosis"] = np.empty(0, dtype=str)
+    return rows
+
+
+class ColumnLog:
+    """Append-only columnar row store in a directory, one raw file per column."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def _column_path(self, name):
+        return os.path.join(self.path, name)
+
+    def read(self) -> Rows:
+        rows = {}
+        for name, dtype in _NUMERIC_COLUMNS.items():
+            path = self._column_path(name)
+            rows[name] = np.fromfile(path, dtype=dtype) if os.path.exists(path) else np.empty(0, dtype)
+
+        path = self._column_path("latents")
+        latents = np.fromfile(path, dtype=np.float32) if os.path.exists(path) else np.empty(0, np.float32)
+        rows["latents"] = latents[: len(latents) // LATENT_DIM * LATENT_DIM].reshape(-1, LATENT_DIM)
+
+        path = self._column_path("diagnosis")
+        labels = []
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                labels = f.read().splitlines()
+        rows["diagnosis"] = np.asarray(labels, dtype=str)
+
+        # A crash mid-append can leave columns of different lengths; keep complete rows only
+        n_rows = min(len(column) for column in rows.values())
+        if n_rows != max(len(column) for column in rows.values()):
+            rows = {name: column[:n_rows] for name, column in rows.items()}
+            self.write(rows)
+        return rows
+
+    def append(self, rows: Rows):
+        os.makedirs(self.path, exist_ok=True)
+        for name, dtype in _NUMERIC_COLUMNS.items():
+            with open(self._column_path(name), "ab") as f:
+                f.write(np.asarray(rows[name], dtype=dtype).tobytes())
+        with open(self._column_path("latents"), "ab") as f:
+            f.write(np.asarray(rows["latents"], dtype=np.float32).tobytes())
+        with open(self._column_path("diagnosis"), "a", encoding="utf-8") as f:
+            f.writelines(f"{label}\n" for label in rows["diagnosis"])
+
+    def write(self, rows: Rows):
+        """Replace the whole store; each column is written atomically."""
+        os.makedirs(self.path, exist_ok=True)
+        for name in _COLUMNS:
+            tmp_path = self._column_path(name) + ".tmp"
+            if name == "diagnosis":
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.writelines(f"{label}\n" for label in rows[name])
+            else:
+                dtype = _NUMERIC_COLUMNS.get(name, np.float32)
+                np.asarray(rows[name], dtype=dtype).tofile(tmp_path)
+            os.replace(tmp_path, self._column_path(name))
+
+    def clear(self):
+        for name in _COLUMNS:
+            if os.path.exists(self._column_path(name)):
+                open(self._column_path(name), "wb").close()
+
+
+def _select(rows: Rows, keep) -> Rows:
+    return {name: column[keep] for name, column in rows.items()}
+
+
+def read_appended(snapshot_dir=SNAPSHOT_DIR, log_dir=LOG_DIR) -> Rows:
+    """Every anomaly appended at runtime, saved or still in the replay tail, in id order."""
+    snapshot = ColumnLog(snapshot_dir).read()
+    tail = ColumnLog(log_dir).read()
+    last_id = snapshot["ids"][-1] if len(snapshot["ids"]) else -1
+    tail = _select(tail, tail["ids"] > last_id)
+    return {name: np.concatenate([snapshot[name], tail[name]]) for name in _COLUMNS}
+
+
+def renumber_appended(rows: Rows, first_id: int, snapshot_dir=SNAPSHOT_DIR, log_dir=LOG_DIR):
+    """
+    Store rows as the whole appended history, with ids first_id, first_id + 1, ...
+    (their positions in a rebuilt index), and empty the replay tail.
+    """
+    rows = dict(rows, ids=np.arange(first_id, first_id + len(rows["ids"]), dtype=np.int64))
+    ColumnLog(snapshot_dir).write(rows)
+    ColumnLog(log_dir).clear()
+
+
+class DiagnosisHistory:
+    """
+    Append-only growth of the diagnosis RAG store.
+
+    New anomalies are added straight into the index the FaissIndexHolder
+    serves, so `faiss_diagnosis` finds them on the next search, and to the
+    replay tail under `log_dir`. At most `save_interval` seconds after an
+    append (and at exit) the tail is compacted into the persistent snapshot
+    under `snapshot_dir`, the holder writes the index and labels, and the
+    tail is truncated; rows still in the tail at start-up are replayed into
+    the index. Nothing is read until the first append.
+
+    A vehicle stuck in one fault would otherwise add a near-identical vector
+    every reading, so a (vehicle, diagnosis) pair is appended at most once
+    per `cooldown` seconds, and a vector within `dedup_distance` (squared L2)
+    of a stored one with the same label is skipped. append() returns None
+    for skipped rows.
+    """
+
+    def __init__(self, holder: Optional[FaissIndexHolder] = None, log_dir=LOG_DIR, snapshot_dir=SNAPSHOT_DIR,
+                 save_interval=60.0, cooldown=300.0, dedup_distance=0.05):
+        self.holder = holder
+        self.tail = ColumnLog(log_dir)
+        self.snapshot = ColumnLog(snapshot_dir)
+        self.save_interval = save_interval
+        self.cooldown = cooldown
+        self.dedup_distance = dedup_distance
+
+        self._lock = threading.Lock()
+        self._opened = False
+        self._pending = 0
+        self._snapshot_last_id = -1
+        self._last_append: Dict[tuple, float] = {}
+        self._save_timer: Optional[threading.Timer] = None
+
+    @property
+    def ntotal(self):
+        with self._lock:
+            self._open_locked()
+            return self.holder.get().index.ntotal
+
+    def _open_locked(self):
+        if self._opened:
+            return
+        if self.holder is None:
+            self.holder = get_faiss_holder()
+        snapshot_ids = self.snapshot.read()["ids"]
+        self._snapshot_last_id = int(snapshot_ids[-1]) if len(snapshot_ids) else -1
+        self._replay_tail()
+        atexit.register(self.flush)
+        self._opened = True
+
+    def _replay_tail(self):
+        tail = self.tail.read()
+        if not len(tail["ids"]):
+            return
+        # Rows below ntotal were saved with the index before a crash cut the save short
+        replay = _select(tail, tail["ids"] >= self.holder.get().index.ntotal)
+        if len(replay["ids"]):
+            self.holder.add(replay["latents"], replay["diagnosis"])
+        self._pending = len(tail["ids"])
+        self._schedule_save_locked()
+
+    def _schedule_save_locked(self):
+        if self._save_timer is None:
+            self._save_timer = threading.Timer(self.save_interval, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def _is_duplicate(self, latent, diagnosis) -> bool:
+        state, distances, indices = self.holder.search(latent, 1)
+        nearest = indices[0][0]
+        return (nearest >= 0 and distances[0][0] < self.dedup_distance
+                and str(state.classes[state.codes[nearest]]) == diagnosis)
+
+    def append(self, latent_vector, diagnosis, confidence=1.0, reconstruction_error=0.0,
+               vehicle_id=None) -> Optional[int]:
+        latent = np.asarray(latent_vector, dtype=np.float32).reshape(1, -1)
+        if latent.shape[1] != LATENT_DIM:
+            raise ValueError(f"Expected a {LATENT_DIM}-dim latent vector, got {latent.shape[1]}")
+        diagnosis = str(diagnosis).replace("\n", " ")
+        key = (vehicle_id, diagnosis)
+        now = time.monotonic()
+
+        with self._lock:
+            if vehicle_id is not None and now - self._last_append.get(key, -np.inf) < self.cooldown:
+                metrics.incr("history_append", result="cooldown")
+                return None
+            self._open_locked()
+            if self._is_duplicate(latent, diagnosis):
+                metrics.incr("history_append", result="duplicate")
+                return None
+
+            row_id = self.holder.get().index.ntotal
+            self.tail.append({
+                "ids": [row_id],
+                "reconstruction_error": [reconstruction_error],
+                "confidence": [confidence],
+                "latents": latent,
+                "diagnosis": [diagnosis],
+            })
+            self.holder.add(latent, [diagnosis])
+            if vehicle_id is not None:
+                self._last_append[key] = now
+            self._pending += 1
+            self._schedule_save_locked()
+        metrics.incr("history_append", result="added")
+        return row_id
+
+    def flush(self):
+        """Compact the tail into the snapshot and save the index, if anything was appended since the last save."""
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if self._pending == 0:
+                return
+            # Snapshot first: a crash after this leaves the rows in both, and ids dedupe them
+            tail = self.tail.read()
+            new = _select(tail, tail["ids"] > self._snapshot_last_id)
+            if len(new["ids"]):
+                self.snapshot.append(new)
+                self._snapshot_last_id = int(new["ids"][-1])
+            self.holder.save()
+            self.tail.clear()
+            self._pending = 0
+
+
+_history = None
+_history_lock = threading.Lock()
+
+
+def get_history() -> DiagnosisHistory:
+    """The process-wide history; cheap, the index and log are opened on the first append."""
+    global _history
+    if _history is None:
+        with _history_lock:
+            if _history is None:
+                _history = DiagnosisHistory()
+    return _history
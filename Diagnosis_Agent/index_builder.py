@@ -0,0 +1,150 @@
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+INDEX_KINDS = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+
+def default_nlist(n_vectors):
+    # ~4*sqrt(N) lists, but keep >= 39 training points per centroid
+    return int(max(1, min(4 * np.sqrt(n_vectors), n_vectors // 39)))
+
+
+def _training_sample(X, train_size, seed):
+    if train_size is None or len(X) <= train_size:
+        return X
+    rng = np.random.default_rng(seed)
+    return X[rng.choice(len(X), train_size, replace=False)]
+
+
+def build_index(X, kind="flat", nlist=None, pq_m=8, pq_nbits=8, hnsw_m=32,
+                ef_construction=200, nprobe=None, ef_search=None,
+                train_size=100_000, seed=42):
+    X = np.ascontiguousarray(X, dtype="float32")
+    n, d = X.shape
+
+    if kind == "flat":
+        index = faiss.IndexFlatL2(d)
+    elif kind in ("ivf_flat", "ivf_pq"):
+        nlist = nlist or default_nlist(n)
+        quantizer = faiss.IndexFlatL2(d)
+        if kind == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, d, nlist)
+        else:
+            if d % pq_m:
+                raise ValueError(f"pq_m={pq_m} must divide the latent dimension {d}")
+            # Each PQ codebook has 2**nbits centroids; shrink it for small histories
+            pq_nbits = int(min(pq_nbits, max(1, np.log2(max(2, min(n, train_size) // 39)))))
+            index = faiss.IndexIVFPQ(quantizer, d, nlist, pq_m, pq_nbits)
+        index.train(_training_sample(X, train_size, seed))
+    elif kind == "hnsw":
+        index = faiss.IndexHNSWFlat(d, hnsw_m)
+        index.hnsw.efConstruction = ef_construction
+    else:
+        raise ValueError(f"Unknown index kind '{kind}', expected one of {INDEX_KINDS}")
+
+    index.add(X)
+    set_search_params(index, nprobe=nprobe, ef_search=ef_search)
+    return index
+
+
+def _inner_index(index):
+    index = faiss.downcast_index(index)
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        index = faiss.downcast_index(index.index)
+    return index
+
+
+def set_search_params(index, nprobe=None, ef_search=None):
+    inner = _inner_index(index)
+    if nprobe is not None:
+        ivf = faiss.try_extract_index_ivf(inner)
+        if ivf is not None:
+            ivf.nprobe = int(nprobe)
+    if ef_search is not None and hasattr(inner, "hnsw"):
+        inner.hnsw.efSearch = int(ef_search)
+    return index
+
+
+def _search_latencies(index, queries, top_k):
+    latencies = np.empty(len(queries))
+    for i in range(len(queries)):
+        start = time.perf_counter()
+        index.search(queries[i:i + 1], top_k)
+        latencies[i] = time.perf_counter() - start
+    return latencies * 1e6
+
+
+def recall_report(X, configs, n_queries=500, top_k=3, noise=0.1, seed=0):
+    """
+    Build each config in `configs` (dicts of build_index kwargs) over X and
+    compare recall@k and single-query latency against an exact flat index.
+    """
+    X = np.ascontiguousarray(X, dtype="float32")
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(X), min(n_queries, len(X)), replace=False)
+    queries = X[picks] + rng.normal(0, noise, (len(picks), X.shape[1])).astype("float32")
+
+    flat = build_index(X, "flat")
+    _, truth = flat.search(queries, top_k)
+
+    report = []
+    for config in configs:
+        start = time.perf_counter()
+        index = build_index(X, **config)
+        build_s = time.perf_counter() - start
+
+        _, found = index.search(queries, top_k)
+        hits = sum(len(np.intersect1d(t, f)) for t, f in zip(truth, found))
+        latencies = _search_latencies(index, queries, top_k)
+
+        report.append({
+            **config,
+            "recall_at_k": hits / truth.size,
+            "p50_us": float(np.percentile(latencies, 50)),
+            "p99_us": float(np.percentile(latencies, 99)),
+            "build_s": build_s,
+        })
+    return report
+
+
+def print_report(report, top_k=3):
+    print(f"{'config':<45} {'recall@' + str(top_k):>9} {'p50 us':>9} {'p99 us':>9} {'build s':>8}")
+    for row in report:
+        config = ", ".join(f"{k}={v}" for k, v in row.items()
+                           if k not in ("recall_at_k", "p50_us", "p99_us", "build_s"))
+        print(f"{config:<45} {row['recall_at_k']:>9.3f} {row['p50_us']:>9.1f} "
+              f"{row['p99_us']:>9.1f} {row['build_s']:>8.2f}")
+
+
+if __name__ == "__main__":
+    import os
+
+    from Prediction_Agent.model.dataset_store import load_dataset
+
+    # Run from the repo root: python -m Diagnosis_Agent.index_builder [--synthetic N]
+    parser = argparse.ArgumentParser(description="Recall vs latency report for diagnosis ANN indexes")
+    parser.add_argument("--synthetic", type=int, default=0,
+                        help="use N random 32-dim latents instead of the diagnosis dataset")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        X = np.random.default_rng(42).normal(size=(args.synthetic, 32)).astype("float32")
+    else:
+        csv_path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "data", "diagnosis_latent_dataset.csv")
+        # float32 memmap of the latent columns, same store faiss_store builds from
+        X = load_dataset(csv_path).matrix("latents")
+
+    configs = [{"kind": "flat"}]
+    for nprobe in (1, 4, 16):
+        configs.append({"kind": "ivf_flat", "nprobe": nprobe})
+        configs.append({"kind": "ivf_pq", "nprobe": nprobe})
+    for ef in (16, 64, 128):
+        configs.append({"kind": "hnsw", "ef_search": ef})
+
+    print_report(recall_report(X, configs, n_queries=args.queries, top_k=args.top_k), args.top_k)
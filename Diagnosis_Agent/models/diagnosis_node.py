@@ -1,9 +1,25 @@
 from .node_base import Node
 from ..diagnosis_engine import diagnose
 
+# Only diagnoses we trust go back into the RAG history; FAISS results would just echo it
+CONFIRM_CONFIDENCE = 0.85
+CONFIRM_SOURCES = ("rules", "ml")
+
+def is_confirmed(diagnosis):
+    return (
+        diagnosis.get("source") in CONFIRM_SOURCES
+        and diagnosis.get("confidence", 0) >= CONFIRM_CONFIDENCE
+    )
+
 class DiagnosisAgentNode(Node):
-    def __init__(self,name="DiagnosisAgent"):
+    input_schema = {"vehicle_id": object, "sensor_data": list, "latent_vector": object, "reconstruction_error": float}
+    output_schema = {"diagnosis": dict}
+    optional_inputs = ("vehicle_id",)
+
+    def __init__(self,name="DiagnosisAgent", history=None):
         super().__init__(name)
+        self.history = history
+
     def run(self, input_data):
         sensor_row = input_data.get("sensor_data", [])
         latent = input_data["latent_vector"]
@@ -15,6 +31,15 @@ class DiagnosisAgentNode(Node):
             recon_error=recon_error
         )
 
+        if self.history is not None and is_confirmed(diagnosis):
+            self.history.append(
+                latent,
+                diagnosis["diagnosis"],
+                confidence=diagnosis["confidence"],
+                reconstruction_error=recon_error,
+                vehicle_id=input_data.get("vehicle_id"),
+            )
+
         return {
             **input_data,
             "diagnosis": diagnosis
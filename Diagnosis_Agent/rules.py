@@ -1,29 +1,274 @@
+import operator
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+# ===================== Rule table =====================
+# A diagnosis rule is declarative data: Cond(sensor, op, threshold) leaves
+# combined with AllOf / AnyOf, plus the diagnosis it produces. One RuleTable
+# evaluates it as
+#   - evaluate(row):       short-circuiting tests over a single sensor row
+#   - evaluate_batch(X):   NumPy masks over an (N x sensors) array
+# and the first matching rule wins in both, in table order.
+
+SENSOR_COLUMNS = ["engine_temp", "vibration", "oil_pressure", "rpm", "battery_voltage"]
+
+OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+
+_REQUIRED = object()
+
+
+class Param:
+    """Threshold supplied at evaluation time, e.g. a data-dependent percentile."""
+
+    def __init__(self, name: str, default: Any = _REQUIRED):
+        if not name.isidentifier():
+            raise ValueError(f"Param name '{name}' is not an identifier")
+        self.name = name
+        self.default = default
+
+
+class Cond:
+    """`sensor op threshold`, or `|sensor - center| op threshold` when center is set."""
+
+    def __init__(self, sensor: str, op: str, threshold: Union[float, Param], center: Optional[float] = None):
+        if op not in OPERATORS:
+            raise ValueError(f"Unknown operator '{op}', expected one of {list(OPERATORS)}")
+        if not sensor.isidentifier():
+            raise ValueError(f"Sensor name '{sensor}' is not an identifier")
+        self.sensor = sensor
+        self.op = op
+        self.threshold = threshold
+        self.center = center
+
+    def names(self):
+        yield self.sensor
+        if isinstance(self.threshold, Param):
+            yield self.threshold.name
+
+    def params(self):
+        if isinstance(self.threshold, Param):
+            yield self.threshold
+
+    def mask(self, values: Dict[str, Any]) -> np.ndarray:
+        x = values[self.sensor]
+        if self.center is not None:
+            x = np.abs(x - self.center)
+        threshold = values[self.threshold.name] if isinstance(self.threshold, Param) else self.threshold
+        return OPERATORS[self.op](x, threshold)
+
+    def compile_test(self, columns: Sequence[str]):
+        """test(row, extra) -> bool for one row; sensors outside columns and Params are read from extra."""
+        op = OPERATORS[self.op]
+        center = self.center
+        if isinstance(self.threshold, Param):
+            name = self.threshold.name
+            threshold = lambda extra: extra[name]
+        else:
+            value = float(self.threshold)
+            threshold = lambda extra: value
+        if self.sensor in columns:
+            i = list(columns).index(self.sensor)
+            read = lambda row, extra: row[i]
+        else:
+            sensor = self.sensor
+            read = lambda row, extra: extra[sensor]
+
+        # Plain `column op constant` is by far the most common leaf
+        if center is None and not isinstance(self.threshold, Param) and self.sensor in columns:
+            return lambda row, extra: op(row[i], value)
+        if center is None:
+            return lambda row, extra: op(read(row, extra), threshold(extra))
+        return lambda row, extra: op(abs(read(row, extra) - center), threshold(extra))
+
+
+class _Combinator:
+    reduce = None
+
+    def __init__(self, *conditions):
+        if not conditions:
+            raise ValueError(f"{type(self).__name__} needs at least one condition")
+        self.conditions = conditions
+
+    def names(self):
+        for c in self.conditions:
+            yield from c.names()
+
+    def params(self):
+        for c in self.conditions:
+            yield from c.params()
+
+    def mask(self, values):
+        masks = [c.mask(values) for c in self.conditions]
+        result = masks[0]
+        for m in masks[1:]:
+            result = type(self).reduce(result, m)
+        return result
+
+
+class AllOf(_Combinator):
+    reduce = np.logical_and
+
+    def compile_test(self, columns: Sequence[str]):
+        tests = [c.compile_test(columns) for c in self.conditions]
+
+        def test(row, extra):
+            for t in tests:
+                if not t(row, extra):
+                    return False
+            return True
+        return test
+
+
+class AnyOf(_Combinator):
+    reduce = np.logical_or
+
+    def compile_test(self, columns: Sequence[str]):
+        tests = [c.compile_test(columns) for c in self.conditions]
+
+        def test(row, extra):
+            for t in tests:
+                if t(row, extra):
+                    return True
+            return False
+        return test
+
+
+class Rule:
+    def __init__(self, diagnosis: str, when, confidence: Optional[float] = None, explanation: str = ""):
+        self.diagnosis = diagnosis
+        self.when = when
+        self.confidence = confidence
+        self.explanation = explanation
+
+    def result(self) -> Dict[str, Any]:
+        return {"diagnosis": self.diagnosis, "confidence": self.confidence, "explanation": self.explanation}
+
+
+class RuleTable:
+    """
+    Ordered rules over `columns` (the sensor row layout). Names a rule uses
+    that are not columns (e.g. reconstruction_error, Param thresholds) are
+    passed as keyword arguments to evaluate / evaluate_batch.
+    """
+
+    def __init__(self, rules: List[Rule], columns: Sequence[str] = SENSOR_COLUMNS, default: Optional[Rule] = None):
+        self.rules = list(rules)
+        self.columns = list(columns)
+        self.default = default
+        self.labels = np.array([r.diagnosis for r in self.rules] + [default.diagnosis if default else ""], dtype=object)
+        # Names that are not row columns: keyword arguments, optionally defaulted by a Param
+        self._extra_defaults = {name: _REQUIRED for name in self._names() if name not in self.columns}
+        for rule in self.rules:
+            for param in rule.when.params():
+                self._extra_defaults[param.name] = param.default
+        self._tests = [(rule.when.compile_test(self.columns), rule.result()) for rule in self.rules]
+        self._default_result = default.result() if default else None
+
+    def _names(self):
+        seen = []
+        for rule in self.rules:
+            for name in rule.when.names():
+                if name not in seen:
+                    seen.append(name)
+        return seen
+
+    def _extra_values(self, extra: Dict[str, Any]) -> Dict[str, Any]:
+        values = {}
+        missing = []
+        for name, default in self._extra_defaults.items():
+            if name in extra:
+                values[name] = extra[name]
+            elif default is _REQUIRED:
+                missing.append(name)
+            else:
+                values[name] = default
+        if missing:
+            raise ValueError(f"Rule table needs keyword argument(s) {', '.join(missing)} "
+                             f"(not sensor columns {self.columns})")
+        return values
+
+    def evaluate(self, row: Sequence[float], **extra) -> Optional[Dict[str, Any]]:
+        """First matching rule's {diagnosis, confidence, explanation} for one row, else the default (or None)."""
+        values = self._extra_values(extra) if self._extra_defaults else extra
+        for test, result in self._tests:
+            if test(row, values):
+                return dict(result)
+        return dict(self._default_result) if self._default_result is not None else None
+
+    def evaluate_batch(self, X, **extra) -> np.ndarray:
+        """Index of the first matching rule for every row of X; len(rules) where nothing matched."""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2:
+            raise ValueError(f"Expected a 2-D array of sensor rows, got shape {X.shape}")
+        values = {name: X[:, i] for i, name in enumerate(self.columns)}
+        values.update({k: np.asarray(v) if not np.isscalar(v) else v for k, v in self._extra_values(extra).items()})
+
+        matched = np.full(len(X), len(self.rules), dtype=np.int64)
+        unresolved = np.ones(len(X), dtype=bool)
+        for i, rule in enumerate(self.rules):
+            hit = unresolved & rule.when.mask(values)
+            matched[hit] = i
+            unresolved &= ~hit
+            if not unresolved.any():
+                break
+        return matched
+
+    def labels_batch(self, X, **extra) -> np.ndarray:
+        return self.labels[self.evaluate_batch(X, **extra)]
+
+    def results_batch(self, X, **extra) -> List[Optional[Dict[str, Any]]]:
+        """evaluate() for every row of X, computed with the batch evaluator."""
+        results = [r.result() for r in self.rules] + [self.default.result() if self.default else None]
+        return [dict(results[i]) if results[i] is not None else None for i in self.evaluate_batch(X, **extra)]
+
+    def explanations(self) -> Dict[str, str]:
+        texts = {r.diagnosis: r.explanation for r in self.rules}
+        if self.default is not None:
+            texts[self.default.diagnosis] = self.default.explanation
+        return texts
+
+
+# ===================== Rule tables =====================
+# Used by DiagnosisAgent at runtime; anything unmatched escalates to FAISS / ML.
+RUNTIME_RULES = RuleTable([
+    Rule("overheating", AllOf(Cond("engine_temp", ">", 105), Cond("vibration", ">", 7)),
+         confidence=0.95, explanation="Extreme temperature with high vibration"),
+    Rule("bearing_fault", Cond("vibration", ">", 9),
+         confidence=0.9, explanation="Excessive vibration detected"),
+    Rule("low_oil", Cond("oil_pressure", "<", 25),
+         confidence=0.85, explanation="Oil pressure below safe threshold"),
+])
+
+# Used by generate_initial_csv to label the training / FAISS dataset
+LABELLING_RULES = RuleTable([
+    Rule("overheating", AllOf(Cond("engine_temp", ">", 105), Cond("vibration", ">", 7)),
+         explanation="Engine overheating: extreme temperature (>105°C) with high vibration"),
+    Rule("bearing_fault", AnyOf(Cond("vibration", ">", 9),
+                                AllOf(Cond("vibration", ">", 6), Cond("rpm", ">", 300, center=1200))),
+         explanation="Bearing fault: excessive vibration or vibration with RPM instability"),
+    Rule("low_oil", AllOf(Cond("oil_pressure", "<", 25), Cond("engine_temp", ">", 95)),
+         explanation="Low oil pressure: pressure drop combined with rising temperature"),
+    Rule("electrical_issue", AllOf(Cond("battery_voltage", "<", 11.8), Cond("rpm", "<", 800)),
+         explanation="Electrical issue: low voltage affecting engine RPM"),
+    Rule("rpm_anomaly", AnyOf(Cond("rpm", ">", 2200), AllOf(Cond("rpm", ">", 2000), Cond("vibration", ">", 5))),
+         explanation="RPM anomaly: sustained high RPM with mechanical vibration"),
+    Rule("unknown_anomaly", Cond("reconstruction_error", ">", Param("recon_threshold")),
+         explanation="Unrecognized anomaly pattern detected by autoencoder"),
+], default=Rule("normal", None, explanation="Normal operation: all sensor values within safe operating ranges"))
+
+
 def rule_based_diagnosis(sensor_row):
-    temp = sensor_row[0] #engine temp
-    vib  = sensor_row[1] #vibration
-    oil  = sensor_row[2] #oil pressure
-    rpm  = sensor_row[3] #rpm
-    volt = sensor_row[4] #batter voltage
-
-    if temp > 105 and vib > 7:
-        return {
-            "diagnosis": "overheating",
-            "confidence": 0.95,
-            "explanation": "Extreme temperature with high vibration"
-        }
-
-    if vib > 9:
-        return {
-            "diagnosis": "bearing_fault",
-            "confidence": 0.9,
-            "explanation": "Excessive vibration detected"
-        }
-
-    if oil < 25:
-        return {
-            "diagnosis": "low_oil",
-            "confidence": 0.85,
-            "explanation": "Oil pressure below safe threshold"
-        }
-
-    return None  # Escalate
+    return RUNTIME_RULES.evaluate(sensor_row)  # None -> escalate
+
+
+def rule_based_diagnosis_batch(sensor_rows) -> List[Optional[Dict[str, Any]]]:
+    return RUNTIME_RULES.results_batch(sensor_rows)
@@ -1,20 +1,24 @@
-import pandas as pd
 import joblib
+import numpy as np
+import os
 from xgboost import XGBClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder
 from sklearn.metrics import classification_report
+from Prediction_Agent.model.dataset_store import load_dataset
 
-CSV_PATH = "data/diagnosis_latent_dataset.csv"
-MODEL_OUT = "models/xgb_diagnosis.pkl"
-ENCODER_OUT = "models/diagnosis_label_encoder.pkl"
+# Run from the repo root: python -m Diagnosis_Agent.train_xg
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CSV_PATH = os.path.join(BASE_DIR, "data", "diagnosis_latent_dataset.csv")
+MODEL_OUT = os.path.join(BASE_DIR, "models", "xgb_diagnosis.pkl")
+ENCODER_OUT = os.path.join(BASE_DIR, "models", "diagnosis_label_encoder.pkl")
 
 # ---------------- Load dataset ----------------
-df = pd.read_csv(CSV_PATH)
+data = load_dataset(CSV_PATH)
 
-latent_cols = [c for c in df.columns if c.startswith("z")]
-X = df[latent_cols + ["reconstruction_error"]]
-y_text = df["diagnosis"]
+X = np.hstack([data.matrix("latents"), data.column("reconstruction_error")[:, np.newaxis]])
+y_text = data.column("diagnosis")
 
 # ---------------- Encode labels ----------------
 label_encoder = LabelEncoder()
@@ -5,7 +5,6 @@ num_sensors = 5
 timesteps = 1000 
 window_size = 1            
 failure_prob = 0.05        
-np.random.seed(42)
 
 sensor_ranges = {
     'engine_temp': (70, 110),         
@@ -16,26 +15,33 @@ sensor_ranges = {
 }
 
 
-data = np.zeros((timesteps, num_sensors))
-for i, (sensor, (low, high)) in enumerate(sensor_ranges.items()):
-    data[:, i] = np.random.uniform(low, high, size=timesteps) + np.random.normal(0, 0.5, timesteps)
+def generate(timesteps=timesteps, failure_prob=failure_prob, seed=42):
+    # RandomState(seed) draws the same stream as np.random.seed(seed), so seed=42 reproduces the shipped CSV
+    rng = np.random.RandomState(seed)
 
+    data = np.zeros((timesteps, num_sensors))
+    for i, (sensor, (low, high)) in enumerate(sensor_ranges.items()):
+        data[:, i] = rng.uniform(low, high, size=timesteps) + rng.normal(0, 0.5, timesteps)
 
-failed = np.zeros(timesteps)
-num_failures = int(timesteps * failure_prob)
 
-failure_indices = np.random.choice(timesteps, num_failures, replace=False)
-for idx in failure_indices:
-    data[idx, 0] += np.random.uniform(10, 30)  # temp spike
-    data[idx, 1] += np.random.uniform(5, 15)   # vibration spike
-    data[idx, 2] += np.random.uniform(-20, -5) # pressure drop
-    failed[idx] = 1
+    failed = np.zeros(timesteps)
+    num_failures = int(timesteps * failure_prob)
 
+    failure_indices = rng.choice(timesteps, num_failures, replace=False)
+    for idx in failure_indices:
+        data[idx, 0] += rng.uniform(10, 30)  # temp spike
+        data[idx, 1] += rng.uniform(5, 15)   # vibration spike
+        data[idx, 2] += rng.uniform(-20, -5) # pressure drop
+        failed[idx] = 1
 
-df = pd.DataFrame(data, columns=list(sensor_ranges.keys()))
-df['failed'] = failed.astype(int)
 
+    df = pd.DataFrame(data, columns=list(sensor_ranges.keys()))
+    df['failed'] = failed.astype(int)
+    return df
 
-df.to_csv('sensor_data_simulated.csv', index=False)
-print("Simulated vehicle sensor dataset saved to 'sensor_data_simulated.csv'")
-print(df.head(10))
+
+if __name__ == "__main__":
+    df = generate()
+    df.to_csv('sensor_data_simulated.csv', index=False)
+    print("Simulated vehicle sensor dataset saved to 'sensor_data_simulated.csv'")
+    print(df.head(10))
@@ -0,0 +1,198 @@
+import os
+import time
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.path.join(BASE_DIR, "models")
+
+TORCHSCRIPT_PATH = os.path.join(MODEL_DIR, "autoencoder.ts.pt")
+QUANTIZED_PATH = os.path.join(MODEL_DIR, "autoencoder.int8.ts.pt")
+ONNX_PATH = os.path.join(MODEL_DIR, "autoencoder.onnx")
+
+RUNTIMES = ("eager", "torchscript", "quantized", "onnx")
+
+# DiagnosisAgent escalates to FAISS when the reconstruction error is above 0.001
+# (diagnosis_engine.diagnose), so a runtime that moves the error by that much
+# can change the route; the int8 model is only served when it stays below this.
+RECON_ERROR_TOLERANCE = 0.001
+
+# A runtime takes scaled float32 rows (N x input_dim) and returns (reconstruction, latent) as NumPy
+AEForward = Callable[[np.ndarray], Tuple[np.ndarray, np.ndarray]]
+
+
+def quantize(ae: nn.Module) -> nn.Module:
+    # Dynamic int8: weights stored as int8, activations quantized on the fly per batch
+    return torch.ao.quantization.quantize_dynamic(ae, {nn.Linear}, dtype=torch.qint8)
+
+
+def _trace(ae: nn.Module, input_dim: int):
+    example = torch.zeros(1, input_dim)
+    with torch.no_grad():
+        traced = torch.jit.trace(ae.eval(), example)
+    return torch.jit.freeze(traced.eval())
+
+
+def export_torchscript(ae: nn.Module, input_dim: int, path: str = TORCHSCRIPT_PATH, int8: bool = False) -> str:
+    model = quantize(ae) if int8 else ae
+    torch.jit.save(_trace(model, input_dim), path)
+    return path
+
+
+def export_onnx(ae: nn.Module, input_dim: int, path: str = ONNX_PATH) -> str:
+    example = torch.zeros(1, input_dim)
+    torch.onnx.export(
+        ae.eval(), (example,), path,
+        input_names=["scaled"], output_names=["reconstruction", "latent"],
+        dynamic_axes={"scaled": {0: "batch"}, "reconstruction": {0: "batch"}, "latent": {0: "batch"}},
+        dynamo=False,
+    )
+    return path
+
+
+def _torch_forward(model) -> AEForward:
+    def forward(x: np.ndarray):
+        with torch.no_grad():
+            recon, latent = model(torch.from_numpy(x))
+        return recon.numpy(), latent.numpy()
+    return forward
+
+
+def _parity_rows(input_dim: int, n_rows: int = 1024, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=(n_rows, input_dim)).astype(np.float32)
+
+
+def _diff(x: np.ndarray, outputs, reference) -> Dict[str, float]:
+    (recon, latent), (ref_recon, ref_latent) = outputs, reference
+    return {
+        "latent_max_abs": float(np.abs(latent - ref_latent).max()),
+        "recon_max_abs": float(np.abs(recon - ref_recon).max()),
+        "recon_error_max_abs": float(np.abs(((x - recon) ** 2).mean(1) - ((x - ref_recon) ** 2).mean(1)).max()),
+    }
+
+
+def load_runtime(kind: str, ae: nn.Module, input_dim: int, check: bool = True) -> AEForward:
+    """
+    Forward function for the given runtime. With check (the default) the
+    quantized runtime is refused when its reconstruction error drifts from
+    eager by RECON_ERROR_TOLERANCE or more; parity/benchmark tools pass
+    check=False to measure it anyway.
+    """
+    if kind == "eager":
+        return _torch_forward(ae)
+
+    if kind in ("torchscript", "quantized"):
+        path = TORCHSCRIPT_PATH if kind == "torchscript" else QUANTIZED_PATH
+        if os.path.exists(path):
+            model = torch.jit.load(path)
+        else:
+            # Not exported yet: trace in-process instead of failing
+            model = _trace(quantize(ae) if kind == "quantized" else ae, input_dim)
+        forward = _torch_forward(model.eval())
+        if kind == "quantized" and check:
+            x = _parity_rows(input_dim)
+            drift = _diff(x, forward(x), _torch_forward(ae)(x))["recon_error_max_abs"]
+            if drift >= RECON_ERROR_TOLERANCE:
+                raise RuntimeError(
+                    f"int8 autoencoder moves reconstruction error by up to {drift:.4f}, not below the "
+                    f"{RECON_ERROR_TOLERANCE} diagnosis routing threshold; use AE_RUNTIME=torchscript or onnx"
+                )
+        return forward
+
+    if kind == "onnx":
+        import onnxruntime as ort
+
+        if not os.path.exists(ONNX_PATH):
+            raise FileNotFoundError(f"{ONNX_PATH} not found; run `python -m Prediction_Agent.model.ae_runtime --export`")
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = 1
+        session = ort.InferenceSession(ONNX_PATH, options, providers=["CPUExecutionProvider"])
+
+        def forward(x: np.ndarray):
+            recon, latent = session.run(None, {"scaled": x})
+            return recon, latent
+        return forward
+
+    raise ValueError(f"Unknown autoencoder runtime '{kind}', expected one of {RUNTIMES}")
+
+
+def check_parity(ae: nn.Module, input_dim: int, kinds=RUNTIMES, n_rows: int = 1024, seed: int = 0) -> Dict[str, Dict[str, float]]:
+    """Max abs difference of each runtime's outputs against eager PyTorch on random scaled rows."""
+    x = _parity_rows(input_dim, n_rows, seed)
+    reference = load_runtime("eager", ae, input_dim)(x)
+
+    report = {}
+    for kind in kinds:
+        try:
+            outputs = load_runtime(kind, ae, input_dim, check=False)(x)
+        except (ImportError, FileNotFoundError, RuntimeError) as e:
+            report[kind] = {"error": str(e).splitlines()[0]}
+            continue
+        report[kind] = _diff(x, outputs, reference)
+        report[kind]["within_tolerance"] = report[kind]["recon_error_max_abs"] < RECON_ERROR_TOLERANCE
+    return report
+
+
+def benchmark(ae: nn.Module, input_dim: int, kinds=RUNTIMES, batch_size: int = 256,
+              repeats: int = 2000) -> Dict[str, Dict[str, float]]:
+    rng = np.random.default_rng(0)
+    row = rng.normal(size=(1, input_dim)).astype(np.float32)
+    batch = rng.normal(size=(batch_size, input_dim)).astype(np.float32)
+
+    report = {}
+    for kind in kinds:
+        try:
+            forward = load_runtime(kind, ae, input_dim, check=False)
+        except (ImportError, FileNotFoundError, RuntimeError) as e:
+            report[kind] = {"error": str(e).splitlines()[0]}
+            continue
+        for _ in range(50):
+            forward(row)
+
+        latencies = np.empty(repeats)
+        for i in range(repeats):
+            start = time.perf_counter()
+            forward(row)
+            latencies[i] = time.perf_counter() - start
+
+        batch_repeats = max(10, repeats // 50)
+        start = time.perf_counter()
+        for _ in range(batch_repeats):
+            forward(batch)
+        batch_s = (time.perf_counter() - start) / batch_repeats
+
+        report[kind] = {
+            "row_p50_us": float(np.percentile(latencies, 50) * 1e6),
+            "row_p99_us": float(np.percentile(latencies, 99) * 1e6),
+            f"batch{batch_size}_us": batch_s * 1e6,
+            "batch_rows_per_s": batch_size / batch_s,
+        }
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    from .prediction_tool import ae, ae_input_dim
+
+    parser = argparse.ArgumentParser(description="Export the SensorAutoencoder and compare runtimes")
+    parser.add_argument("--export", action="store_true", help="write TorchScript, int8 TorchScript and ONNX files")
+    parser.add_argument("--parity", action="store_true")
+    parser.add_argument("--bench", action="store_true")
+    args = parser.parse_args()
+
+    if args.export:
+        print("✅", export_torchscript(ae, ae_input_dim))
+        print("✅", export_torchscript(ae, ae_input_dim, QUANTIZED_PATH, int8=True))
+        try:
+            print("✅", export_onnx(ae, ae_input_dim))
+        except Exception as e:
+            print("⚠️ ONNX export skipped:", str(e).splitlines()[0])
+    if args.parity:
+        print(json.dumps(check_parity(ae, ae_input_dim), indent=2))
+    if args.bench:
+        print(json.dumps(benchmark(ae, ae_input_dim), indent=2))
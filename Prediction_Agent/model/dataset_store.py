@@ -0,0 +1,157 @@
+import json
+import os
+import shutil
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+# A columnar dataset is a directory next to the CSV it replaces:
+#   sensor_data_simulated.csv  ->  sensor_data_simulated.columnar/
+# holding one .npy file per column (or per column group, e.g. the 32 latents
+# as a single float32 matrix) and a manifest.json with dtypes and the label
+# dictionaries for text columns. np.load(..., mmap_mode="r") gives zero-copy
+# access to every array.
+
+MANIFEST = "manifest.json"
+SENSOR_COLUMNS = ["engine_temp", "vibration", "oil_pressure", "rpm", "battery_voltage"]
+
+
+def columnar_path(csv_path: str) -> str:
+    return os.path.splitext(csv_path)[0] + ".columnar"
+
+
+def _latent_columns(columns) -> List[str]:
+    return [c for c in columns if c.startswith("z") and c[1:].isdigit()]
+
+
+def default_groups(df: pd.DataFrame) -> Dict[str, List[str]]:
+    groups = {}
+    latent_cols = _latent_columns(df.columns)
+    if latent_cols:
+        groups["latents"] = latent_cols
+    sensor_cols = [c for c in SENSOR_COLUMNS if c in df.columns]
+    if sensor_cols:
+        groups["sensors"] = sensor_cols
+    return groups
+
+
+def save_columnar(df: pd.DataFrame, out_dir: str, groups: Dict[str, List[str]] = None) -> str:
+    if groups is None:
+        groups = default_groups(df)
+
+    tmp_dir = out_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    manifest = {"rows": len(df), "columns": list(df.columns), "groups": {}, "arrays": {}, "dictionaries": {}}
+    grouped = set()
+    for name, cols in groups.items():
+        dtype = np.float32 if name == "latents" else np.float64
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), np.ascontiguousarray(df[cols].to_numpy(dtype=dtype)))
+        manifest["groups"][name] = cols
+        grouped.update(cols)
+
+    for col in df.columns:
+        if col in grouped:
+            continue
+        values = df[col]
+        if pd.api.types.is_numeric_dtype(values) and not isinstance(values.dtype, pd.CategoricalDtype):
+            array = values.to_numpy()
+        else:
+            # Text / categorical columns: store int codes plus one copy of each distinct value
+            classes, codes = np.unique(values.astype(str).to_numpy(), return_inverse=True)
+            array = codes.astype(np.int16 if len(classes) < 2 ** 15 else np.int32)
+            manifest["dictionaries"][col] = classes.tolist()
+        np.save(os.path.join(tmp_dir, f"{col}.npy"), array)
+        manifest["arrays"][col] = str(array.dtype)
+
+    with open(os.path.join(tmp_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f)
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+    return out_dir
+
+
+class ColumnarDataset:
+    def __init__(self, path: str, mmap: bool = True):
+        self.path = path
+        self.mmap_mode = "r" if mmap else None
+        with open(os.path.join(path, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        self._cache = {}
+
+    def __len__(self):
+        return self.manifest["rows"]
+
+    @property
+    def columns(self) -> List[str]:
+        return self.manifest["columns"]
+
+    def _load(self, name):
+        if name not in self._cache:
+            self._cache[name] = np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode=self.mmap_mode)
+        return self._cache[name]
+
+    def matrix(self, group: str) -> np.ndarray:
+        """A column group (e.g. "latents") as one memory-mapped 2-D array."""
+        return self._load(group)
+
+    def codes(self, col: str):
+        """Dictionary-encoded column as (int codes, class names)."""
+        return self._load(col), np.asarray(self.manifest["dictionaries"][col])
+
+    def column(self, col: str) -> np.ndarray:
+        for group, cols in self.manifest["groups"].items():
+            if col in cols:
+                return self._load(group)[:, cols.index(col)]
+        if col in self.manifest["dictionaries"]:
+            codes, classes = self.codes(col)
+            return classes[codes]
+        return self._load(col)
+
+    def to_frame(self, columns: List[str] = None) -> pd.DataFrame:
+        columns = columns or self.columns
+        return pd.DataFrame({c: self.column(c) for c in columns}, columns=columns)
+
+
+def load_columnar(path: str, mmap: bool = True) -> ColumnarDataset:
+    return ColumnarDataset(path, mmap=mmap)
+
+
+def load_dataset(csv_path: str, mmap: bool = True):
+    """Open the columnar copy of csv_path if it exists, otherwise convert the CSV once and use that."""
+    path = columnar_path(csv_path)
+    manifest = os.path.join(path, MANIFEST)
+    stale = (not os.path.exists(manifest)
+             or (os.path.exists(csv_path) and os.path.getmtime(csv_path) > os.path.getmtime(manifest)))
+    if stale:
+        save_columnar(pd.read_csv(csv_path), path)
+    return load_columnar(path, mmap=mmap)
+
+
+def save_parquet(df: pd.DataFrame, path: str):
+    # Text columns become Arrow dictionary arrays, so repeated explanations are stored once
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].astype("category")
+    df.to_parquet(path, index=False)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert a dataset CSV to columnar .npy or Parquet storage")
+    parser.add_argument("csv")
+    parser.add_argument("--parquet", action="store_true", help="write <name>.parquet instead of <name>.columnar/")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.csv)
+    if args.parquet:
+        out = os.path.splitext(args.csv)[0] + ".parquet"
+        save_parquet(df, out)
+    else:
+        out = save_columnar(df, columnar_path(args.csv))
+    print(f"✅ {len(df)} rows written to {out}")
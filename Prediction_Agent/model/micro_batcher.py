@@ -0,0 +1,148 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Sequence
+
+from .prediction_tool import predict_failure_batch
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """
+    Collects single sensor rows from many callers and runs them through
+    `predict_failure_batch` together. A batch is flushed when it reaches
+    `max_batch_size` rows or when `max_wait_ms` has passed since its first row.
+    """
+
+    def __init__(
+        self,
+        predict_batch_fn: Callable[[Sequence[Sequence[float]]], List[Dict[str, Any]]] = predict_failure_batch,
+        max_batch_size: int = 256,
+        max_wait_ms: float = 5.0,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self.predict_batch_fn = predict_batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self.batches_run = 0
+        self.rows_run = 0
+
+        self._queue = queue.Queue()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="prediction-micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, sensor_data: Sequence[float]) -> Future:
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed")
+        future = Future()
+        self._queue.put((sensor_data, future))
+        return future
+
+    def predict(self, sensor_data: Sequence[float], timeout: float = None) -> Dict[str, Any]:
+        return self.submit(sensor_data).result(timeout)
+
+    async def predict_async(self, sensor_data: Sequence[float]) -> Dict[str, Any]:
+        return await asyncio.wrap_future(self.submit(sensor_data))
+
+    def close(self, timeout: float = None):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._worker.join(timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _collect(self, first):
+        batch = [first]
+        stop = False
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stop = True
+                break
+            batch.append(item)
+        return batch, stop
+
+    def _predict(self, batch) -> List[Dict[str, Any]]:
+        results = self.predict_batch_fn([row for row, _ in batch])
+        if len(results) != len(batch):
+            # Can't tell which rows the results belong to; zip() would leave the rest hanging
+            raise RuntimeError(f"predict_batch_fn returned {len(results)} results for {len(batch)} rows")
+        return results
+
+    def _resolve(self, batch, results):
+        self.batches_run += 1
+        self.rows_run += len(batch)
+        for (_, fut), result in zip(batch, results):
+            fut.set_result(result)
+
+    def _run(self):
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch, stop = self._collect(item)
+
+            # Callers may have cancelled while waiting in the queue
+            batch = [(row, fut) for row, fut in batch if fut.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            try:
+                results = self._predict(batch)
+            except Exception as e:
+                if len(batch) == 1:
+                    batch[0][1].set_exception(e)
+                    continue
+                # One bad row must not fail everyone else: retry the rows one by one
+                for item in batch:
+                    try:
+                        self._resolve([item], self._predict([item]))
+                    except Exception as row_error:
+                        item[1].set_exception(row_error)
+                continue
+            self._resolve(batch, results)
+
+        # Fail anything submitted after close() so callers don't hang
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP and item[1].set_running_or_notify_cancel():
+                item[1].set_exception(RuntimeError("MicroBatcher is closed"))
+
+
+if __name__ == "__main__":
+    from concurrent.futures import ThreadPoolExecutor
+    from sensor_simulator import SensorSimulator
+
+    vehicles = [SensorSimulator() for _ in range(200)]
+    rows = [v.step() for v in vehicles for _ in range(10)]
+
+    with MicroBatcher(max_batch_size=256, max_wait_ms=2.0) as batcher:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=64) as pool:
+            results = list(pool.map(batcher.predict, rows))
+        elapsed = time.perf_counter() - start
+
+    print(f"{len(results)} rows in {elapsed:.3f}s "
+          f"({len(results) / elapsed:.0f} rows/s, {batcher.batches_run} batches)")
@@ -1,68 +1,133 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Sequence
 import os
-import torch
-import torch.nn as nn
 import joblib
 import numpy as np
+from .tree_predictor import load_predictor
+from model_registry import registry
+import metrics
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))  
 MODEL_DIR = os.path.join(BASE_DIR, "models")
 
-scaler = joblib.load(os.path.join(MODEL_DIR, "scaler.pkl"))
-
-class SensorAutoencoder(nn.Module):
-    def __init__(self, input_dim, latent_dim=32):
-        super().__init__()
-        self.encoder = nn.Sequential(
-            nn.Linear(input_dim, 256),
-            nn.ReLU(),
-            nn.Linear(256, 128),
-            nn.ReLU(),
-            nn.Linear(128, latent_dim)
-        )
-        self.decoder = nn.Sequential(
-            nn.Linear(latent_dim, 128),
-            nn.ReLU(),
-            nn.Linear(128, 256),
-            nn.ReLU(),
-            nn.Linear(256, input_dim)
-        )
-
-    def forward(self, x):
-        z = self.encoder(x)
-        x_hat = self.decoder(z)
-        return x_hat, z
-
-ae_input_dim = scaler.mean_.shape[0]
-ae = SensorAutoencoder(input_dim=ae_input_dim, latent_dim=32)
-ae.load_state_dict(torch.load(os.path.join(MODEL_DIR, "autoencoder.pt")))
-ae.eval()
-
-xgb_model = joblib.load(os.path.join(MODEL_DIR, "xgb_model.pkl"))
-
-def predict_failure(sensor_data: List[float]) -> Dict[str, Any]:
+# eager | torchscript | quantized | onnx (see ae_runtime.py for export; quantized
+# is refused while its int8 drift could change diagnosis routing)
+AE_RUNTIME = os.getenv("AE_RUNTIME", "eager")
+# xgboost | flat (NumPy tree evaluator from tree_predictor.py, much faster per row)
+XGB_BACKEND = os.getenv("PREDICTION_XGB_BACKEND", "xgboost")
+
+# ===================== Lazy model loading =====================
+# Nothing heavy (torch, sklearn, xgboost) is imported until a model is first
+# used; call registry.warm() to load everything up front.
+
+def _load_scaler():
+    return joblib.load(os.path.join(MODEL_DIR, "scaler.pkl"))
+
+def _load_ae():
+    import torch
+    from .autoencoder import SensorAutoencoder
+
+    ae = SensorAutoencoder(input_dim=registry.get("prediction.ae_input_dim"), latent_dim=32)
+    ae.load_state_dict(torch.load(os.path.join(MODEL_DIR, "autoencoder.pt")))
+    ae.eval()
+    return ae
+
+def _load_ae_forward():
+    from .ae_runtime import load_runtime
+    return load_runtime(AE_RUNTIME, registry.get("prediction.ae"), registry.get("prediction.ae_input_dim"))
+
+def _load_xgb_model():
+    return joblib.load(os.path.join(MODEL_DIR, "xgb_model.pkl"))
+
+registry.register("prediction.scaler", _load_scaler)
+registry.register("prediction.ae_input_dim", lambda: registry.get("prediction.scaler").mean_.shape[0])
+registry.register("prediction.ae", _load_ae)
+registry.register("prediction.ae_forward", _load_ae_forward)
+registry.register("prediction.xgb_model", _load_xgb_model)
+registry.register("prediction.xgb_predictor", lambda: load_predictor(registry.get("prediction.xgb_model"), XGB_BACKEND))
+
+# Old module attributes (scaler, ae, xgb_model, ...) still work, resolved through the registry
+_LAZY_ATTRS = {
+    "scaler": "prediction.scaler",
+    "ae_input_dim": "prediction.ae_input_dim",
+    "ae": "prediction.ae",
+    "ae_forward": "prediction.ae_forward",
+    "xgb_model": "prediction.xgb_model",
+    "xgb_predictor": "prediction.xgb_predictor",
+}
+
+def __getattr__(name):
+    if name in _LAZY_ATTRS:
+        return registry.get(_LAZY_ATTRS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def set_ae_runtime(kind: str):
+    global AE_RUNTIME
+    from .ae_runtime import load_runtime
+    registry.set("prediction.ae_forward", load_runtime(kind, registry.get("prediction.ae"), registry.get("prediction.ae_input_dim")))
+    AE_RUNTIME = kind
+
+# Failure probability above which DiagnosisAgent runs and needs the latent vector
+DIAGNOSIS_THRESHOLD = 0.2
+
+def _run_models(sensor_matrix: np.ndarray):
+    get = registry.get
+    t = metrics.start()
+    scaled = get("prediction.scaler").transform(sensor_matrix).astype(np.float32)
+    t = metrics.lap("prediction.scale", t)
+
+    recon, latent = get("prediction.ae_forward")(scaled)
+    recon_error = ((scaled - recon) ** 2).mean(axis=1)
+    t = metrics.lap("prediction.ae_forward", t)
+
+    # XGBoost feature rows [latent | recon_error], filled in place from the arrays
+    features = np.empty((len(latent), latent.shape[1] + 1), dtype=np.float32)
+    features[:, :-1] = latent
+    features[:, -1] = recon_error
+    failure_prob = get("prediction.xgb_predictor").predict_proba(features)[:, 1]
+    metrics.stop("prediction.xgb", t)
+    return failure_prob, latent, recon_error
+
+def predict_failure(sensor_data: List[float], latent_threshold: Optional[float] = None) -> Dict[str, Any]:
+    # With latent_threshold set, the latent list is only built when failure_probability
+    # exceeds it (i.e. when diagnosis will run); otherwise latent_vector is None.
     sensor_array = np.array(sensor_data)
     if len(sensor_array.shape) > 1:
         sensor_array = sensor_array.flatten()[np.newaxis, :]
     else:
         sensor_array = sensor_array.reshape(1, -1)
 
-    scaled = scaler.transform(sensor_array)
-
-    with torch.no_grad():
-        tensor = torch.tensor(scaled, dtype=torch.float32)
-        recon, latent = ae(tensor)
-        recon_error = ((tensor - recon) ** 2).mean(dim=1).item()
-        latent_vector = latent.numpy().flatten().tolist()
-
-    features = np.hstack([latent.numpy(), [[recon_error]]])
-    failure_prob = xgb_model.predict_proba(features)[0][1]
+    failure_prob, latent, recon_error = _run_models(sensor_array)
+    prob = float(failure_prob[0])
+    needs_latent = latent_threshold is None or prob > latent_threshold
 
     return {
-        "failure_probability": float(failure_prob),
-        "latent_vector": latent_vector,
-        "reconstruction_error": float(recon_error)
+        "failure_probability": prob,
+        "latent_vector": latent[0].tolist() if needs_latent else None,
+        "reconstruction_error": float(recon_error[0])
     }
 
+def predict_failure_batch(sensor_rows: Sequence[Sequence[float]],
+                          latent_threshold: Optional[float] = None) -> List[Dict[str, Any]]:
+    # One scaler / autoencoder / XGBoost call for the whole batch; results keep input order.
+    if len(sensor_rows) == 0:
+        return []  # np.asarray([]) is 1-D, so check before the shape
+    sensor_matrix = np.asarray(sensor_rows, dtype=np.float64)
+    if sensor_matrix.ndim != 2:
+        raise ValueError(f"Expected a 2-D batch of sensor rows, got shape {sensor_matrix.shape}")
+
+    failure_prob, latent, recon_error = _run_models(sensor_matrix)
+    probs = failure_prob.tolist()
+    errors = recon_error.tolist()
+
+    return [
+        {
+            "failure_probability": probs[i],
+            "latent_vector": latent[i].tolist()
+            if latent_threshold is None or probs[i] > latent_threshold else None,
+            "reconstruction_error": errors[i]
+        }
+        for i in range(len(sensor_matrix))
+    ]
+
 async def predict(sensor_data: List[float]) -> Dict[str, Any]:
     return predict_failure(sensor_data)
 
@@ -1,8 +1,12 @@
 from typing import Any, Dict
 from .node_base import Node
-from .prediction_tool import predict_failure 
+from .prediction_tool import predict_failure, DIAGNOSIS_THRESHOLD
 
 class PredictiveAgentNode(Node):
+    input_schema = {"vehicle_id": object, "sensor_data": list}
+    output_schema = {"failure_probability": float, "latent_vector": object, "reconstruction_error": float}
+    optional_inputs = ("vehicle_id",)
+
     def __init__(self,name="PredictiveAgent"):
         super().__init__(name)
 
@@ -11,9 +15,10 @@ class PredictiveAgentNode(Node):
         if not sensor_data:
             return {"error": "No sensor data provided"}
 
-        result = predict_failure(sensor_data)
+        # Normal telemetry skips building the latent list; only diagnosis needs it
+        result = predict_failure(sensor_data, latent_threshold=DIAGNOSIS_THRESHOLD)
         return result
     def should_run_next(self, output):
     # Only run Diagnosis if failure probability is above threshold
-        return output.get("failure_probability", 0) > 0.2
+        return output.get("failure_probability", 0) > DIAGNOSIS_THRESHOLD
 
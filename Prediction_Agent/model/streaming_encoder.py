@@ -0,0 +1,138 @@
+import os
+from typing import Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+import torch
+
+SENSOR_COLUMNS = [
+    "engine_temp",
+    "vibration",
+    "oil_pressure",
+    "rpm",
+    "battery_voltage"
+]
+LATENT_DIM = 32
+
+# Encode a large telemetry file without loading it (run from the repo root):
+#
+#   python -m Prediction_Agent.model.streaming_encoder sensors.csv out_dir/
+
+
+def _is_parquet(path: str) -> bool:
+    return path.endswith((".parquet", ".pq"))
+
+
+def count_rows(path: str) -> int:
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+
+        return pq.ParquetFile(path).metadata.num_rows
+
+    # Count lines in 1 MB blocks instead of parsing the CSV; blank lines
+    # (including trailing ones) are skipped, as pandas skips them
+    lines = 0
+    tail = b""
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(1 << 20)
+            if not block:
+                break
+            parts = (tail + block).split(b"\n")
+            tail = parts.pop()  # partial line, finished by the next block
+            lines += len(parts) - parts.count(b"") - parts.count(b"\r")
+    if tail.strip():
+        lines += 1
+    return max(lines - 1, 0)  # header
+
+
+def iter_sensor_chunks(path: str, chunksize: int, columns: List[str] = SENSOR_COLUMNS) -> Iterator[pd.DataFrame]:
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()[columns]
+    else:
+        for chunk in pd.read_csv(path, usecols=columns, chunksize=chunksize):
+            yield chunk[columns]
+
+
+def encode_batches(ae, X_scaled: np.ndarray, batch_size: int = 8192) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Yield (latent, reconstruction_error) for fixed-size slices of X_scaled."""
+    with torch.no_grad():
+        for start in range(0, len(X_scaled), batch_size):
+            tensor = torch.as_tensor(X_scaled[start:start + batch_size], dtype=torch.float32)
+            recon, z = ae(tensor)
+            recon_error = ((recon - tensor) ** 2).mean(dim=1)
+            yield z.numpy(), recon_error.numpy()
+
+
+def encode_array(ae, X_scaled: np.ndarray, batch_size: int = 8192) -> Tuple[np.ndarray, np.ndarray]:
+    latents = np.empty((len(X_scaled), LATENT_DIM), dtype=np.float32)
+    errors = np.empty(len(X_scaled), dtype=np.float32)
+    offset = 0
+    for z, recon_error in encode_batches(ae, X_scaled, batch_size):
+        latents[offset:offset + len(z)] = z
+        errors[offset:offset + len(z)] = recon_error
+        offset += len(z)
+    return latents, errors
+
+
+def load_encoder():
+    # Absolute import: this module is also imported as plain `streaming_encoder`
+    # by the training scripts, where a relative import fails
+    from Prediction_Agent.model.prediction_tool import scaler, ae
+
+    return scaler, ae
+
+
+def encode_stream(input_path: str, output_dir: str, scaler=None, ae=None,
+                  chunksize: int = 100_000, batch_size: int = 8192,
+                  columns: List[str] = SENSOR_COLUMNS) -> Tuple[str, str]:
+    """
+    Scale and encode a sensor CSV/Parquet file chunk by chunk. Latents and
+    reconstruction errors are written straight into .npy files opened as
+    memmaps, so peak memory is one chunk regardless of input size.
+    Returns the (latents_path, recon_error_path) pair; open them with
+    np.load(path, mmap_mode="r").
+    """
+    if scaler is None or ae is None:
+        scaler, ae = load_encoder()
+
+    n_rows = count_rows(input_path)
+    os.makedirs(output_dir, exist_ok=True)
+    latents_path = os.path.join(output_dir, "latents.npy")
+    errors_path = os.path.join(output_dir, "recon_error.npy")
+
+    latents = np.lib.format.open_memmap(latents_path, mode="w+", dtype=np.float32, shape=(n_rows, LATENT_DIM))
+    errors = np.lib.format.open_memmap(errors_path, mode="w+", dtype=np.float32, shape=(n_rows,))
+
+    offset = 0
+    for chunk in iter_sensor_chunks(input_path, chunksize, columns):
+        X_scaled = scaler.transform(chunk.to_numpy())
+        for z, recon_error in encode_batches(ae, X_scaled, batch_size):
+            latents[offset:offset + len(z)] = z
+            errors[offset:offset + len(z)] = recon_error
+            offset += len(z)
+
+    if offset != n_rows:
+        raise ValueError(f"Expected {n_rows} rows in {input_path}, encoded {offset}")
+
+    latents.flush()
+    errors.flush()
+    del latents, errors
+    return latents_path, errors_path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Encode sensor telemetry to latents in bounded memory")
+    parser.add_argument("input", help="sensor CSV or Parquet file")
+    parser.add_argument("output_dir")
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=8192)
+    args = parser.parse_args()
+
+    paths = encode_stream(args.input, args.output_dir, chunksize=args.chunksize, batch_size=args.batch_size)
+    print("✅ Encoded:", *paths)
@@ -1,5 +1,4 @@
 # train_predictive_model.py
-import pandas as pd
 import torch
 import torch.nn as nn
 from torch.utils.data import DataLoader, TensorDataset
@@ -8,38 +7,19 @@ from xgboost import XGBClassifier
 import joblib
 from sklearn.metrics import classification_report
 from sklearn.preprocessing import StandardScaler
+from streaming_encoder import encode_array
+from dataset_store import load_dataset
+from autoencoder import SensorAutoencoder
 
 
-df = pd.read_csv("../dataset/sensor_data_simulated.csv")
-y = df["failed"].values
-X_raw = df.drop("failed", axis=1).values
+# Memory-mapped .npy columns; the CSV is only parsed the first time (or when it changes)
+data = load_dataset("../dataset/sensor_data_simulated.csv")
+y = data.column("failed")
+X_raw = data.matrix("sensors")
 
 scaler = StandardScaler()
 X_scaled = scaler.fit_transform(X_raw)
 
-class SensorAutoencoder(nn.Module):
-    def __init__(self, input_dim, latent_dim=32):
-        super().__init__()
-        self.encoder = nn.Sequential(
-            nn.Linear(input_dim, 256),
-            nn.ReLU(),
-            nn.Linear(256, 128),
-            nn.ReLU(),
-            nn.Linear(128, latent_dim)
-        )
-        self.decoder = nn.Sequential(
-            nn.Linear(latent_dim, 128),
-            nn.ReLU(),
-            nn.Linear(128, 256),
-            nn.ReLU(),
-            nn.Linear(256, input_dim)
-        )
-
-    def forward(self, x):
-        z = self.encoder(x)
-        x_hat = self.decoder(z)
-        return x_hat, z
-
 input_dim = X_scaled.shape[1]
 ae = SensorAutoencoder(input_dim=input_dim, latent_dim=32)
 ae.train()
@@ -68,12 +48,10 @@ torch.save(ae.state_dict(), "models/autoencoder.pt")
 print("✅ Autoencoder trained & saved.")
 
 ae.eval()
-X_tensor = torch.tensor(X_scaled, dtype=torch.float32)
-with torch.no_grad():
-    recon, z = ae(X_tensor)
-    recon_error = ((recon - X_tensor) ** 2).mean(dim=1).unsqueeze(1)
+# Encode in fixed-size batches so the forward pass never holds the whole dataset
+z, recon_error = encode_array(ae, X_scaled)
 
-X_features = torch.cat([z, recon_error], dim=1).numpy()
+X_features = np.hstack([z, recon_error[:, np.newaxis]])
 
 xgb_model = XGBClassifier(
     n_estimators=300,
@@ -0,0 +1,100 @@
+# train_windowed_model.py
+# Same autoencoder + XGBoost pipeline as train.py, trained on sliding-window
+# features (window_features.py) instead of the instantaneous 5-value reading.
+import argparse
+import json
+import os
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader, TensorDataset
+import numpy as np
+from xgboost import XGBClassifier
+import joblib
+from sklearn.metrics import classification_report
+from sklearn.preprocessing import StandardScaler
+from streaming_encoder import SENSOR_COLUMNS, encode_array
+from dataset_store import load_dataset
+from autoencoder import SensorAutoencoder
+from window_features import EWMA_ALPHA, WINDOW, compute_window_features, feature_names
+
+parser = argparse.ArgumentParser(description="Train the windowed-feature failure model")
+parser.add_argument("--dataset", default="../dataset/sensor_data_simulated.csv")
+parser.add_argument("--window", type=int, default=WINDOW)
+parser.add_argument("--alpha", type=float, default=EWMA_ALPHA)
+parser.add_argument("--epochs", type=int, default=30)
+parser.add_argument("--output", default="models/windowed")
+args = parser.parse_args()
+os.makedirs(args.output, exist_ok=True)
+
+data = load_dataset(args.dataset)
+y = data.column("failed")
+X_raw = data.matrix("sensors")
+# Rows are time-ordered; with a vehicle_id column each vehicle gets its own window
+vehicle_ids = data.column("vehicle_id") if "vehicle_id" in data.columns else None
+X_window = compute_window_features(X_raw, vehicle_ids, window=args.window, alpha=args.alpha)
+
+scaler = StandardScaler()
+X_scaled = scaler.fit_transform(X_window)
+
+input_dim = X_scaled.shape[1]
+ae = SensorAutoencoder(input_dim=input_dim, latent_dim=32)
+ae.train()
+
+normal_mask = y == 0
+X_train_ae = torch.tensor(X_scaled[normal_mask], dtype=torch.float32)
+dataset = TensorDataset(X_train_ae)
+loader = DataLoader(dataset, batch_size=64, shuffle=True)
+
+optimizer = torch.optim.Adam(ae.parameters(), lr=1e-3)
+loss_fn = nn.MSELoss()
+
+for epoch in range(args.epochs):
+    total_loss = 0
+    for (batch,) in loader:
+        recon, _ = ae(batch)
+        loss = loss_fn(recon, batch)
+        optimizer.zero_grad()
+        loss.backward()
+        optimizer.step()
+        total_loss += loss.item()
+    print(f"Epoch {epoch+1}/{args.epochs}, Loss: {total_loss/len(loader):.6f}")
+
+torch.save(ae.state_dict(), os.path.join(args.output, "autoencoder.pt"))
+print("✅ Autoencoder trained & saved.")
+
+ae.eval()
+z, recon_error = encode_array(ae, X_scaled)
+
+X_features = np.hstack([z, recon_error[:, np.newaxis]])
+
+xgb_model = XGBClassifier(
+    n_estimators=300,
+    max_depth=6,
+    learning_rate=0.05,
+    subsample=0.8,
+    colsample_bytree=0.8,
+    eval_metric="logloss"
+)
+xgb_model.fit(X_features, y)
+joblib.dump(xgb_model, os.path.join(args.output, "xgb_model.pkl"))
+print("✅ XGBoost trained & saved.")
+
+y_pred = xgb_model.predict(X_features)
+report = classification_report(y, y_pred, target_names=["Normal", "Failed"])
+print("\n=== Classification Report ===")
+print(report)
+
+with open(os.path.join(args.output, "classification_report.txt"), "w") as f:
+    f.write(report)
+
+joblib.dump(scaler, os.path.join(args.output, "scaler.pkl"))
+# The predictor rebuilds its feature store from these settings
+with open(os.path.join(args.output, "meta.json"), "w") as f:
+    json.dump({
+        "window": args.window,
+        "alpha": args.alpha,
+        "sensors": SENSOR_COLUMNS,
+        "features": feature_names(),
+        "latent_dim": 32,
+    }, f, indent=2)
+print("✅ All done. Models + report saved.")
@@ -0,0 +1,208 @@
+import json
+import time
+from typing import Dict
+
+import numpy as np
+
+BACKENDS = ("xgboost", "flat")
+
+
+def _parse_base_score(value: str) -> np.ndarray:
+    # "5E-1" in older dumps, "[5E-2]" / "[2.4E-1,5E-3,...]" in newer ones
+    return np.array([float(v) for v in value.strip("[]").split(",")], dtype=np.float64)
+
+
+class FlatTreeEnsemble:
+    """
+    XGBoost gbtree model flattened into NumPy arrays and evaluated for all
+    trees at once, one tree level per step. Avoids the sklearn wrapper and
+    DMatrix construction, which dominate the cost of a single-row predict.
+    """
+
+    def __init__(self, left, right, feature, threshold, default_left, value,
+                 roots, tree_class, n_classes, base_margin, objective, depth,
+                 batch_model=None, batch_cutover=64):
+        # children[2*i] is the left child of node i, children[2*i + 1] the right one
+        self.children = np.column_stack([left, right]).ravel()
+        self.left = left
+        self.right = right
+        self.feature = feature
+        self.threshold = threshold
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.n_classes = n_classes
+        self.base_margin = base_margin
+        self.objective = objective
+        self.depth = depth
+
+        # Level-by-level NumPy traversal wins for a handful of rows; XGBoost's own
+        # multithreaded predictor is faster for big batches, so hand those back.
+        self.batch_model = batch_model
+        self.batch_cutover = batch_cutover
+
+        # (n_trees x n_outputs) 0/1 matrix summing each tree into its class margin
+        n_outputs = 1 if n_classes <= 2 else n_classes
+        self.class_matrix = np.zeros((len(roots), n_outputs), dtype=np.float64)
+        self.class_matrix[np.arange(len(roots)), tree_class] = 1.0
+
+    @classmethod
+    def from_xgb(cls, model) -> "FlatTreeEnsemble":
+        booster = model.get_booster() if hasattr(model, "get_booster") else model
+        learner = json.loads(booster.save_raw("json"))["learner"]
+
+        objective = learner["objective"]["name"]
+        if learner["gradient_booster"]["name"] != "gbtree":
+            raise NotImplementedError("Only gbtree boosters can be flattened")
+        trees_json = learner["gradient_booster"]["model"]["trees"]
+        tree_info = learner["gradient_booster"]["model"]["tree_info"]
+        n_classes = max(int(learner["learner_model_param"]["num_class"]), 2)
+        base_score = _parse_base_score(learner["learner_model_param"]["base_score"])
+
+        if objective == "binary:logistic":
+            base_margin = np.log(base_score / (1 - base_score))
+        elif objective in ("multi:softprob", "multi:softmax"):
+            base_margin = base_score
+        else:
+            raise NotImplementedError(f"Objective {objective} is not supported")
+
+        lefts, rights, features, thresholds, defaults, values, roots = [], [], [], [], [], [], []
+        offset = 0
+        depth = 0
+        for tree in trees_json:
+            if any(tree["split_type"]):
+                raise NotImplementedError("Categorical splits are not supported")
+            left = np.asarray(tree["left_children"], dtype=np.int64)
+            right = np.asarray(tree["right_children"], dtype=np.int64)
+            leaf = left == -1
+            own = np.arange(len(left))
+
+            # Leaves point at themselves, so extra traversal steps are no-ops
+            lefts.append(np.where(leaf, own, left) + offset)
+            rights.append(np.where(leaf, own, right) + offset)
+            features.append(np.where(leaf, 0, tree["split_indices"]))
+            thresholds.append(np.asarray(tree["split_conditions"], dtype=np.float32))
+            defaults.append(np.asarray(tree["default_left"], dtype=bool))
+            values.append(np.where(leaf, np.asarray(tree["split_conditions"], dtype=np.float64), 0.0))
+            roots.append(offset)
+            depth = max(depth, cls._tree_depth(left, right))
+            offset += len(left)
+
+        return cls(
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            feature=np.concatenate(features).astype(np.int64),
+            threshold=np.concatenate(thresholds),
+            default_left=np.concatenate(defaults),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.int64),
+            tree_class=np.asarray(tree_info, dtype=np.int64) if n_classes > 2 else np.zeros(len(roots), dtype=np.int64),
+            n_classes=n_classes,
+            base_margin=base_margin,
+            objective=objective,
+            depth=depth,
+            batch_model=model if hasattr(model, "predict_proba") else None,
+        )
+
+    @staticmethod
+    def _tree_depth(left, right):
+        depth, frontier = 0, [0]
+        while True:
+            frontier = [c for n in frontier for c in (left[n], right[n]) if c != -1]
+            if not frontier:
+                return depth
+            depth += 1
+
+    def _row_leaves(self, x):
+        node = self.roots
+        for _ in range(self.depth):
+            node = self.children[2 * node + (x[self.feature[node]] >= self.threshold[node])]
+        return node
+
+    def _leaves(self, X):
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        row_offset = (np.arange(len(X)) * X.shape[1])[:, np.newaxis]
+        flat_X = X.ravel()
+        for _ in range(self.depth):
+            x = flat_X[row_offset + self.feature[node]]
+            go_left = np.where(np.isnan(x), self.default_left[node], x < self.threshold[node])
+            node = np.where(go_left, self.left[node], self.right[node])
+        return node
+
+    def predict_margin(self, X) -> np.ndarray:
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        if len(X) == 1 and not np.isnan(X).any():
+            leaves = self._row_leaves(X[0])[np.newaxis, :]
+        else:
+            leaves = self._leaves(X)
+        return self.value[leaves] @ self.class_matrix + self.base_margin
+
+    def predict_proba(self, X) -> np.ndarray:
+        if self.batch_model is not None and len(X) > self.batch_cutover:
+            return self.batch_model.predict_proba(X)
+        margin = self.predict_margin(X)
+        if self.n_classes <= 2:
+            p = 1.0 / (1.0 + np.exp(-margin[:, 0]))
+            return np.column_stack([1.0 - p, p])
+        margin = margin - margin.max(axis=1, keepdims=True)
+        exp = np.exp(margin)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+
+def load_predictor(model, backend: str):
+    """Return an object with predict_proba(X) for the given backend ("xgboost" or "flat")."""
+    if backend == "xgboost":
+        return model
+    if backend == "flat":
+        return FlatTreeEnsemble.from_xgb(model)
+    raise ValueError(f"Unknown tree backend '{backend}', expected one of {BACKENDS}")
+
+
+def compare(model, X, repeats: int = 500) -> Dict[str, float]:
+    """Parity and latency of the flat evaluator against the XGBoost model on rows X."""
+    flat = FlatTreeEnsemble.from_xgb(model)
+    X = np.asarray(X, dtype=np.float32)
+
+    report = {"max_abs_diff": float(np.abs(flat.predict_proba(X[:flat.batch_cutover]) - model.predict_proba(X[:flat.batch_cutover])).max())}
+    # Also check the multi-row traversal on the full set, bypassing the batch hand-off
+    report["max_abs_diff_batch_path"] = float(np.abs(
+        FlatTreeEnsemble.from_xgb(model.get_booster()).predict_proba(X) - model.predict_proba(X)).max())
+    single = np.array([flat.predict_proba(X[i:i + 1])[0] for i in range(len(X))])
+    report["max_abs_diff_row_path"] = float(np.abs(single - model.predict_proba(X)).max())
+    for name, predictor in (("xgboost", model), ("flat", flat)):
+        for _ in range(20):
+            predictor.predict_proba(X[:1])
+        latencies = np.empty(repeats)
+        for i in range(repeats):
+            row = X[i % len(X):i % len(X) + 1]
+            start = time.perf_counter()
+            predictor.predict_proba(row)
+            latencies[i] = time.perf_counter() - start
+        start = time.perf_counter()
+        predictor.predict_proba(X)
+        batch_s = time.perf_counter() - start
+
+        report[f"{name}_row_p50_us"] = float(np.percentile(latencies, 50) * 1e6)
+        report[f"{name}_row_p99_us"] = float(np.percentile(latencies, 99) * 1e6)
+        report[f"{name}_batch_rows_per_s"] = len(X) / batch_s
+    return report
+
+
+if __name__ == "__main__":
+    import os
+    import joblib
+
+    base = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from Prediction_Agent.model.dataset_store import load_dataset
+
+    data = load_dataset(os.path.join(base, "Diagnosis_Agent", "data", "diagnosis_latent_dataset.csv"))
+    X = np.hstack([data.matrix("latents"), data.column("reconstruction_error")[:, np.newaxis]]).astype(np.float32)
+
+    for name, path in (
+        ("failure", os.path.join(base, "Prediction_Agent", "model", "models", "xgb_model.pkl")),
+        ("diagnosis", os.path.join(base, "Diagnosis_Agent", "models", "xgb_diagnosis.pkl")),
+    ):
+        print(name, json.dumps(compare(joblib.load(path), X), indent=2))
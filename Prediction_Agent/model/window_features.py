@@ -0,0 +1,244 @@
+import threading
+from typing import Dict, Hashable, List, Optional, Sequence
+
+import numpy as np
+
+# Streaming sliding-window features per vehicle.
+#
+# All vehicles share a handful of preallocated arrays: a ring buffer of the
+# last `window` readings per sensor plus running sums (Σy, Σy², Σi·y) and an
+# EWMA. Each new reading updates those in O(1) -- the value leaving the window
+# is subtracted, the new one added -- so mean / std / least-squares slope
+# never rescan the window. Memory is `bytes_per_vehicle` times the slot
+# capacity, whatever the traffic.
+
+SENSOR_COLUMNS = ["engine_temp", "vibration", "oil_pressure", "rpm", "battery_voltage"]
+WINDOW = 32
+EWMA_ALPHA = 0.2
+STATS = ("mean", "std", "slope", "ewma")
+
+
+def feature_names(sensors: Sequence[str] = SENSOR_COLUMNS) -> List[str]:
+    """Column order of the feature rows: raw reading, then each statistic per sensor."""
+    return list(sensors) + [f"{s}_{stat}" for stat in STATS for s in sensors]
+
+
+class WindowFeatureStore:
+    def __init__(self, window: int = WINDOW, n_sensors: int = len(SENSOR_COLUMNS), alpha: float = EWMA_ALPHA,
+                 capacity: int = 1024, dtype=np.float32, resync_windows: int = 64):
+        if window < 2:
+            raise ValueError("window must hold at least 2 readings")
+        self.window = window
+        self.n_sensors = n_sensors
+        self.alpha = alpha
+        self.dtype = np.dtype(dtype)
+        # Running sums are exact again after every `resync_windows` full windows
+        self.resync_every = window * resync_windows
+
+        self._slots: Dict[Hashable, int] = {}
+        self._free: List[int] = []
+        self._lock = threading.Lock()
+        self._allocate(capacity)
+
+    # ---------------- storage ----------------
+    def _allocate(self, capacity: int):
+        self.capacity = capacity
+        self.buf = np.zeros((capacity, self.window, self.n_sensors), dtype=self.dtype)
+        self.count = np.zeros(capacity, dtype=np.int32)
+        self.head = np.zeros(capacity, dtype=np.int32)
+        self.seen = np.zeros(capacity, dtype=np.int64)
+        self.s1 = np.zeros((capacity, self.n_sensors))
+        self.s2 = np.zeros((capacity, self.n_sensors))
+        self.sxy = np.zeros((capacity, self.n_sensors))
+        self.ewma = np.zeros((capacity, self.n_sensors))
+
+    def _grow(self):
+        old = {name: getattr(self, name) for name in ("buf", "count", "head", "seen", "s1", "s2", "sxy", "ewma")}
+        self._allocate(self.capacity * 2)
+        for name, array in old.items():
+            getattr(self, name)[:len(array)] = array
+
+    @property
+    def bytes_per_vehicle(self) -> int:
+        return (self.window * self.n_sensors * self.dtype.itemsize  # ring buffer
+                + 4 * self.n_sensors * 8                            # s1, s2, sxy, ewma
+                + 4 + 4 + 8)                                        # count, head, seen
+
+    def nbytes(self) -> int:
+        return self.capacity * self.bytes_per_vehicle
+
+    def __len__(self):
+        return len(self._slots)
+
+    def _slot(self, vehicle_id: Hashable) -> int:
+        slot = self._slots.get(vehicle_id)
+        if slot is None:
+            if self._free:
+                slot = self._free.pop()
+            else:
+                slot = len(self._slots)
+                if slot >= self.capacity:
+                    self._grow()
+            self._slots[vehicle_id] = slot
+        return slot
+
+    def remove(self, vehicle_id: Hashable):
+        with self._lock:
+            slot = self._slots.pop(vehicle_id, None)
+            if slot is not None:
+                self._reset_slots(np.array([slot]))
+                self._free.append(slot)
+
+    def _reset_slots(self, slots: np.ndarray):
+        for name in ("count", "head", "seen", "s1", "s2", "sxy", "ewma"):
+            getattr(self, name)[slots] = 0
+
+    # ---------------- updates ----------------
+    def update(self, vehicle_id: Hashable, reading: Sequence[float]) -> np.ndarray:
+        """Add one reading and return that vehicle's feature row."""
+        return self.update_batch([vehicle_id], [reading])[0]
+
+    def update_batch(self, vehicle_ids: Sequence[Hashable], readings) -> np.ndarray:
+        """
+        Add one reading per entry (in order; a vehicle may appear several times)
+        and return the feature row after each reading, shape (N, len(feature_names)).
+        """
+        readings = np.asarray(readings, dtype=np.float64)
+        if readings.ndim != 2 or readings.shape[1] != self.n_sensors:
+            raise ValueError(f"Expected readings of shape (N, {self.n_sensors}), got {readings.shape}")
+        features = np.empty((len(readings), self.n_sensors * (1 + len(STATS))))
+        if len(readings) == 0:
+            return features
+
+        with self._lock:
+            slots = np.fromiter((self._slot(v) for v in vehicle_ids), dtype=np.int64, count=len(readings))
+            # Readings for the same vehicle must be applied one after another: split into rounds
+            # where every vehicle appears at most once, keeping arrival order within a vehicle.
+            order = np.argsort(slots, kind="stable")
+            sorted_slots = slots[order]
+            group_start = np.r_[0, np.flatnonzero(np.diff(sorted_slots)) + 1]
+            starts = np.repeat(group_start, np.diff(np.r_[group_start, len(slots)]))
+            rank = np.empty(len(slots), dtype=np.int64)
+            rank[order] = np.arange(len(slots)) - starts
+
+            if rank.max() == 0:
+                features[:] = self._apply(slots, readings)
+            else:
+                for r in range(rank.max() + 1):
+                    rows = np.flatnonzero(rank == r)
+                    features[rows] = self._apply(slots[rows], readings[rows])
+        return features
+
+    def _apply(self, slots: np.ndarray, readings: np.ndarray) -> np.ndarray:
+        # Round to the buffer dtype first so what is later subtracted equals what was added
+        y = readings.astype(self.dtype).astype(np.float64)
+        c = self.count[slots]
+        head = self.head[slots]
+        full = (c == self.window)[:, np.newaxis]
+
+        leaving = np.where(full, self.buf[slots, head].astype(np.float64), 0.0)
+        s1 = self.s1[slots]
+        n = np.minimum(c + 1, self.window)
+        # Σi·y over the window ordered oldest=0: dropping the oldest shifts every index down by one
+        sxy = self.sxy[slots] - np.where(full, s1 - leaving, 0.0) + (n - 1)[:, np.newaxis] * y
+        s1 = s1 - leaving + y
+        s2 = self.s2[slots] - leaving * leaving + y * y
+        ewma = np.where((c == 0)[:, np.newaxis], y, self.alpha * y + (1 - self.alpha) * self.ewma[slots])
+
+        self.buf[slots, head] = y
+        self.head[slots] = (head + 1) % self.window
+        self.count[slots] = n
+        self.seen[slots] += 1
+        self.s1[slots] = s1
+        self.s2[slots] = s2
+        self.sxy[slots] = sxy
+        self.ewma[slots] = ewma
+
+        drifted = slots[self.seen[slots] % self.resync_every == 0]
+        if len(drifted):
+            self._resync(drifted)
+            s1, s2, sxy = self.s1[slots], self.s2[slots], self.sxy[slots]
+
+        return self._features(y, n, s1, s2, sxy, ewma)
+
+    def _resync(self, slots: np.ndarray):
+        # Only called for full windows: the oldest reading sits at `head`
+        idx = (self.head[slots, np.newaxis] + np.arange(self.window)) % self.window
+        ordered = self.buf[slots[:, np.newaxis], idx].astype(np.float64)
+        self.s1[slots] = ordered.sum(axis=1)
+        self.s2[slots] = (ordered * ordered).sum(axis=1)
+        self.sxy[slots] = np.einsum("w,nws->ns", np.arange(self.window, dtype=np.float64), ordered)
+
+    def _features(self, y, n, s1, s2, sxy, ewma) -> np.ndarray:
+        n = n.astype(np.float64)[:, np.newaxis]
+        mean = s1 / n
+        std = np.sqrt(np.maximum(s2 / n - mean * mean, 0.0))
+        # Least-squares slope per reading against x = 0..n-1
+        sx = n * (n - 1) / 2
+        sxx = (n - 1) * n * (2 * n - 1) / 6
+        denom = n * sxx - sx * sx
+        slope = np.divide(n * sxy - sx * s1, denom, out=np.zeros_like(s1), where=denom > 0)
+        return np.hstack([y, mean, std, slope, ewma])
+
+    def snapshot(self, vehicle_id: Hashable) -> Optional[np.ndarray]:
+        """Current window of a vehicle, oldest reading first (None if unseen)."""
+        slot = self._slots.get(vehicle_id)
+        if slot is None:
+            return None
+        n, head = self.count[slot], self.head[slot]
+        start = head if n == self.window else 0
+        return self.buf[slot, (start + np.arange(n)) % self.window].copy()
+
+
+def compute_window_features(readings, vehicle_ids: Optional[Sequence[Hashable]] = None,
+                            window: int = WINDOW, alpha: float = EWMA_ALPHA, chunk_size: int = 4096) -> np.ndarray:
+    """
+    Offline features for a time-ordered table of readings, through the same
+    store used online so training and serving see identical values. Without
+    vehicle_ids the whole table is treated as one vehicle.
+    """
+    readings = np.asarray(readings, dtype=np.float64)
+    if vehicle_ids is None:
+        # One vehicle: every reading depends on the previous one, so feed them one round at a time
+        vehicle_ids = np.zeros(len(readings), dtype=np.int64)
+    store = WindowFeatureStore(window=window, n_sensors=readings.shape[1], alpha=alpha, capacity=64)
+    out = np.empty((len(readings), readings.shape[1] * (1 + len(STATS))))
+    for start in range(0, len(readings), chunk_size):
+        stop = start + chunk_size
+        out[start:stop] = store.update_batch(list(vehicle_ids[start:stop]), readings[start:stop])
+    return out
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Check the O(1) window statistics and report state size")
+    parser.add_argument("--vehicles", type=int, default=100_000)
+    parser.add_argument("--window", type=int, default=WINDOW)
+    parser.add_argument("--batch", type=int, default=1024)
+    args = parser.parse_args()
+
+    # Parity: incremental statistics against recomputing every window from scratch
+    rng = np.random.default_rng(0)
+    series = rng.normal(size=(5000, len(SENSOR_COLUMNS))) * [10, 2, 15, 300, 0.5] + [90, 5, 60, 1300, 13]
+    series = series.astype(np.float32).astype(np.float64)
+    online = compute_window_features(series, window=args.window)
+    worst = 0.0
+    for i in range(len(series)):
+        w = series[max(0, i - args.window + 1):i + 1]
+        x = np.arange(len(w))
+        slope = np.polyfit(x, w, 1)[0] if len(w) > 1 else np.zeros(w.shape[1])
+        exact = np.hstack([w[-1], w.mean(0), w.std(0), slope])
+        worst = max(worst, float(np.abs(online[i, :len(exact)] - exact).max()))
+    print(f"max abs error vs full recompute over {len(series)} readings: {worst:.2e}")
+
+    store = WindowFeatureStore(window=args.window, capacity=args.vehicles)
+    ids = rng.integers(0, args.vehicles, size=args.batch * 200)
+    rows = rng.normal(size=(len(ids), len(SENSOR_COLUMNS)))
+    start = time.perf_counter()
+    for i in range(0, len(ids), args.batch):
+        store.update_batch(ids[i:i + args.batch].tolist(), rows[i:i + args.batch])
+    elapsed = time.perf_counter() - start
+    print(f"{args.vehicles:,} vehicles: {store.bytes_per_vehicle} B/vehicle, {store.nbytes() / 2**20:.1f} MB state; "
+          f"{len(ids) / elapsed:,.0f} readings/s in batches of {args.batch}")
@@ -0,0 +1,124 @@
+import json
+import os
+from typing import Any, Dict, Hashable, List, Optional, Sequence
+
+import joblib
+import numpy as np
+
+from .tree_predictor import load_predictor
+from .window_features import WindowFeatureStore
+from .prediction_tool import MODEL_DIR, XGB_BACKEND
+from model_registry import registry
+import metrics
+
+# Failure prediction from sliding-window features (train_windowed.py).
+#
+# The failure probability comes from the windowed autoencoder + XGBoost. The
+# latent vector and reconstruction error handed to DiagnosisAgent still come
+# from the snapshot autoencoder, because the FAISS index and the diagnosis
+# classifier are built on that latent space.
+
+WINDOWED_DIR = os.path.join(MODEL_DIR, "windowed")
+
+
+def _load_meta():
+    path = os.path.join(WINDOWED_DIR, "meta.json")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} not found; run `python train_windowed.py` from Prediction_Agent/model")
+    with open(path) as f:
+        return json.load(f)
+
+def _load_ae():
+    import torch
+    from .autoencoder import SensorAutoencoder
+
+    meta = registry.get("prediction.windowed.meta")
+    ae = SensorAutoencoder(input_dim=len(meta["features"]), latent_dim=meta["latent_dim"])
+    ae.load_state_dict(torch.load(os.path.join(WINDOWED_DIR, "autoencoder.pt")))
+    ae.eval()
+    return ae
+
+def _load_ae_forward():
+    from .ae_runtime import load_runtime
+    # Exported runtimes (TorchScript / ONNX files) belong to the snapshot model, so always eager here
+    return load_runtime("eager", registry.get("prediction.windowed.ae"), len(registry.get("prediction.windowed.meta")["features"]))
+
+registry.register("prediction.windowed.meta", _load_meta)
+registry.register("prediction.windowed.scaler", lambda: joblib.load(os.path.join(WINDOWED_DIR, "scaler.pkl")))
+registry.register("prediction.windowed.ae", _load_ae)
+registry.register("prediction.windowed.ae_forward", _load_ae_forward)
+registry.register("prediction.windowed.xgb_predictor",
+                  lambda: load_predictor(joblib.load(os.path.join(WINDOWED_DIR, "xgb_model.pkl")), XGB_BACKEND))
+
+
+class WindowedPredictor:
+    """
+    Keeps a WindowFeatureStore keyed by vehicle and scores each new reading
+    on the window it completes. Output has the same keys as predict_failure,
+    plus window_reconstruction_error from the windowed autoencoder.
+    """
+
+    def __init__(self, store: Optional[WindowFeatureStore] = None, capacity: int = 1024):
+        meta = registry.get("prediction.windowed.meta")
+        self.store = store or WindowFeatureStore(window=meta["window"], alpha=meta["alpha"], capacity=capacity)
+        if self.store.window != meta["window"]:
+            raise ValueError(f"Store window {self.store.window} does not match the trained window {meta['window']}")
+
+    def predict_batch(self, vehicle_ids: Sequence[Hashable], sensor_rows: Sequence[Sequence[float]],
+                      latent_threshold: Optional[float] = None) -> List[Dict[str, Any]]:
+        if len(sensor_rows) == 0:
+            return []  # np.asarray([]) is 1-D, so check before the shape
+        sensor_matrix = np.asarray(sensor_rows, dtype=np.float64)
+        if sensor_matrix.ndim != 2:
+            raise ValueError(f"Expected a 2-D batch of sensor rows, got shape {sensor_matrix.shape}")
+
+        get = registry.get
+        t = metrics.start()
+        window = self.store.update_batch(vehicle_ids, sensor_matrix)
+        t = metrics.lap("prediction.window_features", t)
+
+        scaled = get("prediction.windowed.scaler").transform(window).astype(np.float32)
+        recon, latent = get("prediction.windowed.ae_forward")(scaled)
+        window_error = ((scaled - recon) ** 2).mean(axis=1)
+        features = np.empty((len(latent), latent.shape[1] + 1), dtype=np.float32)
+        features[:, :-1] = latent
+        features[:, -1] = window_error
+        probs = get("prediction.windowed.xgb_predictor").predict_proba(features)[:, 1].tolist()
+        t = metrics.lap("prediction.windowed", t)
+
+        # Snapshot latent for DiagnosisAgent
+        snapshot_scaled = get("prediction.scaler").transform(sensor_matrix).astype(np.float32)
+        snapshot_recon, snapshot_latent = get("prediction.ae_forward")(snapshot_scaled)
+        errors = ((snapshot_scaled - snapshot_recon) ** 2).mean(axis=1).tolist()
+        metrics.stop("prediction.ae_forward", t)
+
+        window_errors = window_error.tolist()
+        return [
+            {
+                "failure_probability": probs[i],
+                "latent_vector": snapshot_latent[i].tolist()
+                if latent_threshold is None or probs[i] > latent_threshold else None,
+                "reconstruction_error": errors[i],
+                "window_reconstruction_error": window_errors[i],
+            }
+            for i in range(len(sensor_matrix))
+        ]
+
+    def predict(self, vehicle_id: Hashable, sensor_data: Sequence[float],
+                latent_threshold: Optional[float] = None) -> Dict[str, Any]:
+        return self.predict_batch([vehicle_id], [sensor_data], latent_threshold)[0]
+
+    def forget(self, vehicle_id: Hashable):
+        self.store.remove(vehicle_id)
+
+
+if __name__ == "__main__":
+    from Prediction_Agent.dataset.create_dummy import generate
+
+    df = generate(timesteps=200)
+    rows = df.drop(columns=["failed"]).to_numpy()
+    predictor = WindowedPredictor()
+    results = predictor.predict_batch(["VEH00001"] * len(rows), rows)
+    flagged = [i for i, r in enumerate(results) if r["failure_probability"] > 0.5]
+    print(f"{len(flagged)} of {len(rows)} readings flagged; labelled failures: {int(df['failed'].sum())}")
+    print(results[-1])
@@ -0,0 +1,306 @@
+import asyncio
+import gc
+import multiprocessing as mp
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+from sensor_simulator import SensorSimulator
+from Prediction_Agent.model.prediction_tool import DIAGNOSIS_THRESHOLD, predict_failure_batch
+from Diagnosis_Agent.diagnosis_engine import diagnose_batch
+from Diagnosis_Agent.models.diagnosis_node import is_confirmed
+from model_registry import registry
+
+
+def _predict_rows(rows):
+    # Module-level so it can be shipped to a process pool
+    return predict_failure_batch(rows, latent_threshold=DIAGNOSIS_THRESHOLD)
+
+
+def _diagnose_rows(sensor_rows, latent_vectors, recon_errors):
+    return diagnose_batch(sensor_rows, latent_vectors, recon_errors)
+
+
+class StageStats:
+    def __init__(self):
+        self.processed = 0
+        self.latencies: List[float] = []
+
+    def record(self, started_at: float):
+        self.processed += 1
+        self.latencies.append(time.perf_counter() - started_at)
+
+    def summary(self, elapsed: float) -> Dict[str, float]:
+        lat = np.asarray(self.latencies) * 1000 if self.latencies else np.zeros(1)
+        return {
+            "processed": self.processed,
+            "per_s": self.processed / elapsed if elapsed else 0.0,
+            "p50_ms": float(np.percentile(lat, 50)),
+            "p99_ms": float(np.percentile(lat, 99)),
+        }
+
+
+class AsyncPipelineRunner:
+    """
+    Runs the Prediction -> Diagnosis -> Customer pipeline for many simulated
+    vehicles at once. Each stage reads from a bounded asyncio.Queue, so a slow
+    stage applies backpressure upstream instead of stalling ingestion for
+    everyone. Model stages run in a thread or process pool; prediction drains
+    its queue in micro-batches so one scaler/AE/XGBoost call covers many rows,
+    and diagnosis does the same for the rules/FAISS/ML passes.
+
+    With a SessionManager, diagnoses go to CustomerAgentNode, which queues a
+    customer conversation per vehicle (never blocking on the LLM); without
+    one they are only recorded in customer_events, for throughput runs.
+    Confirmed diagnoses are appended to `history` when one is given.
+    """
+
+    def __init__(
+        self,
+        n_vehicles: int = 100,
+        interval: float = 2.0,
+        queue_size: int = 1024,
+        prediction_workers: int = 2,
+        prediction_batch: int = 256,
+        prediction_wait_ms: float = 5.0,
+        diagnosis_workers: int = 4,
+        diagnosis_batch: int = 64,
+        customer_workers: int = 1,
+        executor: str = "thread",
+        prediction_model: str = "snapshot",
+        max_workers: Optional[int] = None,
+        history=None,
+        sessions=None,
+        customer_handler: Optional[Callable[[str, Dict[str, Any]], Awaitable[None]]] = None,
+    ):
+        self.n_vehicles = n_vehicles
+        self.interval = interval
+        self.queue_size = queue_size
+        self.prediction_workers = prediction_workers
+        self.prediction_batch = prediction_batch
+        self.prediction_wait = prediction_wait_ms / 1000.0
+        self.diagnosis_workers = diagnosis_workers
+        self.diagnosis_batch = diagnosis_batch
+        self.customer_workers = customer_workers
+        self.executor_kind = executor
+        if prediction_model not in ("snapshot", "windowed"):
+            raise ValueError(f"Unknown prediction model '{prediction_model}', expected 'snapshot' or 'windowed'")
+        if prediction_model == "windowed" and executor == "process":
+            # Per-vehicle window state lives in this process
+            raise ValueError("The windowed prediction model needs the thread executor")
+        self.prediction_model = prediction_model
+        self.max_workers = max_workers
+        self.history = history
+        self.customer_node = None
+        if sessions is not None:
+            from CustomerInteraction.customer_node2 import CustomerAgentNode
+
+            self.customer_node = CustomerAgentNode("CustomerAgent", sessions=sessions)
+        if customer_handler is None:
+            customer_handler = self._open_customer_session if sessions is not None else self._record_customer_event
+        self.customer_handler = customer_handler
+
+        self.ingested = 0
+        self.customer_events: List[Dict[str, Any]] = []
+        self.stats = {name: StageStats() for name in ("prediction", "diagnosis", "customer")}
+
+    # ---------------- stages ----------------
+    async def _vehicle(self, vehicle_id: str):
+        sim = SensorSimulator(verbose=False)
+        # Spread vehicles across the interval instead of ticking in lockstep
+        await asyncio.sleep(self.interval * (hash(vehicle_id) % 1000) / 1000)
+        while True:
+            item = (vehicle_id, sim.step(), time.perf_counter())
+            await self.prediction_q.put(item)  # blocks when prediction is saturated
+            self.ingested += 1
+            await asyncio.sleep(self.interval)
+
+    async def _next_batch(self, queue: asyncio.Queue, max_size: int):
+        batch = [await queue.get()]
+        deadline = time.perf_counter() + self.prediction_wait
+        while len(batch) < max_size:
+            try:
+                batch.append(queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _prediction_worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch(self.prediction_q, self.prediction_batch)
+            rows = [row for _, row, _ in batch]
+            if self.windowed is not None:
+                results = await loop.run_in_executor(
+                    self.pool, self.windowed.predict_batch, [vehicle_id for vehicle_id, _, _ in batch], rows,
+                    DIAGNOSIS_THRESHOLD,
+                )
+            else:
+                results = await loop.run_in_executor(self.pool, _predict_rows, rows)
+            for (vehicle_id, row, started_at), result in zip(batch, results):
+                self.stats["prediction"].record(started_at)
+                if result["failure_probability"] > DIAGNOSIS_THRESHOLD:
+                    await self.diagnosis_q.put((vehicle_id, row, result, started_at))
+
+    async def _diagnosis_worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch(self.diagnosis_q, self.diagnosis_batch)
+            diagnoses = await loop.run_in_executor(
+                self.pool, _diagnose_rows,
+                [row for _, row, _, _ in batch],
+                [prediction["latent_vector"] for _, _, prediction, _ in batch],
+                [prediction["reconstruction_error"] for _, _, prediction, _ in batch],
+            )
+            for (vehicle_id, row, prediction, started_at), diagnosis in zip(batch, diagnoses):
+                self.stats["diagnosis"].record(started_at)
+                if self.history is not None and is_confirmed(diagnosis):
+                    await loop.run_in_executor(
+                        None, lambda: self.history.append(
+                            prediction["latent_vector"], diagnosis["diagnosis"],
+                            confidence=diagnosis["confidence"],
+                            reconstruction_error=prediction["reconstruction_error"],
+                            vehicle_id=vehicle_id,
+                        )
+                    )
+                await self.customer_q.put((vehicle_id, diagnosis, started_at))
+
+    async def _customer_worker(self):
+        while True:
+            vehicle_id, diagnosis, started_at = await self.customer_q.get()
+            await self.customer_handler(vehicle_id, diagnosis)
+            self.stats["customer"].record(started_at)
+
+    async def _open_customer_session(self, vehicle_id: str, diagnosis: Dict[str, Any]):
+        # Same input the DAG maps onto CustomerAgent; enqueue() only takes a lock
+        self.customer_node.run({
+            "vehicle_id": vehicle_id,
+            "diagnosis": diagnosis["diagnosis"],
+            "confidence": diagnosis["confidence"],
+            "explanation": diagnosis["explanation"],
+        })
+
+    async def _record_customer_event(self, vehicle_id: str, diagnosis: Dict[str, Any]):
+        self.customer_events.append({"vehicle_id": vehicle_id, **diagnosis})
+
+    # ---------------- driver ----------------
+    def _make_pool(self):
+        if self.executor_kind == "process":
+            # Fork after warm-up so workers share the parent's models copy-on-write (see prefork.py)
+            gc.collect()
+            gc.freeze()
+            return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=mp.get_context("fork"))
+        if self.executor_kind == "thread":
+            return ThreadPoolExecutor(max_workers=self.max_workers)
+        raise ValueError(f"Unknown executor '{self.executor_kind}', expected 'thread' or 'process'")
+
+    async def run(self, duration: Optional[float]) -> Dict[str, Any]:
+        """Run for duration seconds (None: until cancelled) and return the throughput report."""
+        self.prediction_q = asyncio.Queue(self.queue_size)
+        self.diagnosis_q = asyncio.Queue(self.queue_size)
+        self.customer_q = asyncio.Queue(self.queue_size)
+
+        self.windowed = None
+        if self.prediction_model == "windowed":
+            from Prediction_Agent.model.windowed_predictor import WindowedPredictor
+
+            self.windowed = WindowedPredictor(capacity=self.n_vehicles)
+        # Load models before the clock starts so first-batch latency isn't model loading
+        registry.warm()
+        with self._make_pool() as self.pool:
+            tasks = [asyncio.create_task(self._vehicle(f"VEH{i:05d}")) for i in range(self.n_vehicles)]
+            tasks += [asyncio.create_task(self._prediction_worker()) for _ in range(self.prediction_workers)]
+            tasks += [asyncio.create_task(self._diagnosis_worker()) for _ in range(self.diagnosis_workers)]
+            tasks += [asyncio.create_task(self._customer_worker()) for _ in range(self.customer_workers)]
+
+            start = time.perf_counter()
+            # Every task loops forever, so one finishing early has crashed: stop the run there
+            # rather than measure a pipeline with a dead stage
+            await asyncio.wait(tasks, timeout=duration, return_when=asyncio.FIRST_EXCEPTION)
+            elapsed = time.perf_counter() - start
+
+            for task in tasks:
+                task.cancel()
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        failures = [r for r in results if isinstance(r, Exception)]
+        for error in failures:
+            print(f"⚠️ Pipeline worker failed: {error!r}")
+        if failures:
+            raise RuntimeError(f"{len(failures)} pipeline worker(s) failed after {elapsed:.1f}s") from failures[0]
+
+        return {
+            "vehicles": self.n_vehicles,
+            "elapsed_s": elapsed,
+            "ingested": self.ingested,
+            "ingest_per_s": self.ingested / elapsed,
+            "backlog": {
+                "prediction": self.prediction_q.qsize(),
+                "diagnosis": self.diagnosis_q.qsize(),
+                "customer": self.customer_q.qsize(),
+            },
+            "stages": {name: s.summary(elapsed) for name, s in self.stats.items()},
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Run the agent pipeline for N simulated vehicles")
+    parser.add_argument("--vehicles", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run")
+    parser.add_argument("--interval", type=float, default=0.1, help="seconds between readings per vehicle")
+    parser.add_argument("--queue-size", type=int, default=1024)
+    parser.add_argument("--prediction-workers", type=int, default=2)
+    parser.add_argument("--prediction-batch", type=int, default=256)
+    parser.add_argument("--diagnosis-workers", type=int, default=4)
+    parser.add_argument("--diagnosis-batch", type=int, default=64)
+    parser.add_argument("--executor", choices=("thread", "process"), default="thread")
+    parser.add_argument("--prediction-model", choices=("snapshot", "windowed"), default="snapshot")
+    parser.add_argument("--max-workers", type=int, default=None)
+    parser.add_argument("--customer", choices=("sessions", "record"), default="sessions",
+                        help="open LLM customer sessions (default) or only record diagnoses")
+    parser.add_argument("--session-workers", type=int, default=4)
+    parser.add_argument("--history", action="store_true", help="append confirmed diagnoses to the FAISS history")
+    args = parser.parse_args()
+
+    sessions = None
+    if args.customer == "sessions":
+        from CustomerInteraction.session_manager import SessionManager
+
+        sessions = SessionManager(workers=args.session_workers)
+    history = None
+    if args.history:
+        from Diagnosis_Agent.history_store import get_history
+
+        history = get_history()
+
+    runner = AsyncPipelineRunner(
+        n_vehicles=args.vehicles,
+        interval=args.interval,
+        queue_size=args.queue_size,
+        prediction_workers=args.prediction_workers,
+        prediction_batch=args.prediction_batch,
+        diagnosis_workers=args.diagnosis_workers,
+        diagnosis_batch=args.diagnosis_batch,
+        executor=args.executor,
+        prediction_model=args.prediction_model,
+        max_workers=args.max_workers,
+        history=history,
+        sessions=sessions,
+    )
+    report = asyncio.run(runner.run(args.duration))
+    if sessions is not None:
+        report["customer_sessions"] = len(sessions.open_sessions())
+    print(json.dumps(report, indent=2))
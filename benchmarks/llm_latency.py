@@ -0,0 +1,254 @@
+"""
+Per-turn latency of the customer agent against the local stub LLM server.
+
+    python -m benchmarks.llm_latency --turns 50 --latency-ms 50
+    python -m benchmarks.llm_latency --sessions 64 --turns 10     # concurrent async sessions
+    python -m benchmarks.llm_latency --token-ms 30                # slower generation
+
+No network access is needed: every LLM call goes to CustomerInteraction.llm_stub,
+run in its own process so it doesn't compete with the client for the GIL.
+"fresh" reproduces the old behaviour (a new client per call), "pooled" reuses
+the shared client. Against a real endpoint the pooled saving also includes TLS.
+"streaming" compares time-to-first-audio: the blocking path can only start
+speech once the whole reply is back, the streaming path after its first sentence.
+"session_open" times the opening message of new sessions with an empty and a
+prewarmed explanation cache.
+"long_session" grows one conversation turn by turn and reports prompt tokens
+per turn for the full-history prompt (plain list) and ConversationMemory.
+"booking" plays a scripted booking call against a tool-calling stub and counts
+LLM round trips with and without the local slot-filling fast path.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Dict, List
+
+import numpy as np
+
+
+class StubProcess:
+    def __init__(self, latency_ms: float, token_ms: float = 0.0, replies: str = "echo"):
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "CustomerInteraction.llm_stub", "--port", "0",
+             "--latency-ms", str(latency_ms), "--token-ms", str(token_ms), "--replies", replies],
+            stdout=subprocess.PIPE, text=True,
+        )
+        # First line: "Stub LLM listening on http://host:port (...)"
+        self.base_url = self.proc.stdout.readline().split()[4]
+
+    def stats(self) -> Dict[str, int]:
+        with urllib.request.urlopen(self.base_url + "/stats") as response:
+            return json.load(response)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.proc.terminate()
+        self.proc.wait()
+
+
+def _summary(latencies: List[float], before: Dict[str, int], after: Dict[str, int]) -> Dict[str, float]:
+    lat = np.asarray(latencies) * 1000
+    return {
+        "turns": len(lat),
+        "p50_ms": float(np.percentile(lat, 50)),
+        "p99_ms": float(np.percentile(lat, 99)),
+        "mean_ms": float(lat.mean()),
+        "llm_requests": after["requests"] - before["requests"],
+        "connections": after["connections"] - before["connections"],
+    }
+
+
+def run_turns(server, turns: int, fresh: bool) -> Dict[str, float]:
+    from CustomerInteraction import llm_client
+    from CustomerInteraction.agent import process_user_turn
+
+    client = llm_client.get_client()
+    client.close()
+    before = server.stats()
+    memory = [{"role": "agent", "text": "Aap service ke liye kab aa sakte hai?"}]
+    latencies = []
+    for i in range(turns):
+        if fresh:
+            client.close()  # drop the pool: next call connects again, like Groq(...) per call
+        start = time.perf_counter()
+        process_user_turn(memory, f"Kal subah {i % 12 + 1} baje aa sakta hoon")
+        latencies.append(time.perf_counter() - start)
+        del memory[1:]  # keep the prompt the same size every turn
+    client.close()
+    return _summary(latencies, before, server.stats())
+
+
+def run_streaming(server, turns: int) -> Dict[str, Dict[str, float]]:
+    from CustomerInteraction.agent import process_user_turn
+    from CustomerInteraction.streaming import SpeechQueue
+
+    memory = [{"role": "agent", "text": "Aap service ke liye kab aa sakte hai?"}]
+    report = {}
+    for mode in ("blocking", "streaming"):
+        before = server.stats()
+        first_audio = []
+        for i in range(turns):
+            speech = SpeechQueue(lambda text: None)  # stand-in for speak_text
+            start = time.perf_counter()
+            if mode == "blocking":
+                result = process_user_turn(memory, f"Kal subah {i % 12 + 1} baje aa sakta hoon")
+                speech.put(result["agent_message"])
+            else:
+                process_user_turn(memory, f"Kal subah {i % 12 + 1} baje aa sakta hoon",
+                                  on_chunk=lambda chunk, source: speech.put(chunk))
+            speech.close()
+            first_audio.append(speech.first_audio_at - start)
+            del memory[1:]
+        report[mode] = _summary(first_audio, before, server.stats())
+    return report
+
+
+def run_session_open(server, sessions: int) -> Dict[str, Dict[str, float]]:
+    from CustomerInteraction import explanation_cache
+    from CustomerInteraction.agent import explain_with_llm, prepare_initial_conversation
+
+    known = list(explanation_cache.known_diagnoses())
+    rng = np.random.default_rng(0)
+    report = {}
+    for mode in ("cold", "prewarmed"):
+        cache = explanation_cache.ExplanationCache(path=None)  # memory only: leave the real cache file alone
+        explanation_cache.set_cache(cache)
+        if mode == "prewarmed":
+            explanation_cache.prewarm(cache, explain_with_llm)
+        before = server.stats()
+        latencies = []
+        for i in range(sessions):
+            diagnosis = dict(known[rng.integers(len(known))])
+            # Same bucket, different exact confidence, as real diagnoses come in
+            diagnosis["confidence"] = float(diagnosis["confidence"]) + float(rng.uniform(0, 0.1))
+            start = time.perf_counter()
+            prepare_initial_conversation(diagnosis)
+            latencies.append(time.perf_counter() - start)
+        report[mode] = _summary(latencies, before, server.stats())
+        report[mode]["cache_entries"] = len(cache)
+    explanation_cache.set_cache(None)
+    return report
+
+
+def run_long_session(server, turns: int) -> Dict[str, Dict[str, float]]:
+    from CustomerInteraction.agent import process_user_turn
+    from CustomerInteraction.conversation_memory import ConversationMemory
+
+    opening = {"role": "agent", "text": "Aapki gaadi mein bearing_fault hai. Aap service ke liye kab aa sakte hai?"}
+    report = {}
+    for mode, memory in (("full_history", [opening]), ("managed", ConversationMemory([opening]))):
+        before = server.stats()
+        latencies, tokens = [], []
+        for i in range(turns):
+            start = time.perf_counter()
+            result = process_user_turn(memory, f"Kal subah {i % 12 + 1} baje aa sakta hoon, Meerut mein hoon")
+            latencies.append(time.perf_counter() - start)
+            tokens.append(result["prompt_tokens"])
+        report[mode] = _summary(latencies, before, server.stats())
+        report[mode].update({
+            "prompt_tokens_first": tokens[0],
+            "prompt_tokens_last": tokens[-1],
+            "prompt_tokens_total": int(np.sum(tokens)),
+        })
+    return report
+
+
+BOOKING_SCRIPT = [
+    "Kal dopahar aa sakta hoon",
+    "Main Meerut mein hoon",
+    "Kaunse slot khaali hai?",
+    "12 baje theek rahega",
+    "Haan, confirm kar do",
+]
+
+
+def run_booking(latency_ms: float, token_ms: float) -> Dict[str, Dict[str, float]]:
+    from CustomerInteraction import llm_client
+    from CustomerInteraction.agent import process_user_turn
+    from CustomerInteraction.conversation_memory import ConversationMemory
+    from CustomerInteraction.tools import book_slot as book_slot_module
+    from CustomerInteraction.tools import tools as tools_module
+
+    def book_slot(center_id, date, time):
+        # Stand-in: the real tool appends to tools/data/occupied_slots.csv
+        return {"status": "CONFIRMED", "center_id": center_id, "date": date, "time": time}
+
+    saved = book_slot_module.book_slot, tools_module.book_slot
+    book_slot_module.book_slot = tools_module.book_slot = book_slot
+    report = {}
+    try:
+        with StubProcess(latency_ms, token_ms, replies="agent") as server:
+            os.environ["LLM_BASE_URL"] = server.base_url
+            llm_client.get_client().close()  # rebuild the client against this stub
+            for mode in ("llm_only", "fast_path"):
+                memory = ConversationMemory([{"role": "agent", "text": "Aap service ke liye kab aa sakte hai?"}])
+                before = server.stats()
+                latencies, calls, tools = [], [], []
+                for text in BOOKING_SCRIPT:
+                    start = time.perf_counter()
+                    result = process_user_turn(memory, text, fast_path=mode == "fast_path")
+                    latencies.append(time.perf_counter() - start)
+                    calls.append(result["llm_calls"])
+                    tools.append(result["tool_used"])
+                report[mode] = _summary(latencies, before, server.stats())
+                report[mode].update({"llm_calls_per_turn": calls, "tools_per_turn": tools,
+                                     "booking": memory.slots.to_dict()})
+    finally:
+        llm_client.get_client().close()
+        book_slot_module.book_slot, tools_module.book_slot = saved
+    return report
+
+
+async def run_sessions(server, sessions: int, turns: int) -> Dict[str, float]:
+    from CustomerInteraction import llm_client
+
+    before = server.stats()
+    latencies: List[float] = []
+
+    async def session(i):
+        # Same prompt size every turn, so this measures transport rather than history growth
+        messages = [{"role": "user", "content": f"Session {i}: kal aa sakta hoon"}]
+        for _ in range(turns):
+            start = time.perf_counter()
+            await llm_client.achat(messages)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session(i) for i in range(sessions)))
+    elapsed = time.perf_counter() - start
+    await llm_client.get_client().aclose()
+    report = _summary(latencies, before, server.stats())
+    report["sessions"] = sessions
+    report["turns_per_s"] = len(latencies) / elapsed
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="stub delay before the first token")
+    parser.add_argument("--token-ms", type=float, default=5.0, help="stub generation time per word")
+    parser.add_argument("--sessions", type=int, default=32, help="concurrent sessions for the async run")
+    args = parser.parse_args()
+
+    with StubProcess(args.latency_ms, args.token_ms) as server:
+        os.environ["LLM_BASE_URL"] = server.base_url
+        report = {
+            "stub_latency_ms": args.latency_ms,
+            "stub_token_ms": args.token_ms,
+            "fresh_client": run_turns(server, args.turns, fresh=True),
+            "pooled_client": run_turns(server, args.turns, fresh=False),
+            "async_sessions": asyncio.run(run_sessions(server, args.sessions, args.turns)),
+            "time_to_first_audio": run_streaming(server, args.turns),
+            "session_open": run_session_open(server, args.turns),
+            "long_session": run_long_session(server, args.turns),
+        }
+    report["booking"] = run_booking(args.latency_ms, args.token_ms)
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,319 @@
+"""
+Benchmarks for the prediction and diagnosis hot paths.
+
+    python -m benchmarks.run                     # run everything, write benchmarks/results/<commit>.json
+    python -m benchmarks.run --cases predict     # only cases whose name contains "predict"
+    python -m benchmarks.run --compare old.json new.json
+
+Telemetry is synthetic: create_dummy.generate() rows (default) or a
+SensorSimulator stream (--source simulator), seeded so runs are comparable.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BASE_DIR, "benchmarks", "results")
+
+# Case name -> (setup(ctx) -> callable, rows handled per call)
+CASES: Dict[str, tuple] = {}
+
+
+def case(name: str, rows: int = 1):
+    def register(setup):
+        CASES[name] = (setup, rows)
+        return setup
+    return register
+
+
+# ---------------- telemetry ----------------
+def load_telemetry(source: str, n_rows: int, seed: int = 42) -> np.ndarray:
+    if source == "dummy":
+        from Prediction_Agent.dataset.create_dummy import generate
+
+        df = generate(timesteps=n_rows, seed=seed)
+        return df.drop(columns=["failed"]).to_numpy(dtype=np.float64)
+    if source == "simulator":
+        import random
+        from sensor_simulator import SensorSimulator
+
+        random.seed(seed)
+        sim = SensorSimulator(verbose=False)
+        return np.array([sim.step() for _ in range(n_rows)], dtype=np.float64)
+    raise ValueError(f"Unknown telemetry source '{source}', expected dummy or simulator")
+
+
+class Context:
+    """Telemetry plus the model outputs later stages need, computed once per run."""
+
+    def __init__(self, rows: np.ndarray):
+        from Prediction_Agent.model.prediction_tool import predict_failure_batch
+
+        self.rows = rows
+        self.row_lists = rows.tolist()
+        predictions = predict_failure_batch(self.row_lists)
+        self.latents = np.array([p["latent_vector"] for p in predictions], dtype=np.float32)
+        self.errors = np.array([p["reconstruction_error"] for p in predictions], dtype=np.float32)
+        self.features = np.hstack([self.latents, self.errors[:, np.newaxis]])
+
+    def cycler(self, items):
+        state = {"i": 0}
+
+        def next_item():
+            i = state["i"]
+            state["i"] = (i + 1) % len(items)
+            return items[i]
+        return next_item
+
+
+# ---------------- cases ----------------
+@case("predict_failure")
+def _predict_failure(ctx):
+    from Prediction_Agent.model.prediction_tool import predict_failure
+    row = ctx.cycler(ctx.row_lists)
+    return lambda: predict_failure(row())
+
+
+@case("predict_failure_latent_gated")
+def _predict_failure_gated(ctx):
+    from Prediction_Agent.model.prediction_tool import DIAGNOSIS_THRESHOLD, predict_failure
+    row = ctx.cycler(ctx.row_lists)
+    return lambda: predict_failure(row(), latent_threshold=DIAGNOSIS_THRESHOLD)
+
+
+def _predict_batch(batch_size):
+    def setup(ctx):
+        from Prediction_Agent.model.prediction_tool import predict_failure_batch
+        batches = [ctx.row_lists[i:i + batch_size] for i in range(0, len(ctx.row_lists) - batch_size + 1, batch_size)]
+        batch = ctx.cycler(batches)
+        return lambda: predict_failure_batch(batch())
+    return setup
+
+
+for _size in (64, 256):
+    case(f"predict_failure_batch[{_size}]", rows=_size)(_predict_batch(_size))
+
+
+@case("window_features_update_batch[256]", rows=256)
+def _window_features(ctx):
+    from Prediction_Agent.model.window_features import WindowFeatureStore
+    store = WindowFeatureStore(capacity=1024)
+    vehicle_ids = [f"VEH{i:05d}" for i in range(256)]
+    rows = ctx.cycler([ctx.rows[i:i + 256] for i in range(0, len(ctx.rows) - 255, 256)])
+    return lambda: store.update_batch(vehicle_ids, rows())
+
+
+@case("rule_based_diagnosis")
+def _rules(ctx):
+    from Diagnosis_Agent.rules import rule_based_diagnosis
+    row = ctx.cycler(ctx.row_lists)
+    return lambda: rule_based_diagnosis(row())
+
+
+@case("rule_based_diagnosis_batch[256]", rows=256)
+def _rules_batch(ctx):
+    from Diagnosis_Agent.rules import RUNTIME_RULES
+    rows = np.ascontiguousarray(ctx.rows[:256], dtype=np.float64)
+    return lambda: RUNTIME_RULES.evaluate_batch(rows)
+
+
+@case("faiss_diagnosis")
+def _faiss(ctx):
+    from Diagnosis_Agent.diagnosis_engine import faiss_diagnosis
+    latent = ctx.cycler(ctx.latents.tolist())
+    return lambda: faiss_diagnosis(latent())
+
+
+@case("faiss_search_batch[256]", rows=256)
+def _faiss_batch(ctx):
+    from Diagnosis_Agent.faiss_index import get_faiss_holder
+    holder = get_faiss_holder()
+    queries = np.ascontiguousarray(ctx.latents[:256])
+    return lambda: holder.search(queries, 3)
+
+
+@case("ml_diagnosis")
+def _ml(ctx):
+    from Diagnosis_Agent.fallback import ml_diagnosis
+    i = ctx.cycler(list(range(len(ctx.latents))))
+    latents, errors = ctx.latents.tolist(), ctx.errors.tolist()
+
+    def run():
+        j = i()
+        return ml_diagnosis(latents[j], errors[j])
+    return run
+
+
+@case("ml_predict_proba_batch[256]", rows=256)
+def _ml_batch(ctx):
+    from Diagnosis_Agent.fallback import xgb_predictor
+    features = ctx.features[:256]
+    return lambda: xgb_predictor.predict_proba(features)
+
+
+@case("diagnose")
+def _diagnose(ctx):
+    from Diagnosis_Agent.diagnosis_engine import diagnose
+    i = ctx.cycler(list(range(len(ctx.rows))))
+    rows, latents, errors = ctx.row_lists, ctx.latents.tolist(), ctx.errors.tolist()
+
+    def run():
+        j = i()
+        return diagnose(rows[j], latents[j], errors[j])
+    return run
+
+
+@case("diagnose_batch[256]", rows=256)
+def _diagnose_batch(ctx):
+    from Diagnosis_Agent.diagnosis_engine import diagnose_batch
+    rows, latents, errors = ctx.row_lists[:256], ctx.latents[:256].tolist(), ctx.errors[:256].tolist()
+    return lambda: diagnose_batch(rows, latents, errors)
+
+
+# ---------------- measurement ----------------
+def measure(fn: Callable[[], object], rows_per_call: int, min_time: float, min_calls: int = 20,
+            warmup: int = 10) -> Dict[str, float]:
+    for _ in range(warmup):
+        fn()
+    latencies: List[float] = []
+    perf_counter = time.perf_counter
+    start = perf_counter()
+    while len(latencies) < min_calls or perf_counter() - start < min_time:
+        t0 = perf_counter()
+        fn()
+        latencies.append(perf_counter() - t0)
+    lat = np.array(latencies)
+    return {
+        "calls": len(lat),
+        "rows_per_call": rows_per_call,
+        "rows_per_s": rows_per_call * len(lat) / lat.sum(),
+        "p50_us": float(np.percentile(lat, 50) * 1e6),
+        "p99_us": float(np.percentile(lat, 99) * 1e6),
+        "mean_us": float(lat.mean() * 1e6),
+    }
+
+
+COLD_START_SCRIPT = """
+import json, resource, time
+t0 = time.perf_counter()
+from Prediction_Agent.model.prediction_tool import predict_failure
+from Diagnosis_Agent.diagnosis_engine import diagnose
+t1 = time.perf_counter()
+result = predict_failure(ROW)
+t2 = time.perf_counter()
+diagnose(ROW, result["latent_vector"], result["reconstruction_error"])
+t3 = time.perf_counter()
+print(json.dumps({
+    "import_s": t1 - t0,
+    "first_predict_s": t2 - t1,
+    "first_diagnose_s": t3 - t2,
+    "total_s": t3 - t0,
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+"""
+
+
+def cold_start(row: List[float], repeats: int = 3) -> Dict[str, float]:
+    """Fresh interpreter: import the pipeline and serve one prediction + diagnosis; best of N."""
+    script = COLD_START_SCRIPT.replace("ROW", repr(row))
+    runs = []
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, "-c", script], cwd=BASE_DIR, capture_output=True, text=True, check=True)
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return {key: min(r[key] for r in runs) for key in runs[0]}
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(selected: List[str], source: str, n_rows: int, min_time: float, with_cold_start: bool) -> Dict:
+    results = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "source": source,
+            "rows": n_rows,
+            "env": {k: os.environ[k] for k in ("AE_RUNTIME", "PREDICTION_XGB_BACKEND", "DIAGNOSIS_XGB_BACKEND",
+                                               "FAISS_NPROBE", "FAISS_EF_SEARCH", "OMP_NUM_THREADS") if k in os.environ},
+        },
+        "cases": {},
+    }
+    rows = load_telemetry(source, n_rows)
+    if with_cold_start:
+        results["cold_start"] = cold_start(rows[0].tolist())
+        print(f"{'cold_start':34s} {results['cold_start']['total_s']:8.2f} s   "
+              f"peak RSS {results['cold_start']['peak_rss_mb']:.0f} MB")
+
+    ctx = Context(rows)
+    for name in selected:
+        setup, rows_per_call = CASES[name]
+        stats = measure(setup(ctx), rows_per_call, min_time)
+        results["cases"][name] = stats
+        print(f"{name:34s} {stats['rows_per_s']:12,.0f} rows/s   p50 {stats['p50_us']:9.1f} us   p99 {stats['p99_us']:9.1f} us")
+
+    results["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return results
+
+
+def compare(old_path: str, new_path: str):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"{'case':34s} {'rows/s':>10s} {'p50':>8s} {'p99':>8s}   ({old['meta']['commit']} -> {new['meta']['commit']})")
+    for name, stats in new["cases"].items():
+        if name not in old["cases"]:
+            print(f"{name:34s} {'new':>10s}")
+            continue
+        base = old["cases"][name]
+        print(f"{name:34s} {stats['rows_per_s'] / base['rows_per_s']:9.2f}x "
+              f"{stats['p50_us'] / base['p50_us']:7.2f}x {stats['p99_us'] / base['p99_us']:7.2f}x")
+    for key in ("cold_start",):
+        if key in old and key in new:
+            print(f"{key:34s} {new[key]['total_s'] / old[key]['total_s']:9.2f}x time, "
+                  f"{new[key]['peak_rss_mb']:.0f} MB vs {old[key]['peak_rss_mb']:.0f} MB peak RSS")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the prediction and diagnosis hot paths")
+    parser.add_argument("--cases", nargs="*", default=None, help="substrings of case names to run (default: all)")
+    parser.add_argument("--source", choices=("dummy", "simulator"), default="dummy")
+    parser.add_argument("--rows", type=int, default=2048, help="synthetic telemetry rows")
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds to run each case")
+    parser.add_argument("--no-cold-start", action="store_true")
+    parser.add_argument("--output", default=None, help="JSON path (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files and exit")
+    parser.add_argument("--list", action="store_true")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        sys.exit(0)
+    if args.list:
+        print("\n".join(CASES))
+        sys.exit(0)
+
+    selected = [n for n in CASES if not args.cases or any(s in n for s in args.cases)]
+    results = run(selected, args.source, args.rows, args.min_time, not args.no_cold_start)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{results['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✅ Results written to {output}  (peak RSS {results['peak_rss_mb']:.0f} MB)")
@@ -0,0 +1,296 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Mapping, Optional, Union
+
+import metrics
+
+# A schema maps field name -> expected type ("object" accepts anything).
+Schema = Dict[str, type]
+# An edge mapping is either a function (input, output) -> next input, or a
+# declarative spec {target_field: "output.x" | "input.x" | "output.x.y"}.
+Mapper = Callable[[Dict[str, Any], Dict[str, Any]], Dict[str, Any]]
+EdgeMapping = Union[Mapper, Mapping[str, str]]
+
+
+class GraphError(ValueError):
+    pass
+
+
+class NodeSpec:
+    __slots__ = ("name", "node", "inputs", "outputs", "optional")
+
+    def __init__(self, node, inputs: Schema, outputs: Schema, optional=()):
+        self.name = node.name
+        self.node = node
+        self.inputs = dict(inputs)
+        self.outputs = dict(outputs)
+        self.optional = frozenset(optional)
+
+
+class Edge:
+    __slots__ = ("source", "target", "mapping", "condition", "mapper")
+
+    def __init__(self, source: str, target: str, mapping: EdgeMapping, condition: Optional[Callable[[Dict[str, Any]], bool]] = None):
+        self.source = source
+        self.target = target
+        self.mapping = mapping
+        self.condition = condition
+        self.mapper: Optional[Mapper] = None
+
+
+def _compile_mapping(spec: Mapping[str, str]) -> Mapper:
+    # Pre-split every path once so a hop is just a few dict lookups
+    plan = []
+    for target_field, path in spec.items():
+        side, *keys = path.split(".")
+        plan.append((target_field, side == "input", tuple(keys)))
+
+    def mapper(input_data, output):
+        mapped = {}
+        for target_field, from_input, keys in plan:
+            value = input_data if from_input else output
+            for key in keys:
+                value = value.get(key) if isinstance(value, dict) else None
+            mapped[target_field] = value
+        return mapped
+    return mapper
+
+
+def _compatible(source_type: type, target_type: type) -> bool:
+    return target_type is object or source_type is object or issubclass(source_type, target_type)
+
+
+class Graph:
+    """
+    Declarative agent graph. Nodes are anything with a ``name`` and a
+    ``run(dict) -> dict`` method; their schemas come from the arguments or
+    from ``input_schema`` / ``output_schema`` / ``optional_inputs`` class
+    attributes. ``compile()`` validates everything once and returns the
+    executor, so adding an agent never touches routing code.
+    """
+
+    def __init__(self):
+        self.nodes: Dict[str, NodeSpec] = {}
+        self.edges: List[Edge] = []
+
+    def add_node(self, node, inputs: Optional[Schema] = None, outputs: Optional[Schema] = None, optional=None) -> "Graph":
+        if node.name in self.nodes:
+            raise GraphError(f"Node {node.name} is already registered")
+        self.nodes[node.name] = NodeSpec(
+            node,
+            inputs if inputs is not None else getattr(node, "input_schema", {}),
+            outputs if outputs is not None else getattr(node, "output_schema", {}),
+            optional if optional is not None else getattr(node, "optional_inputs", ()),
+        )
+        return self
+
+    def add_edge(self, source: str, target: str, mapping: EdgeMapping, condition=None) -> "Graph":
+        self.edges.append(Edge(source, target, mapping, condition))
+        return self
+
+    # ---------------- validation ----------------
+    def _check_edge(self, edge: Edge, mapped_fields: Dict[str, set]):
+        for end in (edge.source, edge.target):
+            if end not in self.nodes:
+                raise GraphError(f"Edge {edge.source} -> {edge.target}: unknown node {end}")
+        source, target = self.nodes[edge.source], self.nodes[edge.target]
+
+        if callable(edge.mapping):
+            edge.mapper = edge.mapping
+            # Opaque mapper: trust it to fill the target schema
+            mapped_fields[edge.target].update(target.inputs)
+            return
+
+        for target_field, path in edge.mapping.items():
+            side, *keys = path.split(".")
+            if side not in ("input", "output") or not keys:
+                raise GraphError(f"Edge {edge.source} -> {edge.target}: bad path '{path}', expected input.<field> or output.<field>")
+            schema = source.inputs if side == "input" else source.outputs
+            if schema and keys[0] not in schema:
+                raise GraphError(f"Edge {edge.source} -> {edge.target}: {edge.source} has no {side} field '{keys[0]}'")
+            if target.inputs and target_field not in target.inputs:
+                raise GraphError(f"Edge {edge.source} -> {edge.target}: {edge.target} has no input field '{target_field}'")
+            # Nested paths have no declared type, so only top-level fields are type-checked
+            source_type = schema.get(keys[0], object) if len(keys) == 1 else object
+            target_type = target.inputs.get(target_field, object)
+            if not _compatible(source_type, target_type):
+                raise GraphError(
+                    f"Edge {edge.source} -> {edge.target}: {path} is {source_type.__name__}, "
+                    f"{edge.target}.{target_field} expects {target_type.__name__}"
+                )
+            mapped_fields[edge.target].add(target_field)
+        edge.mapper = _compile_mapping(edge.mapping)
+
+    def _topological_order(self) -> List[str]:
+        indegree = {name: 0 for name in self.nodes}
+        for edge in self.edges:
+            indegree[edge.target] += 1
+        ready = [name for name, d in indegree.items() if d == 0]
+        order = []
+        while ready:
+            name = ready.pop()
+            order.append(name)
+            for edge in self.edges:
+                if edge.source == name:
+                    indegree[edge.target] -= 1
+                    if indegree[edge.target] == 0:
+                        ready.append(edge.target)
+        if len(order) != len(self.nodes):
+            cyclic = sorted(n for n, d in indegree.items() if d > 0)
+            raise GraphError(f"Graph has a cycle through {cyclic}")
+        return order
+
+    def compile(self, max_workers: int = 4) -> "CompiledGraph":
+        mapped_fields = {name: set() for name in self.nodes}
+        for edge in self.edges:
+            self._check_edge(edge, mapped_fields)
+        order = self._topological_order()
+
+        for name in {edge.target for edge in self.edges}:
+            target = self.nodes[name]
+            missing = set(target.inputs) - target.optional - mapped_fields[name]
+            if missing:
+                raise GraphError(f"Incoming edges of {name} leave required inputs unset: {sorted(missing)}")
+        return CompiledGraph(self.nodes, self.edges, order, max_workers)
+
+
+class CompiledGraph:
+    """
+    Validated, immutable graph with an iterative scheduler. A node runs once
+    all of its incoming edges have either fired or been ruled out (condition
+    false or source skipped); inputs from several fired edges are merged.
+    Ready nodes run inline when they are alone and on a thread pool when
+    independent branches are ready together.
+    """
+
+    def __init__(self, nodes: Dict[str, NodeSpec], edges: List[Edge], order: List[str], max_workers: int = 4):
+        self.order = order
+        index = {name: i for i, name in enumerate(order)}
+        self.names = order
+        self.nodes = [nodes[name].node for name in order]
+        self.timer_names = [f"node.{name}" for name in order]
+        self.specs = [nodes[name] for name in order]
+        self.n_parents = [0] * len(order)
+        # out_edges[i] = [(target index, mapper, condition), ...]
+        self.out_edges: List[List[tuple]] = [[] for _ in order]
+        for edge in edges:
+            self.out_edges[index[edge.source]].append((index[edge.target], edge.mapper, edge.condition))
+            self.n_parents[index[edge.target]] += 1
+        self.index = index
+        self.max_workers = max_workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pending: Dict[int, List[int]] = {}
+
+    def _initial_pending(self, start: int) -> List[int]:
+        """
+        Parent counts for a run entered at start, counting only parents the
+        run can reach; nodes outside that subgraph never become ready.
+        """
+        pending = self._pending.get(start)
+        if pending is None:
+            reachable = {start}
+            stack = [start]
+            while stack:
+                for target, _, _ in self.out_edges[stack.pop()]:
+                    if target not in reachable:
+                        reachable.add(target)
+                        stack.append(target)
+            pending = [0] * len(self.nodes)
+            for source in reachable:
+                for target, _, _ in self.out_edges[source]:
+                    pending[target] += 1
+            self._pending[start] = pending
+        return pending
+
+    def _executor(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="dag")
+        return self._pool
+
+    def check_input(self, i: int, input_data: Dict[str, Any]):
+        spec = self.specs[i]
+        for field, expected in spec.inputs.items():
+            if field not in input_data:
+                if field not in spec.optional:
+                    raise GraphError(f"{spec.name}: missing input '{field}'")
+            elif expected is not object and input_data[field] is not None and not isinstance(input_data[field], expected):
+                raise GraphError(f"{spec.name}.{field}: expected {expected.__name__}, got {type(input_data[field]).__name__}")
+
+    def run(self, entry: str, input_data: Dict[str, Any], on_node=None, on_edge=None,
+            check_types: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        Run the graph from ``entry`` and return {node name: output} for every
+        node that ran. ``on_node(name, output)`` / ``on_edge(source, target)``
+        are optional hooks; ``check_types`` validates inputs against the schemas.
+        """
+        start = self.index[entry]
+        # Only the entry's downstream subgraph runs: edges from nodes upstream
+        # of (or beside) the entry can't fire, so they aren't waited for
+        pending = list(self._initial_pending(start))
+        inputs: List[Optional[list]] = [None] * len(self.nodes)
+        results: Dict[str, Dict[str, Any]] = {}
+
+        ready = [(start, input_data)]
+        running = {}
+
+        while ready or running:
+            if len(ready) == 1 and not running:
+                # Common linear case: no pool hop, no futures
+                i, node_input = ready.pop()
+                if check_types:
+                    self.check_input(i, node_input)
+                self._complete(i, node_input, self._run_node(i, node_input), results, pending, inputs, ready, on_node, on_edge)
+                continue
+
+            for i, node_input in ready:
+                if check_types:
+                    self.check_input(i, node_input)
+                running[self._executor().submit(self._run_node, i, node_input)] = (i, node_input)
+            ready = []
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                i, node_input = running.pop(future)
+                self._complete(i, node_input, future.result(), results, pending, inputs, ready, on_node, on_edge)
+        return results
+
+    def _run_node(self, i, node_input):
+        t = metrics.start()
+        output = self.nodes[i].run(node_input)
+        metrics.stop(self.timer_names[i], t)
+        return output
+
+    def _complete(self, i, node_input, output, results, pending, inputs, ready, on_node, on_edge):
+        results[self.names[i]] = output
+        if on_node is not None:
+            on_node(self.names[i], output)
+        self._resolve(i, node_input, output, pending, inputs, ready, on_edge)
+
+    def _resolve(self, i, node_input, output, pending, inputs, ready, on_edge):
+        # output None means node i was skipped: its edges resolve without firing
+        stack = [(i, node_input, output)]
+        while stack:
+            i, node_input, output = stack.pop()
+            for target, mapper, condition in self.out_edges[i]:
+                if output is not None and (condition is None or condition(output)):
+                    if inputs[target] is None:
+                        inputs[target] = []
+                    inputs[target].append(mapper(node_input, output))
+                    if on_edge is not None:
+                        on_edge(self.names[i], self.names[target])
+                pending[target] -= 1
+                if pending[target] == 0:
+                    fired = inputs[target]
+                    if fired is None:
+                        stack.append((target, None, None))
+                    elif len(fired) == 1:
+                        ready.append((target, fired[0]))
+                    else:
+                        merged = {}
+                        for part in fired:
+                            merged.update(part)
+                        ready.append((target, merged))
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
@@ -1,7 +1,11 @@
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 from Prediction_Agent.model.predictive_node import PredictiveAgentNode
 from Diagnosis_Agent.models.diagnosis_node import DiagnosisAgentNode
+from Diagnosis_Agent.history_store import get_history
 from CustomerInteraction.customer_node2 import CustomerAgentNode
+from CustomerInteraction.session_manager import SessionManager, console_loop
+from dag_executor import CompiledGraph, Graph
+from model_registry import registry
 
 # Helper functions
 def block(title: str, emoji: str = "🔹", width: int = 60):
@@ -19,71 +23,132 @@ def pretty_dict(d: dict, indent: int = 2):
         print(" " * indent + f"• {k}: {v}")
 
 
-class Langraph:
-    def __init__(self):
-        # Initialize nodes
-        self.nodes = {}
-        self.register_node(PredictiveAgentNode("PredictiveAgent"))
-        self.register_node(DiagnosisAgentNode("DiagnosisAgent"))
-        self.register_node(CustomerAgentNode("CustomerAgent"))
+# Console output for each hop; only installed when Langraph(verbose=True)
+ROUTE_BANNERS = {
+    "DiagnosisAgent": ("Routing → Diagnosis Agent", "🩺"),
+    "CustomerAgent": ("Routing → Customer Interaction Agent", "💬"),
+}
+
+def print_node_output(node_name: str, output: Dict[str, Any]):
+    if node_name in ["PredictiveAgent", "DiagnosisAgent"]:
+        block(f"{node_name} OUTPUT", "🧠")
+        pretty_dict(output)
+    elif node_name == "CustomerAgent":
+        if "session_status" in output:
+            print(f"\n🤖 Customer session for {output['vehicle_id']}: {output['session_status']}")
+        else:
+            print("\n🤖 Customer Agent finished interaction.")
 
-        self.edges = {
-            "PredictiveAgent": ["DiagnosisAgent"],
-            "DiagnosisAgent": ["CustomerAgent"],
-        }
+def print_route(source: str, target: str):
+    title, emoji = ROUTE_BANNERS.get(target, (f"Routing → {target}", "➡️"))
+    sub_block(title, emoji)
 
-    def register_node(self, node):
-        self.nodes[node.name] = node
+
+class Langraph:
+    def __init__(self, sessions=None, verbose: bool = False, max_workers: int = 4):
+        self.graph = Graph()
+        self.max_workers = max_workers
+        self.on_node = print_node_output if verbose else None
+        self.on_edge = print_route if verbose else None
+        self._compiled = None
+
+        predictive = PredictiveAgentNode("PredictiveAgent")
+        self.register_node(predictive)
+        self.register_node(DiagnosisAgentNode("DiagnosisAgent", history=get_history()))
+        self.register_node(CustomerAgentNode("CustomerAgent", sessions=sessions))
+
+        self.add_edge(
+            "PredictiveAgent", "DiagnosisAgent",
+            mapping={
+                "vehicle_id": "input.vehicle_id",
+                "sensor_data": "input.sensor_data",
+                "latent_vector": "output.latent_vector",
+                "reconstruction_error": "output.reconstruction_error",
+            },
+            condition=predictive.should_run_next,
+        )
+        self.add_edge(
+            "DiagnosisAgent", "CustomerAgent",
+            mapping={
+                "vehicle_id": "input.vehicle_id",
+                "diagnosis": "output.diagnosis.diagnosis",
+                "confidence": "output.diagnosis.confidence",
+                "explanation": "output.diagnosis.explanation",
+            },
+        )
+        self.compile()
+
+    def register_node(self, node, **schema):
+        self.graph.add_node(node, **schema)
+        self._compiled = None
+
+    def add_edge(self, source: str, target: str, mapping, condition=None):
+        self.graph.add_edge(source, target, mapping, condition)
+        self._compiled = None
+
+    def compile(self) -> CompiledGraph:
+        # Topology and edge mappings are validated here, once, not per reading
+        if self._compiled is None:
+            self._compiled = self.graph.compile(max_workers=self.max_workers)
+        return self._compiled
+
+    def run(self, entry: str, input_data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Run the graph from entry; returns {node name: output} for every node that ran."""
+        if entry not in self.graph.nodes:
+            raise ValueError(f"Node {entry} not found in Langraph")
+        return self.compile().run(entry, input_data, on_node=self.on_node, on_edge=self.on_edge)
 
     def run_node(self, node_name: str, input_data: Dict[str, Any]) -> Dict[str, Any]:
-        if node_name not in self.nodes:
-            raise ValueError(f"Node {node_name} not found in Langraph")
-        
-        node = self.nodes[node_name]
-        output = node.run(input_data)
-
-        # Print outputs for main agents
-        if node_name in ["PredictiveAgent", "DiagnosisAgent"]:
-            block(f"{node_name} OUTPUT", "🧠")
-            pretty_dict(output)
-
-        # Route to next nodes
-        next_nodes_to_run = getattr(node, "next_nodes", self.edges.get(node_name, []))
-        for next_node in next_nodes_to_run:
-            if next_node == "DiagnosisAgent":
-                if hasattr(node, "should_run_next") and not node.should_run_next(output):
-                    continue
-                sub_block("Routing → Diagnosis Agent", "🩺")
-                input_for_next = {
-                    "sensor_data": input_data.get("sensor_data"),
-                    "latent_vector": output.get("latent_vector"),
-                    "reconstruction_error": output.get("reconstruction_error")
-                }
-                output = self.run_node(next_node, input_for_next)
-            
-            elif next_node == "CustomerAgent":
-                sub_block("Routing → Customer Interaction Agent", "💬")
-                diag = output.get("diagnosis", {})
-                
-                input_for_next = {
-                    "diagnosis": diag.get("diagnosis"),
-                    "confidence": diag.get("confidence"),
-                    "explanation": diag.get("explanation"),
-                    "memory": input_data.get("memory"),     
-                    "user_message": input_data.get("user_message")  
-                }
-
-                output = self.run_node(next_node, input_for_next)
-                print("\n🤖 Customer Agent finished interaction.")
-
-        return output
+        # Output of the furthest node reached, as the recursive router used to return
+        results = self.run(node_name, input_data)
+        return results[max(results, key=self._compiled.index.get)]
+
+
+def run_fleet(sessions, n_vehicles: int, interval: float, duration: Optional[float]):
+    """Drive n_vehicles simulated vehicles through the async runner instead of the one-vehicle loop."""
+    import asyncio
+    import json
+    from async_runner import AsyncPipelineRunner
+
+    runner = AsyncPipelineRunner(n_vehicles=n_vehicles, interval=interval, history=get_history(), sessions=sessions)
+    report = asyncio.run(runner.run(duration))
+    block("FLEET RUN", "🚚")
+    print(json.dumps(report, indent=2))
 
 
 if __name__ == "__main__":
     from sensor_simulator import SensorSimulator
+    import argparse
+    import threading
     import time
 
-    lg = Langraph()
+    parser = argparse.ArgumentParser(description="Run the vehicle maintenance agents")
+    parser.add_argument("--vehicles", type=int, default=1,
+                        help="simulated vehicles; more than 1 runs them concurrently through async_runner")
+    parser.add_argument("--interval", type=float, default=2.0, help="seconds between readings per vehicle")
+    parser.add_argument("--duration", type=float, default=None, help="fleet mode: seconds to run (default: until Ctrl-C)")
+    args = parser.parse_args()
+
+    VEHICLE_ID = "VEH00001"
+
+    # Models load in the background while the console comes up; the first
+    # reading just waits for whatever is still loading.
+    registry.warm(background=True)
+
+    def show_agent_message(vehicle_id, text):
+        sub_block(f"Customer Agent → {vehicle_id}", "💬")
+        print(text)
+
+    # Conversations run on session workers; owner replies are read on their own
+    # thread, so telemetry keeps flowing while a call is in progress.
+    sessions = SessionManager(on_message=show_agent_message)
+    threading.Thread(target=console_loop, args=(sessions,), daemon=True).start()
+
+    if args.vehicles > 1:
+        run_fleet(sessions, args.vehicles, args.interval, args.duration)
+        raise SystemExit
+
+    lg = Langraph(sessions=sessions, verbose=True)
     sim = SensorSimulator()
 
     while True:
@@ -96,7 +161,8 @@ if __name__ == "__main__":
         print(f"  Coolant Level : {sensor_data[4]} %")
 
         lg.run_node("PredictiveAgent", {
+            "vehicle_id": VEHICLE_ID,
             "sensor_data": sensor_data
         })
 
-        time.sleep(2)
+        time.sleep(args.interval)
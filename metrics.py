@@ -0,0 +1,279 @@
+import atexit
+import json
+import os
+import threading
+import time
+from functools import wraps
+from typing import Any, Dict, Optional, Tuple
+
+# Process-wide stage timings and counters for the agent pipeline.
+#
+# Disabled by default; enable with PIPELINE_METRICS=1 or metrics.enable().
+# When disabled every entry point returns after a single global check, so
+# instrumented hot paths pay tens of nanoseconds. With PIPELINE_METRICS_FILE
+# set, a snapshot (.json, anything else = Prometheus text) is written at exit.
+#
+#     t = metrics.start()
+#     scaled = scaler.transform(x)
+#     t = metrics.lap("prediction.scale", t)
+#
+#     with metrics.timer("llm.chat"): ...
+#     metrics.incr("diagnose_path", source="rules")
+
+_enabled = os.getenv("PIPELINE_METRICS", "0") == "1"
+_perf_counter = time.perf_counter
+
+
+class Histogram:
+    """
+    HDR-style log-linear histogram over integer nanoseconds: values below
+    2**SUB_BITS get exact buckets, above that each power of two is split into
+    2**(SUB_BITS-1) linear sub-buckets (~3% relative error at SUB_BITS=6).
+    Recording is O(1) and memory is fixed regardless of sample count.
+    """
+
+    SUB_BITS = 6
+    MAX_SHIFT = 40
+
+    def __init__(self):
+        self.half = 1 << (self.SUB_BITS - 1)
+        self.counts = [0] * ((1 << self.SUB_BITS) + self.MAX_SHIFT * self.half)
+        self.count = 0
+        self.total_ns = 0
+        self.min_ns = None
+        self.max_ns = 0
+
+    def _index(self, v: int) -> int:
+        shift = v.bit_length() - self.SUB_BITS
+        if shift <= 0:
+            return v
+        shift = min(shift, self.MAX_SHIFT)
+        return (1 << self.SUB_BITS) + (shift - 1) * self.half + ((v >> shift) - self.half)
+
+    def _bounds(self, idx: int) -> Tuple[int, int]:
+        if idx < (1 << self.SUB_BITS):
+            return idx, idx + 1
+        shift, sub = divmod(idx - (1 << self.SUB_BITS), self.half)
+        shift += 1
+        low = (sub + self.half) << shift
+        return low, low + (1 << shift)
+
+    def record_ns(self, v: int):
+        v = max(int(v), 0)
+        self.counts[self._index(v)] += 1
+        self.count += 1
+        self.total_ns += v
+        if self.min_ns is None or v < self.min_ns:
+            self.min_ns = v
+        if v > self.max_ns:
+            self.max_ns = v
+
+    def percentile_ns(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q / 100.0 * self.count
+        seen = 0
+        for idx, c in enumerate(self.counts):
+            seen += c
+            if c and seen >= rank:
+                low, high = self._bounds(idx)
+                return min(max((low + high) / 2, self.min_ns), self.max_ns)
+        return float(self.max_ns)
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "sum_s": self.total_ns / 1e9,
+            "mean_us": self.total_ns / self.count / 1e3 if self.count else 0.0,
+            "min_us": (self.min_ns or 0) / 1e3,
+            "p50_us": self.percentile_ns(50) / 1e3,
+            "p90_us": self.percentile_ns(90) / 1e3,
+            "p99_us": self.percentile_ns(99) / 1e3,
+            "p999_us": self.percentile_ns(99.9) / 1e3,
+            "max_us": self.max_ns / 1e3,
+        }
+
+
+_lock = threading.Lock()
+_histograms: Dict[str, Histogram] = {}
+_counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], int] = {}
+
+
+# ---------------- switches ----------------
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+# ---------------- recording ----------------
+def record(name: str, seconds: float):
+    if not _enabled:
+        return
+    with _lock:
+        hist = _histograms.get(name)
+        if hist is None:
+            hist = _histograms[name] = Histogram()
+        hist.record_ns(seconds * 1e9)
+
+
+def start() -> float:
+    """Timestamp to pass to stop()/lap(); 0.0 when disabled."""
+    return _perf_counter() if _enabled else 0.0
+
+
+def stop(name: str, t0: float):
+    if t0 and _enabled:
+        record(name, _perf_counter() - t0)
+
+
+def lap(name: str, t0: float) -> float:
+    """Record the time since t0 under name and return a fresh timestamp for the next step."""
+    if not (t0 and _enabled):
+        return 0.0
+    now = _perf_counter()
+    record(name, now - t0)
+    return now
+
+
+class _Timer:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = _perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, _perf_counter() - self.t0)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name: str):
+    return _Timer(name) if _enabled else _NULL_TIMER
+
+
+def timed(name: str):
+    """Decorator form of timer()."""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            t0 = _perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(name, _perf_counter() - t0)
+        return wrapper
+    return decorate
+
+
+def incr(name: str, n: int = 1, **labels):
+    if not _enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + n
+
+
+# ---------------- export ----------------
+def snapshot() -> Dict[str, Any]:
+    with _lock:
+        timers = {name: h.summary() for name, h in sorted(_histograms.items())}
+        counters = {}
+        for (name, labels), value in sorted(_counters.items()):
+            counters.setdefault(name, []).append({"labels": dict(labels), "value": value})
+    return {"timestamp": time.time(), "timers": timers, "counters": counters}
+
+
+def _label_str(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+
+def to_prometheus(prefix: str = "pipeline") -> str:
+    snap = snapshot()
+    lines = [
+        f"# HELP {prefix}_stage_seconds Latency of pipeline stages and sub-steps",
+        f"# TYPE {prefix}_stage_seconds summary",
+    ]
+    for stage, s in snap["timers"].items():
+        for q, key in (("0.5", "p50_us"), ("0.9", "p90_us"), ("0.99", "p99_us"), ("0.999", "p999_us")):
+            lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="{q}"}} {s[key] / 1e6:.9f}')
+        lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {s["sum_s"]:.9f}')
+        lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {s["count"]}')
+    for name, series in snap["counters"].items():
+        metric = f"{prefix}_{name}_total"
+        lines.append(f"# TYPE {metric} counter")
+        for entry in series:
+            lines.append(f"{metric}{_label_str(entry['labels'])} {entry['value']}")
+    return "\n".join(lines) + "\n"
+
+
+def dump(path: str) -> str:
+    """Write a snapshot to path (.json -> JSON, otherwise Prometheus text format) atomically."""
+    text = json.dumps(snapshot(), indent=2) if path.endswith(".json") else to_prometheus()
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+    return path
+
+
+_EXPORT_PATH: Optional[str] = os.getenv("PIPELINE_METRICS_FILE")
+if _EXPORT_PATH:
+    atexit.register(lambda: dump(_EXPORT_PATH) if _histograms or _counters else None)
+
+
+if __name__ == "__main__":
+    # Overhead of the instrumentation itself, enabled and disabled
+    n = 1_000_000
+
+    def per_call(fn):
+        t0 = _perf_counter()
+        for _ in range(n):
+            fn()
+        return (_perf_counter() - t0) / n * 1e9
+
+    def with_timer():
+        with timer("bench"):
+            pass
+
+    baseline = per_call(lambda: None)
+    for state in ("disabled", "enabled"):
+        enable() if state == "enabled" else disable()
+        print(f"{state}: start/stop {per_call(lambda: stop('bench', start())) - baseline:.0f} ns, "
+              f"timer() {per_call(with_timer) - baseline:.0f} ns, "
+              f"incr() {per_call(lambda: incr('bench', source='x')) - baseline:.0f} ns")
+    print(json.dumps(snapshot()["timers"]["bench"], indent=2))
@@ -0,0 +1,111 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Process-wide registry of lazily loaded model artifacts.
+#
+# Modules register a loader per artifact at import time (cheap); the artifact
+# itself is built on the first get() and shared by every caller afterwards.
+# warm() loads artifacts ahead of time, optionally on a background thread, so
+# a long-running process can start serving while models come up.
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._values: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._registry_lock = threading.Lock()
+        self.load_times: Dict[str, float] = {}
+
+    def register(self, name: str, loader: Callable[[], Any]):
+        with self._registry_lock:
+            self._loaders[name] = loader
+            self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name: str) -> Any:
+        try:
+            return self._values[name]
+        except KeyError:
+            pass
+        try:
+            lock = self._locks[name]
+        except KeyError:
+            raise KeyError(f"No model registered under '{name}'") from None
+        with lock:
+            # Another thread may have finished loading while we waited
+            if name not in self._values:
+                start = time.perf_counter()
+                value = self._loaders[name]()
+                self.load_times[name] = time.perf_counter() - start
+                self._values[name] = value
+        return self._values[name]
+
+    def set(self, name: str, value: Any):
+        """Replace a loaded artifact (e.g. after switching runtime)."""
+        with self._locks.setdefault(name, threading.Lock()):
+            self._values[name] = value
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._values
+
+    def names(self) -> List[str]:
+        return list(self._loaders)
+
+    def unload(self, name: Optional[str] = None):
+        for key in ([name] if name else list(self._values)):
+            self._values.pop(key, None)
+
+    def warm(self, names: Optional[Iterable[str]] = None, background: bool = False) -> Optional[threading.Thread]:
+        names = list(names) if names is not None else self.names()
+
+        def load_all():
+            for name in names:
+                self.get(name)
+
+        if not background:
+            load_all()
+            return None
+        thread = threading.Thread(target=load_all, name="model-warmup", daemon=True)
+        thread.start()
+        return thread
+
+
+registry = ModelRegistry()
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import subprocess
+    import sys
+
+    # Import-time vs first-use cost of the agent modules, each in a fresh interpreter
+    SCRIPT = """
+import json, time
+t0 = time.perf_counter()
+import {module}
+t1 = time.perf_counter()
+from model_registry import registry
+registry.warm()
+t2 = time.perf_counter()
+print(json.dumps({{"import_s": t1 - t0, "warm_s": t2 - t1, "models": sorted(registry.load_times)}}))
+"""
+    parser = argparse.ArgumentParser(description="Measure import and model warm-up time of the agent modules")
+    parser.add_argument("modules", nargs="*", default=[
+        "Prediction_Agent.model.prediction_tool",
+        "Diagnosis_Agent.fallback",
+        "Diagnosis_Agent.diagnosis_engine",
+        "CustomerInteraction.agent",
+        "master",
+    ])
+    args = parser.parse_args()
+
+    for module in args.modules:
+        out = subprocess.run([sys.executable, "-c", SCRIPT.format(module=module)], capture_output=True, text=True)
+        if out.returncode != 0:
+            print(f"{module:42s} failed: {out.stderr.strip().splitlines()[-1]}")
+            continue
+        report = json.loads(out.stdout.strip().splitlines()[-1])
+        print(f"{module:42s} import {report['import_s']:6.2f} s   warm {report['warm_s']:6.2f} s   "
+              f"({len(report['models'])} models)")
@@ -0,0 +1,163 @@
+import gc
+import multiprocessing as mp
+import os
+import sys
+import time
+from typing import Any, Dict, List, Sequence
+
+from model_registry import registry
+from Prediction_Agent.model.prediction_tool import DIAGNOSIS_THRESHOLD, predict_failure_batch
+from Diagnosis_Agent.diagnosis_engine import diagnose_batch
+
+# Multi-process serving with one copy of the models.
+#
+# The parent loads every registered artifact, moves all objects into the
+# GC's permanent generation (gc.freeze) and only then forks the workers, so
+# model weights, the scaler and the XGBoost trees are shared copy-on-write
+# instead of loaded once per process. The FAISS index is opened with mmap,
+# which keeps its vectors in the page cache where every process shares them
+# even after a hot reload.
+
+
+def _worker_init():
+    # One intra-op thread per worker: parallelism comes from the processes
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(1)
+
+
+def _predict_rows(rows):
+    return predict_failure_batch(rows, latent_threshold=DIAGNOSIS_THRESHOLD)
+
+
+def _diagnose_rows(items):
+    sensor_rows, latents, recon_errors = zip(*items)
+    return diagnose_batch(list(sensor_rows), list(latents), list(recon_errors))
+
+
+def _pid(_):
+    time.sleep(0.05)  # keep the worker busy so every worker answers at least once
+    return os.getpid()
+
+
+def _chunks(items: Sequence, size: int) -> List[Sequence]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+class PreforkPool:
+    """
+    Process pool whose workers inherit already-loaded models from the parent.
+    Create it before the parent spawns any threads of its own (fork only
+    copies the calling thread).
+    """
+
+    def __init__(self, workers: int = None, freeze: bool = True, start_method: str = "fork"):
+        self.workers = workers or os.cpu_count()
+        self.start_method = start_method
+        if start_method == "fork":
+            # Must be set before the FAISS holder is first created
+            os.environ.setdefault("FAISS_MMAP", "1")
+            registry.warm()
+            if freeze:
+                gc.collect()
+                gc.freeze()
+            initializer = _worker_init
+        else:
+            # Baseline for comparison: every worker imports and loads models itself
+            initializer = _load_in_worker
+        self.pool = mp.get_context(start_method).Pool(self.workers, initializer=initializer)
+
+    def predict_batch(self, sensor_rows: Sequence[Sequence[float]], chunk_size: int = 256) -> List[Dict[str, Any]]:
+        results = self.pool.map(_predict_rows, _chunks(list(sensor_rows), chunk_size))
+        return [r for chunk in results for r in chunk]
+
+    def diagnose_batch(self, items: Sequence[tuple], chunk_size: int = 64) -> List[Dict[str, Any]]:
+        """items: (sensor_row, latent_vector, reconstruction_error) tuples; results keep input order."""
+        results = self.pool.map(_diagnose_rows, _chunks(list(items), chunk_size))
+        return [r for chunk in results for r in chunk]
+
+    def worker_pids(self) -> List[int]:
+        return sorted(set(self.pool.map(_pid, range(self.workers * 4), chunksize=1)))
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _load_in_worker():
+    _worker_init()
+    registry.warm()
+
+
+# ---------------- memory accounting ----------------
+def memory_usage(pid: int) -> Dict[str, float]:
+    """RSS / PSS / USS in MB from /proc/<pid>/smaps_rollup (Linux)."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[-1] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {
+        "rss_mb": fields.get("Rss", 0.0),
+        "pss_mb": fields.get("Pss", 0.0),
+        "uss_mb": fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0),
+        "shared_mb": fields.get("Shared_Clean", 0.0) + fields.get("Shared_Dirty", 0.0),
+    }
+
+
+def measure(start_method: str, workers: int, rows: List[List[float]]) -> Dict[str, Any]:
+    with PreforkPool(workers, start_method=start_method) as pool:
+        predictions = pool.predict_batch(rows)
+        pool.diagnose_batch([(r, p["latent_vector"], p["reconstruction_error"])
+                             for r, p in zip(rows, predictions) if p["latent_vector"] is not None])
+        per_worker = [memory_usage(pid) for pid in pool.worker_pids()]
+        parent = memory_usage(os.getpid())
+
+    def mean(key):
+        return sum(w[key] for w in per_worker) / len(per_worker)
+
+    return {
+        "start_method": start_method,
+        "workers": len(per_worker),
+        "parent": parent,
+        "worker_rss_mb": mean("rss_mb"),
+        "worker_pss_mb": mean("pss_mb"),
+        "worker_uss_mb": mean("uss_mb"),
+        # PSS splits shared pages between the processes mapping them, so the sum is real memory
+        "total_pss_mb": parent["pss_mb"] + sum(w["pss_mb"] for w in per_worker),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import subprocess
+
+    parser = argparse.ArgumentParser(description="Measure per-worker memory of pre-forked vs independently loaded workers")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=4096)
+    parser.add_argument("--mode", choices=("fork", "spawn", "both"), default="both")
+    args = parser.parse_args()
+
+    if args.mode == "both":
+        # Each mode in a fresh interpreter so the parent's state doesn't leak between runs
+        for mode in ("spawn", "fork"):
+            subprocess.run([sys.executable, __file__, "--mode", mode,
+                            "--workers", str(args.workers), "--rows", str(args.rows)], check=True)
+        sys.exit(0)
+
+    from Prediction_Agent.dataset.create_dummy import generate
+
+    rows = generate(timesteps=args.rows).drop(columns=["failed"]).to_numpy().tolist()
+    report = measure(args.mode, args.workers, rows)
+    label = "pre-fork (shared)" if args.mode == "fork" else "spawn (per-worker load)"
+    print(f"{label:26s} workers={report['workers']}  per worker: RSS {report['worker_rss_mb']:6.0f} MB  "
+          f"PSS {report['worker_pss_mb']:6.0f} MB  USS {report['worker_uss_mb']:6.0f} MB   "
+          f"total PSS incl. parent {report['total_pss_mb']:6.0f} MB")
+    print(json.dumps(report))
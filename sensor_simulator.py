@@ -2,7 +2,8 @@ import random
 import time
 
 class SensorSimulator:
-    def __init__(self):
+    def __init__(self, verbose=True):
+        self.verbose = verbose
         self.engine_temp = 85
         self.rpm = 1800
         self.speed = 40
@@ -21,7 +22,8 @@ class SensorSimulator:
         self.engine_temp = max(60, min(120, self.engine_temp))
         self.coolant = max(0, min(100, self.coolant))
         if random.random() < 0.08:  # 8% chance
-            print("\n⚠️  SENSOR SPIKE DETECTED")
+            if self.verbose:
+                print("\n⚠️  SENSOR SPIKE DETECTED")
             self.engine_temp += random.uniform(10, 25)
             self.vibration += random.uniform(0.5, 1.0)
         return [
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from Prediction_Agent.model import ae_runtime, prediction_tool
+from Prediction_Agent.model.ae_runtime import _parity_rows, check_parity, load_runtime
+
+
+@pytest.fixture(scope="module")
+def ae():
+    return prediction_tool.ae, prediction_tool.ae_input_dim
+
+
+def test_torchscript_matches_eager(ae):
+    model, input_dim = ae
+    x = _parity_rows(input_dim, n_rows=256)
+    eager_recon, eager_latent = load_runtime("eager", model, input_dim)(x)
+    recon, latent = load_runtime("torchscript", model, input_dim)(x)
+    np.testing.assert_allclose(latent, eager_latent, atol=1e-5)
+    np.testing.assert_allclose(recon, eager_recon, atol=1e-5)
+    assert check_parity(model, input_dim, kinds=("torchscript",))["torchscript"]["within_tolerance"]
+
+
+def test_quantized_is_refused_at_or_above_tolerance(ae, monkeypatch):
+    model, input_dim = ae
+    drift = check_parity(model, input_dim, kinds=("quantized",))["quantized"]["recon_error_max_abs"]
+    # Drift exactly at the tolerance is refused too
+    monkeypatch.setattr(ae_runtime, "RECON_ERROR_TOLERANCE", drift)
+    with pytest.raises(RuntimeError, match="diagnosis routing threshold"):
+        load_runtime("quantized", model, input_dim)
+
+    monkeypatch.setattr(ae_runtime, "RECON_ERROR_TOLERANCE", drift * 2)
+    load_runtime("quantized", model, input_dim)
+
+
+def test_quantized_refused_with_the_shipped_model(ae):
+    # int8 moves the reconstruction error ~5x the 0.001 routing threshold
+    model, input_dim = ae
+    with pytest.raises(RuntimeError):
+        load_runtime("quantized", model, input_dim)
+    # Parity tooling still measures it
+    assert not check_parity(model, input_dim, kinds=("quantized",))["quantized"]["within_tolerance"]
@@ -0,0 +1,52 @@
+from dag_executor import Graph
+
+
+class Step:
+    def __init__(self, name):
+        self.name = name
+
+    def run(self, input_data):
+        return {"path": input_data.get("path", []) + [self.name]}
+
+
+def compile_graph(edges):
+    graph = Graph()
+    for name in sorted({end for edge in edges for end in edge}):
+        graph.add_node(Step(name))
+    for source, target in edges:
+        graph.add_edge(source, target, mapping={"path": "output.path"})
+    return graph.compile()
+
+
+def test_root_entry_runs_the_whole_chain():
+    results = compile_graph([("A", "B"), ("B", "C")]).run("A", {})
+    assert results["C"] == {"path": ["A", "B", "C"]}
+
+
+def test_mid_graph_entry_fires_downstream_nodes():
+    compiled = compile_graph([("A", "B"), ("B", "C")])
+    results = compiled.run("B", {"path": []})
+    assert set(results) == {"B", "C"}
+    assert results["C"] == {"path": ["B", "C"]}
+    # Entering mid-graph doesn't change later runs from the root
+    assert set(compiled.run("A", {})) == {"A", "B", "C"}
+
+
+def test_mid_graph_entry_does_not_wait_for_unreachable_parents():
+    # C has parents A and B; entered at B, only B's edge can fire
+    results = compile_graph([("A", "C"), ("B", "C"), ("C", "D")]).run("B", {})
+    assert set(results) == {"B", "C", "D"}
+    assert results["D"] == {"path": ["B", "C", "D"]}
+
+
+def test_skipped_branch_still_lets_the_join_run():
+    graph = Graph()
+    for name in "ABCD":
+        graph.add_node(Step(name))
+    graph.add_edge("A", "B", mapping={"path": "output.path"}, condition=lambda out: False)
+    graph.add_edge("A", "C", mapping={"path": "output.path"})
+    graph.add_edge("B", "D", mapping={"path": "output.path"})
+    graph.add_edge("C", "D", mapping={"path": "output.path"})
+    results = graph.compile().run("A", {})
+    assert set(results) == {"A", "C", "D"}
+    assert results["D"] == {"path": ["A", "C", "D"]}
@@ -0,0 +1,73 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from Diagnosis_Agent.faiss_index import INDEX_PATH, LABELS_PATH, FaissIndexHolder
+from Diagnosis_Agent.history_store import ColumnLog, DiagnosisHistory, read_appended
+
+
+@pytest.fixture
+def paths(tmp_path):
+    shutil.copy(INDEX_PATH, tmp_path / "faiss.index")
+    shutil.copy(LABELS_PATH, tmp_path / "faiss_labels.npz")
+    return {name: str(tmp_path / name) for name in ("faiss.index", "faiss_labels.npz", "history", "history_log")}
+
+
+def make_history(paths, **kwargs):
+    holder = FaissIndexHolder(paths["faiss.index"], paths["faiss_labels.npz"])
+    return DiagnosisHistory(holder, log_dir=paths["history_log"], snapshot_dir=paths["history"],
+                            save_interval=3600, **kwargs)
+
+
+def vector(seed):
+    return np.random.default_rng(seed).normal(size=32).astype(np.float32) * 4
+
+
+def test_append_is_searchable_before_any_save(paths):
+    history = make_history(paths)
+    row_id = history.append(vector(0), "brake_wear", vehicle_id="V1")
+    state, distances, indices = history.holder.search(vector(0), 1)
+    assert indices[0][0] == row_id
+    assert state.classes[state.codes[row_id]] == "brake_wear"
+    assert not os.path.exists(paths["history"])
+
+
+def test_flush_keeps_metadata_in_the_snapshot(paths):
+    history = make_history(paths)
+    first = history.append(vector(0), "brake_wear", confidence=0.9, reconstruction_error=0.01)
+    history.append(vector(1), "low_oil", confidence=0.95, reconstruction_error=0.02)
+    history.flush()
+
+    snapshot = ColumnLog(paths["history"]).read()
+    assert list(snapshot["ids"]) == [first, first + 1]
+    assert list(snapshot["diagnosis"]) == ["brake_wear", "low_oil"]
+    np.testing.assert_allclose(snapshot["confidence"], [0.9, 0.95])
+    np.testing.assert_allclose(snapshot["reconstruction_error"], [0.01, 0.02])
+    assert len(ColumnLog(paths["history_log"]).read()["ids"]) == 0
+    # The saved index has the rows too
+    assert make_history(paths).ntotal == first + 2
+
+
+def test_cooldown_and_near_duplicates_are_skipped(paths):
+    history = make_history(paths, cooldown=60)
+    assert history.append(vector(0), "brake_wear", vehicle_id="V1") is not None
+    # Same vehicle and diagnosis within the cooldown
+    assert history.append(vector(1), "brake_wear", vehicle_id="V1") is None
+    # Another vehicle, but practically the same vector and label
+    assert history.append(vector(0) + 1e-3, "brake_wear", vehicle_id="V2") is None
+    # Same vector with a different label is kept
+    assert history.append(vector(0), "low_oil", vehicle_id="V2") is not None
+
+
+def test_unsaved_rows_are_replayed_after_a_restart(paths):
+    history = make_history(paths)
+    row_id = history.append(vector(0), "brake_wear")
+    history._save_timer.cancel()
+    history._pending = 0  # simulate a crash: no save at exit
+
+    restarted = make_history(paths)
+    assert restarted.ntotal == row_id + 1
+    appended = read_appended(paths["history"], paths["history_log"])
+    assert list(appended["ids"]) == [row_id]
@@ -0,0 +1,66 @@
+import os
+
+import joblib
+import numpy as np
+import pytest
+
+from Prediction_Agent.model.dataset_store import load_dataset
+from Prediction_Agent.model.tree_predictor import FlatTreeEnsemble
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODELS = {
+    "failure": os.path.join(BASE_DIR, "Prediction_Agent", "model", "models", "xgb_model.pkl"),
+    "diagnosis": os.path.join(BASE_DIR, "Diagnosis_Agent", "models", "xgb_diagnosis.pkl"),
+}
+# Both evaluators sum float32 leaf values; differences are rounding only
+ATOL = 1e-5
+
+
+@pytest.fixture(scope="module")
+def rows():
+    data = load_dataset(os.path.join(BASE_DIR, "Diagnosis_Agent", "data", "diagnosis_latent_dataset.csv"))
+    X = np.hstack([data.matrix("latents"), data.column("reconstruction_error")[:, np.newaxis]])
+    return np.ascontiguousarray(X[:500], dtype=np.float32)
+
+
+@pytest.fixture(scope="module", params=sorted(MODELS))
+def model(request):
+    return joblib.load(MODELS[request.param])
+
+
+def with_nans(X, seed=0):
+    X = X.copy()
+    mask = np.random.default_rng(seed).random(X.shape) < 0.2
+    X[mask] = np.nan
+    return X
+
+
+def test_single_rows_match_xgboost(model, rows):
+    flat = FlatTreeEnsemble.from_xgb(model)
+    for i in range(50):
+        row = rows[i:i + 1]
+        np.testing.assert_allclose(flat.predict_proba(row), model.predict_proba(row), atol=ATOL)
+
+
+def test_batch_below_cutover_matches_xgboost(model, rows):
+    flat = FlatTreeEnsemble.from_xgb(model)
+    X = rows[:flat.batch_cutover]
+    np.testing.assert_allclose(flat.predict_proba(X), model.predict_proba(X), atol=ATOL)
+
+
+def test_batch_above_cutover_matches_xgboost(model, rows):
+    flat = FlatTreeEnsemble.from_xgb(model)
+    X = rows[:flat.batch_cutover * 4]
+    # Handed to XGBoost itself...
+    np.testing.assert_allclose(flat.predict_proba(X), model.predict_proba(X), atol=ATOL)
+    # ...and the NumPy traversal on the same rows, built without a batch model
+    traversal = FlatTreeEnsemble.from_xgb(model.get_booster())
+    np.testing.assert_allclose(traversal.predict_proba(X), model.predict_proba(X), atol=ATOL)
+
+
+def test_missing_values_follow_default_direction(model, rows):
+    flat = FlatTreeEnsemble.from_xgb(model.get_booster())
+    X = with_nans(rows[:200])
+    np.testing.assert_allclose(flat.predict_proba(X), model.predict_proba(X), atol=ATOL)
+    for i in range(20):
+        np.testing.assert_allclose(flat.predict_proba(X[i:i + 1]), model.predict_proba(X[i:i + 1]), atol=ATOL)